@@ -9,12 +9,33 @@
 
 from os import path
 from setuptools import setup
+from setuptools.command.build_py import build_py
 
 version = {}
 with open("somajo/version.py") as fh:
     exec(fh.read(), version)
 
 here = path.abspath(path.dirname(__file__))
+
+
+class BuildWithBundle(build_py):
+    """Also write the precompiled lexicon bundle into the build
+    directory (somajo/resources.py only uses the standard library).
+
+    """
+
+    def run(self):
+        build_py.run(self)
+        if self.dry_run:
+            return
+        resources = {"__file__": path.join(here, "somajo", "resources.py")}
+        with open(resources["__file__"]) as fh:
+            exec(fh.read(), resources)
+        target = path.join(self.build_lib, "somajo")
+        self.mkpath(target)
+        resources["build_bundle"](path.join(here, "somajo"), path.join(target, resources["BUNDLE"]))
+
+
 with open(path.join(here, 'README.rst')) as fh:
     long_description = fh.read()
 
@@ -43,6 +64,7 @@ setup(
                    "single_token_abbreviations_en.txt",
                    "tokens_with_plus_or_ampersand.txt"]
     },
+    cmdclass={"build_py": BuildWithBundle},
     url="https://github.com/tsproisl/SoMaJo",
     download_url='https://github.com/tsproisl/SoMaJo/archive/v%s.tar.gz' % version["__version__"],
     license='GNU General Public License v3 or later (GPLv3+)',
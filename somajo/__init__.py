@@ -1,7 +1,36 @@
-from somajo import tokenizer
-from somajo import sentence_splitter
+"""SoMaJo, a tokenizer and sentence splitter for German and English web
+and social media texts.
+
+The classes are imported from their modules when they are accessed
+for the first time, so that `import somajo` is fast and programs only
+pay for what they use.
+
+"""
+
+import importlib
 
 from .version import __version__
 
-Tokenizer = tokenizer.Tokenizer
-SentenceSplitter = sentence_splitter.SentenceSplitter
+# public names and the modules that define them
+_attributes = {"Tokenizer": "tokenizer",
+               "SentenceSplitter": "sentence_splitter",
+               "ParagraphCache": "cache",
+               "PersistentCache": "cache"}
+_modules = set(["cache", "cli", "matchers", "resources", "sentence_splitter", "tokenizer", "utils"])
+
+__all__ = sorted(_attributes) + ["__version__"]
+
+
+def __getattr__(name):
+    if name in _attributes:
+        value = getattr(importlib.import_module("." + _attributes[name], __name__), name)
+    elif name in _modules:
+        value = importlib.import_module("." + name, __name__)
+    else:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_attributes) | _modules)
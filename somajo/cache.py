@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+import collections
+import hashlib
+import marshal
+import multiprocessing.util
+import sqlite3
+import sys
+
+from somajo import resources
+from somajo.version import __version__
+
+
+def _size(value):
+    """Return the approximate memory size of value in bytes (strings
+    and nested tuples of strings are taken into account).
+
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, tuple):
+        size += sum(_size(v) for v in value)
+    return size
+
+
+class ParagraphCache(object):
+    """A bounded in-memory cache of tokenized paragraphs with least
+    recently used eviction. The cache holds at most max_entries
+    paragraphs and approximately max_bytes bytes of keys and values
+    (None means no limit).
+
+    The values have to be immutable (e.g. tuples of strings), so that
+    callers cannot corrupt them. The numbers of hits, misses and
+    evictions are counted.
+
+    If backing is another cache (e.g. a PersistentCache), it is
+    consulted on misses and receives all new entries. Values found in
+    the backing cache count as hits.
+
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=100 * 2**20, backing=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.backing = backing
+        self.entries = collections.OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __reduce__(self):
+        # a copy (e.g. for a worker process) starts empty
+        return (self.__class__, (self.max_entries, self.max_bytes, self.backing))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        """Return the value for key (or None) and mark it as recently used."""
+        entry = self.entries.get(key)
+        if entry is None:
+            value = None
+            if self.backing is not None:
+                value = self.backing.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._add(key, value)
+            return value
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value):
+        """Add value for key and evict the least recently used entries if
+        the cache is full. Values that are larger than max_bytes are
+        not cached.
+
+        """
+        if self.backing is not None:
+            self.backing.put(key, value)
+        self._add(key, value)
+
+    def _add(self, key, value):
+        size = _size(key) + _size(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= old[1]
+        self.entries[key] = (value, size)
+        self.size += size
+        while (self.max_entries is not None and len(self.entries) > self.max_entries) or (self.max_bytes is not None and self.size > self.max_bytes):
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        """Remove all entries (the counters are kept)."""
+        self.entries.clear()
+        self.size = 0
+
+    def close(self):
+        """Close the backing cache (if there is one)."""
+        if self.backing is not None:
+            self.backing.close()
+
+    def statistics(self):
+        """Return a one-line summary of the counters."""
+        lookups = self.hits + self.misses
+        ratio = self.hits / lookups if lookups > 0 else 0
+        return "%d hits, %d misses (%.1f%% hits), %d evictions, %d entries, %d bytes" % (self.hits, self.misses, ratio * 100, self.evictions, len(self.entries), self.size)
+
+
+def _write(connection, pending, max_bytes):
+    """Insert the pending entries of a PersistentCache into the database
+    and evict the oldest entries if the stored values exceed
+    max_bytes, in a single transaction. Return the number of evicted
+    entries.
+
+    """
+    evicted = 0
+    if len(pending) == 0:
+        return evicted
+    try:
+        with connection:
+            connection.executemany("INSERT OR IGNORE INTO paragraphs (hash, value) VALUES (?, ?)", pending.items())
+            # the size is read within the transaction, so that it
+            # includes the entries written by other processes
+            size, = connection.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM paragraphs").fetchone()
+            if size > max_bytes:
+                cutoff = None
+                rows = connection.execute("SELECT rowid, LENGTH(value) FROM paragraphs ORDER BY rowid")
+                for rowid, length in rows:
+                    if size <= max_bytes:
+                        break
+                    cutoff = rowid
+                    size -= length
+                rows.close()
+                evicted = connection.execute("DELETE FROM paragraphs WHERE rowid <= ?", (cutoff,)).rowcount
+    except sqlite3.ProgrammingError:
+        # the connection is closed
+        return evicted
+    pending.clear()
+    return evicted
+
+
+class PersistentCache(object):
+    """A cache of tokenized paragraphs in an SQLite database file that
+    persists across runs. The keys are SHA-256 hashes of the key
+    (paragraph and tokenizer configuration), the SoMaJo version and
+    a checksum of the lexicons and the source code, so that entries
+    from other versions are never used. The values are stored in
+    marshal format and have to be tuples of strings (or of tuples of
+    strings).
+
+    If the stored values exceed max_bytes, the oldest entries are
+    evicted. New entries are kept in memory and written in a single
+    short transaction once there are commit_every of them and when
+    the cache is closed, so that several processes can share the
+    cache file.
+
+    """
+
+    def __init__(self, path, max_bytes=1024 * 2**20, commit_every=1000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.commit_every = commit_every
+        self.namespace = repr((__version__, resources.checksum(), marshal.version)).encode("utf-8")
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS paragraphs (hash BLOB PRIMARY KEY, value BLOB NOT NULL)")
+        self.connection.commit()
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # pending entries are written when a (worker) process exits
+        multiprocessing.util.Finalize(self, _write, (self.connection, self.pending, self.max_bytes), exitpriority=10)
+
+    def __reduce__(self):
+        # a copy (e.g. for a worker process) opens its own connection
+        return (self.__class__, (self.path, self.max_bytes, self.commit_every))
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM paragraphs").fetchone()[0]
+
+    @property
+    def size(self):
+        """The total size of the stored values in bytes."""
+        return self.connection.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM paragraphs").fetchone()[0]
+
+    def _hash(self, key):
+        return hashlib.sha256(self.namespace + repr(key).encode("utf-8")).digest()
+
+    def get(self, key):
+        """Return the value for key (or None)."""
+        digest = self._hash(key)
+        data = self.pending.get(digest)
+        if data is None:
+            row = self.connection.execute("SELECT value FROM paragraphs WHERE hash = ?", (digest,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            data = row[0]
+        self.hits += 1
+        return marshal.loads(data)
+
+    def put(self, key, value):
+        """Store value for key."""
+        self.pending[self._hash(key)] = marshal.dumps(value)
+        if len(self.pending) >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        """Write the pending entries to disk and evict the oldest entries
+        if the cache is too large.
+
+        """
+        self.evictions += _write(self.connection, self.pending, self.max_bytes)
+
+    def clear(self):
+        """Remove all entries (the counters are kept)."""
+        self.connection.execute("DELETE FROM paragraphs")
+        self.connection.commit()
+        self.pending.clear()
+
+    def close(self):
+        """Commit the pending entries and close the database."""
+        self.commit()
+        self.connection.close()
+
+    def statistics(self):
+        """Return a one-line summary of the counters."""
+        lookups = self.hits + self.misses
+        ratio = self.hits / lookups if lookups > 0 else 0
+        return "%d hits, %d misses (%.1f%% hits), %d evictions, %d entries, %d bytes" % (self.hits, self.misses, ratio * 100, self.evictions, len(self), self.size)
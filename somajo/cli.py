@@ -2,15 +2,97 @@
 
 import argparse
 import logging
-import multiprocessing
+import pickle
 import sys
 import time
 
-from somajo import Tokenizer
-from somajo import SentenceSplitter
 from somajo import utils
+from somajo.tokenizer import Tokenizer
 from somajo.version import __version__
 
+# The modules for optional features (caches, sentence splitting,
+# parallel processing) are only imported if they are used, so that
+# short runs start quickly.
+
+# The tokenizer and sentence splitter of a worker process and the
+# encoding of its output. They are created once per process by
+# _init_worker, so that the tasks only contain paragraphs.
+_worker_tokenizer = None
+_worker_sentence_splitter = None
+_worker_encoding = None
+
+
+def _init_worker(options, encoding=None, split_sentences=False):
+    """Create the tokenizer (and, if split_sentences is True, the
+    sentence splitter) of a worker process from the pickled options.
+    Unpickling gives the worker its own caches (see somajo.cache)
+    with every start method.
+
+    """
+    global _worker_tokenizer, _worker_sentence_splitter, _worker_encoding
+    _worker_tokenizer = Tokenizer(**pickle.loads(options))
+    _worker_sentence_splitter = None
+    if split_sentences:
+        from somajo.sentence_splitter import SentenceSplitter
+        _worker_sentence_splitter = SentenceSplitter(_worker_tokenizer.token_classes or _worker_tokenizer.extra_info, _worker_tokenizer.language)
+    _worker_encoding = encoding
+
+
+def _tokenize_chunk(paragraphs):
+    """Tokenize the paragraphs with the tokenizer of the worker process."""
+    return [_worker_tokenizer.tokenize(paragraph) for paragraph in paragraphs]
+
+
+def _format(tokenized_paragraphs, is_tuple):
+    """Return the number of tokens in the tokenized paragraphs (or
+    sentences) and the output for them: one token per line (with
+    tab-separated token classes and extra information if is_tuple is
+    True) and an empty line after each paragraph. Empty paragraphs
+    are skipped.
+
+    """
+    n_tokens = 0
+    blocks = []
+    for tp in tokenized_paragraphs:
+        if not tp:
+            continue
+        n_tokens += len(tp)
+        if is_tuple:
+            tp = ["\t".join(t) for t in tp]
+        blocks.append("\n".join(tp))
+        blocks.append("\n\n")
+    return n_tokens, "".join(blocks)
+
+
+def _tokenize_and_format_chunk(paragraphs):
+    """Tokenize the paragraphs with the tokenizer of the worker process,
+    split them into sentences if the worker has a sentence splitter,
+    and return a list with a single pair: the number of tokens and
+    the encoded output for all paragraphs (see _format). Sending a
+    single block of bytes to the main process is much cheaper than
+    sending and formatting lists of tokens.
+
+    """
+    tokenized_paragraphs = (_worker_tokenizer.tokenize(paragraph) for paragraph in paragraphs)
+    if _worker_sentence_splitter is not None:
+        tokenized_paragraphs = (s for tp in tokenized_paragraphs if tp for s in _worker_sentence_splitter.split(tp))
+    n_tokens, output = _format(tokenized_paragraphs, _worker_tokenizer.token_classes or _worker_tokenizer.extra_info)
+    return [(n_tokens, output.encode(_worker_encoding))]
+
+
+def _tokenize_xml_chunk(parts):
+    """Tokenize the parts of an XML document (the texts of their
+    elements) with the tokenizer of the worker process and return
+    their tokenized texts (see Tokenizer.tokenize_xml).
+
+    """
+    return [_worker_tokenizer._tokenize_xml_part(texts) for texts in parts]
+
+
+def _part_size(texts):
+    """Return the number of characters in the texts of a part."""
+    return sum(len(text) for text in texts)
+
 
 def arguments():
     """"""
@@ -22,11 +104,22 @@ def arguments():
     parser.add_argument("-t", "--token_classes", action="store_true", help="Output the token classes (number, XML tag, abbreviation, etc.) in addition to the tokens.")
     parser.add_argument("-e", "--extra_info", action="store_true", help='Output additional information for each token: SpaceAfter=No if the token was not followed by a space and OriginalSpelling="…" if the token contained whitespace.')
     parser.add_argument("-l", "--language", choices=Tokenizer.supported_languages, default=Tokenizer.default_language, help="Choose a language. Currently supported are German (de) and English (en). (Default: de)")
-    parser.add_argument("--parallel", type=int, default=1, metavar="N", help="Run N worker processes (up to the number of CPUs) to speed up tokenization.")
+    parser.add_argument("--disable", action="append", choices=Tokenizer.stage_groups, default=[], metavar="GROUP", help="Do not apply the tokenizer stages of this group to speed up tokenization. Can be used multiple times, e.g. --disable emoticons --disable reddit_links. Tokens of the corresponding kinds will no longer be recognized (see README.md). Groups: %s" % ", ".join(Tokenizer.stage_groups))
+    parser.add_argument("--user_lexicon", action="append", nargs=2, default=[], metavar=("KIND", "FILE"), help="Recognize the entries of FILE (one per line) as single tokens in addition to the lexicons of SoMaJo. Can be used multiple times. Kinds: %s" % ", ".join(sorted(Tokenizer.user_lexicon_kinds)))
+    parser.add_argument("--cache", type=int, metavar="N", help="Cache the tokenized paragraphs (up to N of them) to speed up the tokenization of repeated paragraphs, e.g. signatures or boilerplate. With --parallel, every worker process has its own cache.")
+    parser.add_argument("--cache_memory", type=int, metavar="MB", help="Maximum memory used by the cache (approximately, per process). Implies --cache 10000 if --cache is not given. (Default: 100)")
+    parser.add_argument("--persistent_cache", metavar="FILE", help="Keep the tokenized paragraphs in this cache file (an SQLite database) and reuse them in later runs with the same options. Entries from other versions of SoMaJo are ignored.")
+    parser.add_argument("--persistent_cache_size", type=int, default=1024, metavar="MB", help="Maximum size of the persistent cache; the oldest entries are removed first. (Default: 1024)")
+    parser.add_argument("--chunk_cache", type=int, metavar="N", help="Memoize the tokens of up to N words that cannot interact with the surrounding text, so that only the rest of each paragraph goes through all stages of the tokenizer. The output is the same. With --parallel, every worker process has its own cache.")
+    parser.add_argument("--parallel", type=int, default=1, metavar="N", help="Run N worker processes (up to the number of CPUs) to speed up tokenization. XML documents are split at the sentence-breaking tags (see --tag) and the parts are tokenized in parallel. Note that tokens then cannot span these tags, so that the output for XML documents may differ from a run without --parallel.")
+    parser.add_argument("--parallel_buffer", type=int, default=64, metavar="MB", help="With --parallel, read at most this much text (approximately) ahead of the output, so that memory use is bounded even if the input can be read faster than it is processed. The memory for the tokenized text is proportional to this. (Default: 64)")
     parser.add_argument("--split_sentences", action="store_true", help="Do also split the paragraphs into sentences.")
     parser.add_argument("-v", "--version", action="version", version="SoMaJo %s" % __version__, help="Output version information and exit.")
     parser.add_argument("FILE", type=argparse.FileType("r", encoding="utf-8"), help="The input file (UTF-8-encoded)")
     args = parser.parse_args()
+    for kind, path in args.user_lexicon:
+        if kind not in Tokenizer.user_lexicon_kinds:
+            parser.error("unknown user lexicon kind: %s (choose from %s)" % (kind, ", ".join(sorted(Tokenizer.user_lexicon_kinds))))
     return args
 
 
@@ -35,18 +128,56 @@ def main():
     n_tokens = 0
     t0 = time.perf_counter()
     is_xml = False
+    pool = None
+    formatted_output = None
     if args.xml or args.tag is not None:
         is_xml = True
-    tokenizer = Tokenizer(args.split_camel_case, args.token_classes, args.extra_info, args.language)
-    sentence_splitter = SentenceSplitter(args.token_classes or args.extra_info, args.language)
+    cache = None
+    if args.persistent_cache is not None:
+        from somajo.cache import PersistentCache
+        cache = PersistentCache(args.persistent_cache, args.persistent_cache_size * 2**20)
+    if args.cache is not None or args.cache_memory is not None:
+        from somajo.cache import ParagraphCache
+        max_entries = args.cache if args.cache is not None else 10000
+        max_megabytes = args.cache_memory if args.cache_memory is not None else 100
+        cache = ParagraphCache(max_entries, max_megabytes * 2**20, backing=cache)
+    chunk_cache = None
+    if args.chunk_cache is not None:
+        from somajo.cache import ParagraphCache
+        chunk_cache = ParagraphCache(args.chunk_cache, None)
+    user_lexicons = {}
+    for kind, path in args.user_lexicon:
+        user_lexicons.setdefault(kind, []).append(path)
+    options = dict(split_camel_case=args.split_camel_case, token_classes=args.token_classes, extra_info=args.extra_info, language=args.language, disabled_groups=args.disable, cache=cache, chunk_cache=chunk_cache, user_lexicons=user_lexicons)
+    tokenizer = Tokenizer(**options)
+    if args.split_sentences:
+        from somajo.sentence_splitter import SentenceSplitter
+        sentence_splitter = SentenceSplitter(args.token_classes or args.extra_info, args.language)
+    if args.parallel > 1:
+        import multiprocessing
+        if multiprocessing.get_start_method() == "fork":
+            # the workers inherit the compiled patterns and matchers,
+            # which their tokenizers share
+            tokenizer.warmup()
+        n_workers = min(args.parallel, multiprocessing.cpu_count())
+        pool = multiprocessing.Pool(n_workers, _init_worker, (pickle.dumps(options), sys.stdout.encoding, args.split_sentences and not is_xml))
     if is_xml:
-        if args.parallel > 1:
-            logging.warning("Parallel tokenization of XML files is currently not supported.")
         eos_tags = args.tag
         if eos_tags is None:
             eos_tags = "title h1 h2 h3 h4 h5 h6 p br hr div ol ul dl table".split()
         eos_tags = set(eos_tags)
-        tokenized_paragraphs = [tokenizer.tokenize_xml(args.FILE)]
+        if pool is None:
+            tokenized_paragraphs = [tokenizer.tokenize_xml(args.FILE)]
+        else:
+            # the workers tokenize the parts of the document between
+            # the sentence-breaking tags and align the tokens with
+            # the elements; at most four chunks per worker are in
+            # flight. The sentences are split here, because sending
+            # the tokens to the workers and back costs more than
+            # splitting them.
+            def tokenize_parts(parts):
+                return utils.bounded_imap(pool, _tokenize_xml_chunk, parts, 250, 4 * n_workers, args.parallel_buffer * 2**20, _part_size)
+            tokenized_paragraphs = [tokenizer.tokenize_xml(args.FILE, eos_tags=eos_tags, tokenize_parts=tokenize_parts)]
         if args.split_sentences:
             tokenized_paragraphs = list(sentence_splitter.split_xml(tokenized_paragraphs[0], eos_tags))
     else:
@@ -54,9 +185,11 @@ def main():
             paragraphs = utils.get_paragraphs(args.FILE)
         elif args.paragraph_separator == "single_newlines":
             paragraphs = (line for line in args.FILE if line.strip() != "")
-        if args.parallel > 1:
-            pool = multiprocessing.Pool(min(args.parallel, multiprocessing.cpu_count()))
-            tokenized_paragraphs = pool.imap(tokenizer.tokenize, paragraphs, 250)
+        if pool is not None:
+            # the workers split the sentences and format the output;
+            # at most four chunks per worker are in flight
+            formatted_output = utils.bounded_imap(pool, _tokenize_and_format_chunk, paragraphs, 250, 4 * n_workers, args.parallel_buffer * 2**20)
+            tokenized_paragraphs = []
         else:
             tokenized_paragraphs = map(tokenizer.tokenize, paragraphs)
         tokenized_paragraphs = (tp for tp in tokenized_paragraphs if tp)
@@ -70,5 +203,22 @@ def main():
     for tp in tokenized_paragraphs:
         n_tokens += len(tp)
         print("\n".join(tp), "\n", sep="")
+    if formatted_output is not None:
+        sys.stdout.flush()
+        for n, output in formatted_output:
+            n_tokens += n
+            sys.stdout.buffer.write(output)
+        sys.stdout.buffer.flush()
     t1 = time.perf_counter()
     logging.info("Tokenized %d tokens in %d seconds (%d tokens/s)" % (n_tokens, t1 - t0, n_tokens / (t1 - t0)))
+    if pool is not None:
+        pool.close()
+        pool.join()
+    if cache is not None:
+        if args.parallel == 1:
+            logging.info("Cache: %s" % cache.statistics())
+            if getattr(cache, "backing", None) is not None:
+                logging.info("Persistent cache: %s" % cache.backing.statistics())
+        cache.close()
+    if chunk_cache is not None and args.parallel == 1:
+        logging.info("Chunk cache: %s" % chunk_cache.statistics())
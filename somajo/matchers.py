@@ -0,0 +1,746 @@
+#!/usr/bin/env python3
+
+import abc
+import collections
+import functools
+
+import regex as re
+
+
+def _fold(char):
+    """Return the simple case folding of char (or char itself if its
+    case folding consists of more than one character).
+
+    """
+    folded = char.casefold()
+    if len(folded) == 1:
+        return folded
+    folded = char.lower()
+    if len(folded) == 1:
+        return folded
+    return char
+
+
+class _FoldingTable(dict):
+    """Translation table for str.translate that applies _fold to each
+    character (and caches the results).
+
+    """
+
+    def __missing__(self, key):
+        folded = _fold(chr(key))
+        self[key] = folded
+        return folded
+
+
+_folding_table = _FoldingTable()
+
+
+def fold(text):
+    """Apply simple case folding to text. Unlike str.casefold, this
+    preserves the length of text.
+
+    """
+    return text.translate(_folding_table)
+
+
+class Match(object):
+    """A minimal stand-in for regex match objects."""
+
+    __slots__ = ["string", "_start", "_end"]
+
+    def __init__(self, string, start, end):
+        self.string = string
+        self._start = start
+        self._end = end
+
+    def group(self, group=0):
+        return self.string[self._start:self._end]
+
+    def groupdict(self):
+        return {}
+
+    def start(self):
+        return self._start
+
+    def end(self):
+        return self._end
+
+    def span(self):
+        return self._start, self._end
+
+
+class Trie(object):
+    """A character trie for a collection of strings. If ignore_case is
+    set to True, the trie matches case-insensitively (using simple
+    case folding).
+
+    """
+
+    def __init__(self, items, ignore_case=False):
+        self.ignore_case = ignore_case
+        self.root = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        """Add item to the trie."""
+        node = self.root
+        for char in item:
+            child = node.get(char)
+            if child is None:
+                child = {}
+                if self.ignore_case:
+                    # all case variants share the same child node
+                    for variant in set([char, _fold(char), char.lower(), char.upper(), char.title()]):
+                        if len(variant) == 1:
+                            node.setdefault(variant, child)
+                    child = node[char]
+                else:
+                    node[char] = child
+            node = child
+        node[None] = item
+
+    def prefixes(self, text, start=0):
+        """Return the end positions of all items that occur in text at
+        position start, in ascending order.
+
+        """
+        ends = []
+        node = self.root
+        ignore_case = self.ignore_case
+        for i in range(start, len(text)):
+            char = text[i]
+            child = node.get(char)
+            if child is None:
+                if ignore_case and char > "\x7f":
+                    child = node.get(_fold(char))
+                if child is None:
+                    break
+            node = child
+            if None in node:
+                ends.append(i + 1)
+        return ends
+
+    def longest_prefix(self, text, start=0):
+        """Return the end position of the longest item that occurs in text
+        at position start or None.
+
+        """
+        ends = self.prefixes(text, start)
+        if ends:
+            return ends[-1]
+        return None
+
+
+class TokenTrie(object):
+    """A trie of token sequences (e.g. multi-word expressions) with a
+    value for each sequence. The tokens are mapped to integers and the
+    transitions of all nodes are kept in a single dictionary with
+    integer keys, which takes much less memory than a dictionary per
+    node for lexicons with hundreds of thousands of sequences.
+
+    """
+
+    def __init__(self, sequences=(), value=True):
+        self.vocabulary = {}
+        self.transitions = {}
+        self.values = {}
+        self.nodes = 1
+        for sequence in sequences:
+            self.add(sequence, value)
+
+    def __len__(self):
+        return len(self.values)
+
+    def add(self, tokens, value=True):
+        """Add the sequence of tokens with the given value (replacing the
+        value of the sequence if it is already in the trie).
+
+        """
+        if len(tokens) == 0:
+            return
+        node = 0
+        for token in tokens:
+            token_id = self.vocabulary.setdefault(token, len(self.vocabulary))
+            key = node << 32 | token_id
+            child = self.transitions.get(key)
+            if child is None:
+                child = self.nodes
+                self.nodes += 1
+                self.transitions[key] = child
+            node = child
+        self.values[node] = value
+
+    def longest_match(self, tokens, start=0):
+        """Return the end position and the value of the longest sequence
+        that occurs in tokens at position start or None.
+
+        """
+        vocabulary, transitions, values = self.vocabulary, self.transitions, self.values
+        node = 0
+        result = None
+        for i in range(start, len(tokens)):
+            token_id = vocabulary.get(tokens[i])
+            if token_id is None:
+                break
+            node = transitions.get(node << 32 | token_id)
+            if node is None:
+                break
+            value = values.get(node)
+            if value is not None:
+                result = (i + 1, value)
+        return result
+
+    def finditer(self, tokens):
+        """Yield the start and end positions and the values of all
+        non-overlapping sequences in tokens (leftmost, then longest).
+        The time it takes is linear in the number of tokens times the
+        length of the longest sequence.
+
+        """
+        start = 0
+        while start < len(tokens):
+            match = self.longest_match(tokens, start)
+            if match is None:
+                start += 1
+                continue
+            end, value = match
+            yield start, end, value
+            start = end
+
+
+class _Matcher(abc.ABC):
+    """Abstract base class for matchers that can be used in place of
+    compiled regular expressions. Subclasses implement finditer.
+
+    """
+
+    @abc.abstractmethod
+    def finditer(self, text):
+        """Return an iterator over all non-overlapping matches in text."""
+
+    def sub(self, repl, text):
+        """Replace all matches in text with the return value of repl."""
+        pieces = []
+        position = 0
+        for m in self.finditer(text):
+            pieces.append(text[position:m.start()])
+            pieces.append(repl(m))
+            position = m.end()
+        if len(pieces) == 0:
+            return text
+        pieces.append(text[position:])
+        return "".join(pieces)
+
+
+class AbbreviationMatcher(_Matcher):
+    """Find abbreviations using a case-insensitive trie. This is
+    equivalent to (and faster than) the regular expression
+
+        (?<!not_preceded_by)(?:abbreviation_1|abbreviation_2|...)(?!\\p{L}{1,3}\\.)
+
+    where the alternatives are ordered by decreasing length. If
+    letter_sequences is set to True, (?:\\p{L}\\.){2,} is added as the
+    first alternative; if repeat is set to True, the group of
+    alternatives is allowed to repeat, i.e. it is followed by a “+”.
+    The matcher offers the finditer and sub methods of compiled
+    regular expressions, so that it can be used in their place.
+
+    """
+
+    def __init__(self, abbreviations, not_preceded_by=r"[\p{L}.]", letter_sequences=False, repeat=False):
+        self.trie = Trie(abbreviations, ignore_case=True)
+        self.non_letter = re.compile(r"\P{L}")
+        self.letter_sequences = letter_sequences
+        self.repeat = repeat
+        first_chars = set(k for k in self.trie.root if k is not None)
+        first_chars = "".join(re.escape(c) for c in sorted(first_chars))
+        if letter_sequences:
+            first_chars += r"\p{L}"
+        # Candidates are only those positions where the first
+        # non-letter of an abbreviation follows within the maximum
+        # distance (if all abbreviations contain a non-letter)
+        markers = set()
+        distance = 1 if letter_sequences else 0
+        for abbreviation in abbreviations:
+            m = self.non_letter.search(abbreviation)
+            if m is None:
+                markers = None
+                break
+            markers.add(m.group())
+            distance = max(distance, m.start())
+        if letter_sequences and markers is not None:
+            markers.add(".")
+        if markers:
+            markers = "".join(re.escape(c) for c in sorted(markers))
+            self.candidate = re.compile(r"(?<!%s)(?=\p{L}{0,%d}[%s])[%s]" % (not_preceded_by, distance, markers, first_chars))
+        else:
+            self.candidate = re.compile(r"(?<!%s)[%s]" % (not_preceded_by, first_chars))
+        self.letter_sequence = re.compile(r"(?:\p{L}\.){2,}")
+        self.followed_by_abbreviation = re.compile(r"\p{L}{1,3}\.")
+
+    def _alternatives(self, text, start):
+        """Return the end positions of all alternatives that match at
+        position start, in the order in which the regular expression
+        would try them.
+
+        """
+        ends = []
+        if self.letter_sequences:
+            m = self.letter_sequence.match(text, start)
+            if m:
+                ends.extend(range(m.end(), start + 3, -2))
+        ends.extend(reversed(self.trie.prefixes(text, start)))
+        return ends
+
+    def _match(self, text, start):
+        """Return the end position of the match at position start or None.
+        Mimics the backtracking of the regular expression: For each
+        reachable position (in decreasing order), the result is the
+        first alternative that can be extended by further repetitions
+        or that is not followed by the beginning of another
+        abbreviation.
+
+        """
+        if not self.repeat:
+            for end in self._alternatives(text, start):
+                if not self.followed_by_abbreviation.match(text, end):
+                    return end
+            return None
+        alternatives = {}
+        agenda = [start]
+        while len(agenda) > 0:
+            position = agenda.pop()
+            if position not in alternatives:
+                alternatives[position] = self._alternatives(text, position)
+                agenda.extend(alternatives[position])
+        result = {}
+        for position in sorted(alternatives, reverse=True):
+            result[position] = None
+            for end in alternatives[position]:
+                if result[end] is not None:
+                    result[position] = result[end]
+                    break
+                if not self.followed_by_abbreviation.match(text, end):
+                    result[position] = end
+                    break
+        return result[start]
+
+    def finditer(self, text):
+        """Return an iterator over all non-overlapping matches in text."""
+        position = 0
+        for candidate in self.candidate.finditer(text):
+            start = candidate.start()
+            if start < position:
+                continue
+            end = self._match(text, start)
+            if end is not None:
+                yield Match(text, start, end)
+                position = end
+
+
+class AhoCorasick(object):
+    """An Aho-Corasick automaton that finds all occurrences of a set of
+    strings in a single linear scan over the text. Strings can be
+    added at any time; the failure links are recomputed before the
+    next scan.
+
+    """
+
+    def __init__(self, patterns=()):
+        self.goto = [{}]
+        self.depth = [0]
+        self.terminal = [False]
+        self.fail = None
+        self.output = None
+        for pattern in patterns:
+            self.add(pattern)
+
+    def __len__(self):
+        return sum(self.terminal)
+
+    def add(self, pattern):
+        """Add pattern to the automaton."""
+        if len(pattern) == 0:
+            return
+        state = 0
+        for char in pattern:
+            child = self.goto[state].get(char)
+            if child is None:
+                child = len(self.goto)
+                self.goto[state][char] = child
+                self.goto.append({})
+                self.depth.append(self.depth[state] + 1)
+                self.terminal.append(False)
+            state = child
+        self.terminal[state] = True
+        self.fail = None
+
+    def _compile(self):
+        """Compute the failure links and the outputs of all states
+        (breadth-first, so that the failure target of a state is always
+        done before the state itself).
+
+        """
+        goto = self.goto
+        fail = [0] * len(goto)
+        output = [[] for _ in goto]
+        queue = collections.deque(goto[0].values())
+        while len(queue) > 0:
+            state = queue.popleft()
+            if self.terminal[state]:
+                output[state].append(self.depth[state])
+            output[state].extend(output[fail[state]])
+            for char, child in goto[state].items():
+                fallback = fail[state]
+                while fallback != 0 and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[child] = goto[fallback].get(char, 0)
+                queue.append(child)
+        self.fail = fail
+        self.output = output
+        # transitions of the equivalent deterministic automaton,
+        # filled lazily during the scans
+        self.delta = [dict(transitions) for transitions in goto]
+
+    def _transition(self, state, char):
+        """Follow the failure links from state until there is a
+        transition for char and remember the result.
+
+        """
+        target = state
+        while True:
+            child = self.goto[target].get(char)
+            if child is not None:
+                break
+            if target == 0:
+                child = 0
+                break
+            target = self.fail[target]
+        self.delta[state][char] = child
+        return child
+
+    def finditer(self, text):
+        """Yield the start and end positions of all (possibly overlapping)
+        occurrences of the patterns in text, ordered by end position
+        and, for the same end position, by decreasing length.
+
+        """
+        if self.fail is None:
+            self._compile()
+        delta, output = self.delta, self.output
+        state = 0
+        for i, char in enumerate(text):
+            child = delta[state].get(char)
+            if child is None:
+                child = self._transition(state, char)
+            state = child
+            if output[state]:
+                end = i + 1
+                for length in output[state]:
+                    yield end - length, end
+
+
+class LexiconMatcher(_Matcher):
+    """Find the entries of a (possibly very large) lexicon using an
+    Aho-Corasick automaton. This is equivalent to the regular
+    expression
+
+        before(?:entry_1|entry_2|...|extra)after
+
+    where the entries are ordered by decreasing length, but the time
+    it takes depends on the length of the text rather than on the
+    size of the lexicon. before has to be a zero-width assertion;
+    after is matched at the end of an entry and may consume
+    further characters. extra is an optional regular expression that
+    is tried as the last alternative. If extend_left is given (a
+    character class), the matcher is equivalent to
+
+        before{extend_left}+(?:entry_1|entry_2|...)after
+
+    The matcher offers the finditer and sub methods of compiled
+    regular expressions, so that it can be used in their place.
+
+    If every entry contains a non-word character and no whitespace,
+    the automaton only scans those whitespace-delimited chunks of the
+    text that contain one of these characters.
+
+    """
+
+    def __init__(self, lexicon, ignore_case=False, before="", after="", extra=None, extend_left=None):
+        self.ignore_case = ignore_case
+        self.automaton = AhoCorasick()
+        self.anchors = set()
+        self.chunk = None
+        for entry in lexicon:
+            self.add(entry)
+        flags = re.IGNORECASE if ignore_case else 0
+        self.before = re.compile(before, flags) if before else None
+        self.after = re.compile(after, flags) if after else None
+        self.extra = None
+        if extra is not None:
+            self.extra = re.compile(r"%s(?:%s)%s" % (before, extra, after), flags)
+        self.extend_left = None
+        if extend_left is not None:
+            self.extend_left = re.compile(r"(?r)%s+" % extend_left)
+
+    def add(self, entry):
+        """Add entry to the lexicon."""
+        if self.ignore_case:
+            entry = fold(entry)
+        self.automaton.add(entry)
+        if self.anchors is not None:
+            anchors = set(re.findall(r"\W", entry))
+            if len(anchors) == 0 or re.search(r"\s", entry):
+                self.anchors = None
+            else:
+                self.anchors.update(anchors)
+        self.chunk = None
+
+    def warmup(self):
+        """Compute the failure links of the automaton now instead of
+        before the next scan.
+
+        """
+        if self.automaton.fail is None:
+            self.automaton._compile()
+        if self.anchors and self.chunk is None:
+            anchors = "".join(re.escape(c) for c in sorted(self.anchors))
+            self.chunk = re.compile(r"(?<!\S)[^\s%s]*[%s]\S*" % (anchors, anchors), re.IGNORECASE if self.ignore_case else 0)
+
+    def _occurrences(self, text):
+        """Yield the start and end positions of all occurrences of the
+        entries in text.
+
+        """
+        if self.anchors is None:
+            needle = fold(text) if self.ignore_case else text
+            yield from self.automaton.finditer(needle)
+            return
+        if len(self.anchors) == 0:
+            # the lexicon is empty
+            return
+        if self.chunk is None:
+            self.warmup()
+        for chunk in self.chunk.finditer(text):
+            offset = chunk.start()
+            needle = fold(chunk.group()) if self.ignore_case else chunk.group()
+            for start, end in self.automaton.finditer(needle):
+                yield start + offset, end + offset
+
+    def _end(self, text, end):
+        """Return the end of the match if after matches at position end
+        or None.
+
+        """
+        if self.after is None:
+            return end
+        m = self.after.match(text, end)
+        if m:
+            return m.end()
+        return None
+
+    def _candidates(self, text):
+        """Return a dictionary that maps the possible start positions of
+        matches to the end positions of the entries that occur there
+        (in the order in which the regular expression would try them).
+
+        """
+        candidates = {}
+        for start, end in self._occurrences(text):
+            if self.extend_left is not None:
+                # the entry can only be the end of a match if it
+                # precedes a valid end
+                if self._end(text, end) is None:
+                    continue
+                m = self.extend_left.match(text, 0, start)
+                if m is None:
+                    continue
+                for position in range(m.start(), start):
+                    if self.before is None or self.before.match(text, position):
+                        candidates.setdefault(position, []).append(end)
+                        break
+            else:
+                candidates.setdefault(start, []).append(end)
+        return candidates
+
+    def finditer(self, text):
+        """Return an iterator over all non-overlapping matches in text."""
+        candidates = self._candidates(text)
+        extra = {}
+        if self.extra is not None:
+            extra = {m.start(): m.end() for m in self.extra.finditer(text, overlapped=True)}
+            for start in extra:
+                candidates.setdefault(start, [])
+        position = 0
+        for start in sorted(candidates):
+            if start < position:
+                continue
+            if self.extend_left is None and self.before is not None and not self.before.match(text, start):
+                continue
+            match_end = None
+            for end in sorted(candidates[start], reverse=True):
+                match_end = self._end(text, end)
+                if match_end is not None:
+                    break
+            if match_end is None:
+                match_end = extra.get(start)
+            if match_end is not None:
+                yield Match(text, start, match_end)
+                position = match_end
+
+
+class FusedRegex(object):
+    """Several regular expressions that are applied one after the other
+    (like consecutive calls of their sub methods), fused into a
+    single alternation, so that a text without matches is scanned
+    only once. If all matches start with a character from the
+    character class first, scanning is considerably faster.
+
+    If there are matches, the members are only applied to the part
+    of the text between the first and the last whitespace-delimited
+    chunk that contains a match. This gives the same results as
+    applying them to the whole text, provided that their matches do
+    not contain whitespace and their lookarounds do not look beyond
+    the adjacent whitespace character.
+
+    """
+
+    inline_flags = [(re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"), (re.VERBOSE, "x")]
+
+    def __init__(self, members, first=None):
+        self.members = list(members)
+        alternatives = []
+        for member in self.members:
+            # group names are dropped, so that numbered backreferences
+            # work in the branch reset group
+            if "(?P=" in member.pattern:
+                raise ValueError("Named backreferences cannot be fused: %s" % member.pattern)
+            pattern = re.sub(r"\(\?P<\w+>", "(", member.pattern)
+            flags = "".join(letter for flag, letter in self.inline_flags if member.flags & flag)
+            if member.flags & re.VERBOSE:
+                pattern += "\n"
+            alternatives.append("(?%s:%s)" % (flags, pattern) if flags else "(?:%s)" % pattern)
+        lookahead = "(?=%s)" % first if first is not None else ""
+        self.fused_pattern = "%s(?|%s)" % (lookahead, "|".join(alternatives))
+        self.scanner = None
+        self.chunk_start = shared(re.compile, r"(?r)\S*")
+        self.chunk_end = shared(re.compile, r"\S*\s?")
+
+    def warmup(self):
+        """Compile the fused regular expression (and the members, if they
+        are compiled lazily) now instead of when it is used for the
+        first time.
+
+        """
+        if self.scanner is None:
+            self.scanner = shared(re.compile, self.fused_pattern)
+        for member in self.members:
+            if hasattr(member, "warmup"):
+                member.warmup()
+
+    def _window(self, text):
+        """Return the start and end positions of the part of text that
+        contains all matches (or None).
+
+        """
+        if self.scanner is None:
+            self.warmup()
+        first = self.scanner.search(text)
+        if first is None:
+            return None
+        last = first
+        for last in self.scanner.finditer(text, first.end()):
+            pass
+        start = self.chunk_start.match(text, 0, first.start()).start()
+        end = self.chunk_end.match(text, last.end()).end()
+        return start, end
+
+    def sub(self, repl, text):
+        """Apply the sub methods of all members to text."""
+        window = self._window(text)
+        if window is None:
+            return text
+        start, end = window
+        for member in self.members:
+            length = len(text)
+            text = member.sub(repl, text, pos=start, endpos=end)
+            end += len(text) - length
+        return text
+
+
+# The objects created via shared, by factory, arguments and keyword
+# arguments
+_shared = {}
+
+
+def shared(factory, *args, **kwargs):
+    """Return the result of factory(*args, **kwargs), which is only
+    computed once per process for the same (hashable) arguments.
+    This is used for compiled regular expressions and matchers, so
+    that tokenizers with different configurations share them. The
+    objects must not be modified.
+
+    """
+    key = (factory, args, tuple(sorted(kwargs.items())))
+    value = _shared.get(key)
+    if value is None:
+        value = _shared.setdefault(key, factory(*args, **kwargs))
+    return value
+
+
+def shared_objects():
+    """Return a list of the objects that have been created via shared."""
+    return list(_shared.values())
+
+
+class Lazy(object):
+    """A proxy for an object (e.g. a matcher) that is only created by
+    calling factory(*args, **kwargs) when one of its attributes is
+    accessed for the first time. The methods of the object are
+    cached in the proxy, so that later calls are as fast as calls of
+    the object itself.
+
+    """
+
+    def __init__(self, factory, *args, **kwargs):
+        self._factory = functools.partial(factory, *args, **kwargs)
+        self._object = None
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        value = getattr(self.create(), name)
+        if callable(value):
+            setattr(self, name, value)
+        return value
+
+    def __contains__(self, item):
+        return item in self.create()
+
+    def create(self):
+        """Return the object (and create it if necessary)."""
+        if self._object is None:
+            self._object = self._factory()
+        return self._object
+
+    def warmup(self):
+        """Create the object now (and warm it up if it supports that)."""
+        warmup = getattr(self.create(), "warmup", None)
+        if warmup is not None:
+            warmup()
+
+
+class LazyPattern(Lazy):
+    """A regular expression that is only compiled when it is used for
+    the first time. The pattern and the flags are available without
+    compiling it. Patterns are compiled only once per process (see
+    shared).
+
+    """
+
+    def __init__(self, pattern, flags=0):
+        super().__init__(shared, re.compile, pattern, flags)
+        self.pattern = pattern
+        self.flags = flags
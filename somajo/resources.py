@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+
+"""Precompiled bundle of the lexicons that come with SoMaJo.
+
+The lexicons are plain text files in the package directory. Reading
+them means parsing, deduplicating and sorting every file again in
+every process. The bundle stores the processed entries of all
+lexicons in a single binary file that is memory-mapped, so that
+parallel processes share one copy of the data in the page cache
+(each process still decodes the lexicons it uses). If the bundle is
+missing or one of the text files is newer than the bundle, a bundle
+is built in the user's cache directory ($XDG_CACHE_HOME/somajo) and
+used instead; its file name contains the checksum of the package
+directory. The package directory is never written to at runtime.
+
+This module only uses the standard library, so that setup.py can
+build the bundle (when the package is built) before the dependencies
+are installed. To build it manually (e.g. in a source checkout), run
+
+    python3 -m somajo.resources
+
+Format (all integers little-endian): the magic string, the format
+version and the number of lexicons (uint32 each), then for each
+lexicon the length of its file name (uint16), the UTF-8-encoded file
+name, the offset and length of its data (uint64 each). The data of a
+lexicon are its entries in the order of read_lexicon_file, encoded
+as UTF-8 and separated by newlines.
+
+"""
+
+import mmap
+import os
+import struct
+import sys
+import warnings
+
+MAGIC = b"SoMaJoLX"
+FORMAT_VERSION = 1
+BUNDLE = "lexicons.bin"
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+_header = struct.Struct("<II")
+_name_length = struct.Struct("<H")
+_location = struct.Struct("<QQ")
+
+
+def read_lexicon_file(path):
+    """Return the entries of the lexicon file (without comments and
+    duplicates), sorted by decreasing length.
+
+    """
+    entries = set()
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if line.startswith("#"):
+                continue
+            if line == "":
+                continue
+            entries.add(line)
+    return sorted(entries, key=len, reverse=True)
+
+
+def lexicon_files(directory=DIRECTORY):
+    """Return the names of the lexicon files in directory."""
+    return sorted(f for f in os.listdir(directory) if f.endswith(".txt"))
+
+
+def build_bundle(directory=DIRECTORY, bundle=None):
+    """Write the bundle of all lexicons in directory. The file is
+    replaced atomically, so that processes that read it at the same
+    time see either the old or the new version.
+
+    """
+    if bundle is None:
+        bundle = os.path.join(directory, BUNDLE)
+    names = lexicon_files(directory)
+    data = [("\n".join(read_lexicon_file(os.path.join(directory, name)))).encode("utf-8") for name in names]
+    encoded_names = [name.encode("utf-8") for name in names]
+    offset = len(MAGIC) + _header.size + sum(_name_length.size + len(name) + _location.size for name in encoded_names)
+    parts = [MAGIC, _header.pack(FORMAT_VERSION, len(names))]
+    for name, blob in zip(encoded_names, data):
+        parts.extend([_name_length.pack(len(name)), name, _location.pack(offset, len(blob))])
+        offset += len(blob)
+    parts.extend(data)
+    temporary = "%s.%d.tmp" % (bundle, os.getpid())
+    with open(temporary, "wb") as fh:
+        fh.write(b"".join(parts))
+    os.replace(temporary, bundle)
+
+
+class Bundle(object):
+    """A memory-mapped bundle of lexicons."""
+
+    def __init__(self, path):
+        with open(path, "rb") as fh:
+            self.data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(MAGIC)] != MAGIC:
+            raise ValueError("Not a lexicon bundle: %s" % path)
+        position = len(MAGIC)
+        version, n = _header.unpack_from(self.data, position)
+        if version != FORMAT_VERSION:
+            raise ValueError("Unsupported bundle format version %d: %s" % (version, path))
+        position += _header.size
+        self.locations = {}
+        for _ in range(n):
+            length, = _name_length.unpack_from(self.data, position)
+            position += _name_length.size
+            name = self.data[position:position + length].decode("utf-8")
+            position += length
+            self.locations[name] = _location.unpack_from(self.data, position)
+            position += _location.size
+
+    def __contains__(self, name):
+        return name in self.locations
+
+    def lexicon(self, name):
+        """Return the entries of the lexicon from the file name (decoded
+        anew on every call).
+
+        """
+        offset, length = self.locations[name]
+        if length == 0:
+            return []
+        return self.data[offset:offset + length].decode("utf-8").split("\n")
+
+
+def is_stale(directory=DIRECTORY, bundle=None):
+    """Return True if the bundle does not exist or if one of the lexicon
+    files is newer than the bundle.
+
+    """
+    if bundle is None:
+        bundle = os.path.join(directory, BUNDLE)
+    try:
+        built = os.path.getmtime(bundle)
+    except OSError:
+        return True
+    return any(os.path.getmtime(os.path.join(directory, name)) > built for name in lexicon_files(directory))
+
+
+def load_bundle(directory=DIRECTORY, bundle=None):
+    """Return the bundle of the lexicons in directory. Return None if
+    it is stale (see is_stale) or cannot be read.
+
+    """
+    if bundle is None:
+        bundle = os.path.join(directory, BUNDLE)
+    try:
+        if is_stale(directory, bundle):
+            return None
+        return Bundle(bundle)
+    except (OSError, ValueError):
+        return None
+
+
+def cache_directory():
+    """Return the directory for bundles built at runtime:
+    $XDG_CACHE_HOME/somajo, by default ~/.cache/somajo.
+
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "somajo")
+
+
+def load_cached_bundle(directory=DIRECTORY, cache=None):
+    """Return a bundle of the lexicons in directory from the directory
+    cache (by default cache_directory()), building it first if it does
+    not exist. The file name contains the checksum of directory, so
+    that a bundle is never stale. Return None if the bundle can
+    neither be built nor read.
+
+    """
+    if cache is None:
+        cache = cache_directory()
+    bundle = os.path.join(cache, "lexicons-%d-%s.bin" % (FORMAT_VERSION, checksum(directory)))
+    try:
+        if not os.path.exists(bundle):
+            os.makedirs(cache, exist_ok=True)
+            build_bundle(directory, bundle)
+        return Bundle(bundle)
+    except (OSError, ValueError):
+        return None
+
+
+_bundle = None
+_bundle_loaded = False
+
+
+def read_lexicon(filename):
+    """Return the entries of the lexicon from the file filename in the
+    package directory, preferably from the bundle.
+
+    """
+    global _bundle, _bundle_loaded
+    if not _bundle_loaded:
+        _bundle = load_bundle()
+        if _bundle is None:
+            # e.g. a source checkout or edited lexicon files
+            _bundle = load_cached_bundle()
+        if _bundle is None:
+            warnings.warn("The lexicon bundle is missing or stale and cannot be built in %s; reading the lexicon files instead" % cache_directory())
+        _bundle_loaded = True
+    if _bundle is not None and filename in _bundle:
+        return _bundle.lexicon(filename)
+    return read_lexicon_file(os.path.join(DIRECTORY, filename))
+
+
+_checksum = None
+
+
+def checksum(directory=DIRECTORY):
+    """Return a hex digest of the lexicon files and the source code in
+    directory, i.e. of everything that determines the output of the
+    tokenizer.
+
+    """
+    global _checksum
+    if directory == DIRECTORY and _checksum is not None:
+        return _checksum
+    # imported here, so that importing somajo does not load it
+    import hashlib
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".txt") or name.endswith(".py"):
+            digest.update(name.encode("utf-8") + b"\0")
+            with open(os.path.join(directory, name), "rb") as fh:
+                digest.update(fh.read())
+            digest.update(b"\0")
+    result = digest.hexdigest()
+    if directory == DIRECTORY:
+        _checksum = result
+    return result
+
+
+if __name__ == "__main__":
+    build_bundle()
+    print("Wrote %s" % os.path.join(DIRECTORY, BUNDLE), file=sys.stderr)
@@ -19,7 +19,7 @@ class SentenceSplitter(object):
             self.closing_punct = re.compile(r"^(?:['\"“\p{Pf}\p{Pe}])$")
         else:
             self.closing_punct = re.compile(r"^(?:['\"\p{Pf}\p{Pe}])$")
-        self.eos_abbreviations = utils.read_abbreviation_file("eos_abbreviations.txt")
+        self.eos_abbreviations = utils.Lexicon.load("eos_abbreviations.txt").folded()
 
     def split(self, tokenized_paragraph):
         """Split tokenized_paragraph into sentences."""
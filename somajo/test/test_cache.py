@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from somajo import Tokenizer
+from somajo.cache import ParagraphCache, PersistentCache
+
+
+class TestParagraphCache(unittest.TestCase):
+    """"""
+    def test_paragraph_cache_01(self):
+        cache = ParagraphCache(max_entries=2)
+        cache.put("a", ("a",))
+        cache.put("b", ("b",))
+        self.assertEqual(cache.get("a"), ("a",))
+        cache.put("c", ("c",))
+        self.assertNotIn("b", cache)
+        self.assertIn("a", cache)
+        self.assertEqual((cache.hits, cache.misses, cache.evictions), (1, 0, 1))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.misses, 1)
+
+    def test_paragraph_cache_02(self):
+        cache = ParagraphCache(max_entries=None, max_bytes=1000)
+        for i in range(100):
+            cache.put(str(i), ("token %d" % i,))
+        self.assertLessEqual(cache.size, 1000)
+        self.assertEqual(len(cache) + cache.evictions, 100)
+        cache.put("large", ("x" * 1000,))
+        self.assertNotIn("large", cache)
+
+    def test_paragraph_cache_03(self):
+        cache = ParagraphCache(max_entries=5, max_bytes=None)
+        cache.put("a", ("a",))
+        copy = pickle.loads(pickle.dumps(cache))
+        self.assertEqual((len(copy), copy.max_entries, copy.max_bytes), (0, 5, None))
+
+    def test_paragraph_cache_04(self):
+        backing = ParagraphCache()
+        backing.put("a", ("a",))
+        cache = ParagraphCache(backing=backing)
+        self.assertEqual(cache.get("a"), ("a",))
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+        self.assertIn("a", cache)
+        self.assertEqual(cache.get("a"), ("a",))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        self.assertEqual((backing.hits, backing.misses), (1, 1))
+        cache.put("b", ("b",))
+        self.assertIn("b", backing)
+
+
+class TestPersistentCache(unittest.TestCase):
+    """"""
+    def setUp(self):
+        """Necessary preparations"""
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "cache.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_persistent_cache_01(self):
+        cache = PersistentCache(self.path)
+        cache.put(("config", "Das ist ein Test."), (("Das", "regular"), ("Test", "regular")))
+        self.assertEqual(cache.get(("config", "Das ist ein Test.")), (("Das", "regular"), ("Test", "regular")))
+        cache.close()
+        cache = PersistentCache(self.path)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.get(("config", "Das ist ein Test.")), (("Das", "regular"), ("Test", "regular")))
+        self.assertIsNone(cache.get(("other config", "Das ist ein Test.")))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        # entries from other versions are not used
+        cache.namespace = b"other version"
+        self.assertIsNone(cache.get(("config", "Das ist ein Test.")))
+        cache.close()
+
+    def test_persistent_cache_02(self):
+        cache = PersistentCache(self.path, max_bytes=100, commit_every=1)
+        for i in range(20):
+            cache.put(i, ("token %d" % i,))
+        self.assertLessEqual(cache.size, 100)
+        self.assertEqual(len(cache) + cache.evictions, 20)
+        self.assertEqual(cache.get(19), ("token 19",))
+        self.assertIsNone(cache.get(0))
+        cache.close()
+
+    def test_persistent_cache_03(self):
+        cache = PersistentCache(self.path)
+        tokenizer = Tokenizer(extra_info=True, cache=cache)
+        tokens = tokenizer.tokenize("Ein Test:-)")
+        self.assertEqual(tokenizer.tokenize("Ein Test:-)"), tokens)
+        self.assertEqual(cache.hits, 1)
+        copy = pickle.loads(pickle.dumps(cache))
+        cache.close()
+        self.assertEqual(copy.get((tokenizer.configuration, "Ein Test:-)")), tuple(tokens))
+        copy.close()
+
+    def test_persistent_cache_04(self):
+        # several handles (e.g. worker processes) share the limit
+        first = PersistentCache(self.path, max_bytes=100, commit_every=1)
+        second = PersistentCache(self.path, max_bytes=100, commit_every=1)
+        for i in range(20):
+            first.put(i, ("token %d" % i,))
+            second.put(-i, ("token %d" % -i,))
+        self.assertLessEqual(first.size, 100)
+        self.assertEqual(second.size, first.size)
+        self.assertEqual(len(second), len(first))
+        self.assertEqual(second.get(-19), ("token -19",))
+        first.close()
+        second.close()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from somajo import Tokenizer
+from somajo.cache import ParagraphCache
+from somajo.test import test_tokenizer
+
+
+# one cache for all tests, so that chunks are also taken from it
+_chunk_cache = ParagraphCache()
+
+
+# The tokenizer tests whose paragraphs mix memoizable word chunks
+# with digits, punctuation, abbreviations, contractions or extra
+# spaces, i.e. where memoizing chunks could change the output
+MIRRORED = (
+    test_tokenizer.TestWhitespace,
+    test_tokenizer.TestPunctuation,
+    test_tokenizer.TestTimeDate,
+    test_tokenizer.TestAbbreviations,
+    test_tokenizer.TestContractions,
+    test_tokenizer.TestCamelCase,
+    test_tokenizer.OwnAdditions,
+    test_tokenizer.TestMisc,
+    test_tokenizer.TestEnglish,
+)
+
+# These already fail without the chunk cache and are reported by
+# test_tokenizer
+KNOWN_FAILURES = {
+    "OwnAdditions": ("test_own_103",),
+    "TestMisc": ("test_misc_06",),
+    "TestPunctuation": ("test_punctuation_16", "test_punctuation_41"),
+}
+
+
+def _expected_failure(test):
+    """Mark test as an expected failure without marking the inherited
+    method.
+
+    """
+    def wrapper(self):
+        test(self)
+    return unittest.expectedFailure(wrapper)
+
+
+def _chunk_cache_test_case(test_case):
+    """Derive a test case from test_case whose tokenizer is an
+    equivalently configured tokenizer that memoizes chunks.
+
+    """
+    def setUp(self):
+        test_case.setUp(self)
+        t = self.tokenizer
+        self.tokenizer = Tokenizer(t.split_camel_case, t.token_classes, t.extra_info, t.language, cache=t.cache, chunk_cache=_chunk_cache)
+    attributes = {"setUp": setUp}
+    for name in KNOWN_FAILURES.get(test_case.__name__, ()):
+        attributes[name] = _expected_failure(getattr(test_case, name))
+    return type("ChunkCache" + test_case.__name__, (test_case,), attributes)
+
+
+# Memoizing chunks must not change the output
+for test_case in MIRRORED:
+    globals()["ChunkCache" + test_case.__name__] = _chunk_cache_test_case(test_case)
+
+
+class TestChunkCache(unittest.TestCase):
+    """"""
+    def setUp(self):
+        """Necessary preparations"""
+        self.chunk_cache = ParagraphCache()
+        self.tokenizer = Tokenizer(token_classes=True, extra_info=True, language="en", chunk_cache=self.chunk_cache)
+        self.reference = Tokenizer(token_classes=True, extra_info=True, language="en")
+
+    def _equal(self, raw):
+        tokenized = self.reference.tokenize(raw)
+        self.assertEqual(self.tokenizer.tokenize(raw), tokenized)
+        self.assertEqual(self.tokenizer.tokenize(raw), tokenized)
+
+    def test_chunk_cache_01(self):
+        self._equal("Hello world, hello world!")
+        self.assertEqual(len(self.chunk_cache), 4)
+        self.assertEqual((self.chunk_cache.hits, self.chunk_cache.misses), (4, 4))
+
+    def test_chunk_cache_02(self):
+        # units, a.m./p.m., "no." and "ps." depend on the neighbouring numbers
+        self._equal("It was 5 kg at 5 pm, see no. 5 or 3 ps. ok")
+        self.assertEqual(sorted(key[1] for key in self.chunk_cache.entries), ["It", "ok", "see"])
+
+    def test_chunk_cache_03(self):
+        # chunks are not memoized in paragraphs with context characters
+        self._equal("foo [at] bar [dot] de")
+        self._equal("_foo bar_ (a b c) 'x y'")
+        self.assertEqual(len(self.chunk_cache), 0)
+
+    def test_chunk_cache_04(self):
+        self._equal("x  y\n:-) \x1cz \ufe0f ^3 foo\u200b bar")
+        self._equal("\ue000 foo 5 bar")
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+
+import unittest
+
+import regex as re
+
+from somajo.matchers import AbbreviationMatcher, AhoCorasick, FusedRegex, Lazy, LazyPattern, LexiconMatcher, TokenTrie, Trie, shared
+from somajo.tokenizer import Tokenizer
+
+
+class TestTrie(unittest.TestCase):
+    """"""
+    def test_trie_01(self):
+        trie = Trie(["z.", "z.B.", "usw."])
+        self.assertEqual(trie.prefixes("z.B. foo", 0), [2, 4])
+
+    def test_trie_02(self):
+        trie = Trie(["z.B."])
+        self.assertEqual(trie.prefixes("Z.b.", 0), [])
+
+    def test_trie_03(self):
+        trie = Trie(["z.B.", "Österr."], ignore_case=True)
+        self.assertEqual(trie.prefixes("Z.b.", 0), [4])
+        self.assertEqual(trie.longest_prefix("aus ÖSTERR.", 4), 11)
+
+    def test_trie_04(self):
+        trie = Trie(["Dipl.-Ing."], ignore_case=True)
+        self.assertEqual(trie.longest_prefix("Dipl.-Inf.", 0), None)
+
+
+class TestTokenTrie(unittest.TestCase):
+    """"""
+    def setUp(self):
+        """Necessary preparations"""
+        self.trie = TokenTrie([["New", "York"], ["New", "York", "Times"], ["Yahoo", "!"]], "multiword")
+
+    def test_token_trie_01(self):
+        self.assertEqual(self.trie.longest_match(["New", "York", "Times", "!"]), (3, "multiword"))
+        self.assertEqual(self.trie.longest_match(["New", "York", "City"]), (2, "multiword"))
+        self.assertIsNone(self.trie.longest_match(["New", "Jersey"]))
+
+    def test_token_trie_02(self):
+        self.trie.add(["Deutsche", "Bank"], "company")
+        tokens = "in New New York bei Deutsche Bank und Yahoo !".split()
+        self.assertEqual(list(self.trie.finditer(tokens)), [(2, 4, "multiword"), (5, 7, "company"), (8, 10, "multiword")])
+        self.assertEqual(len(self.trie), 4)
+
+
+class TestAbbreviationMatcher(unittest.TestCase):
+    """"""
+    def setUp(self):
+        """Necessary preparations"""
+        self.abbreviations = ["Dipl.-Ing.", "usw.", "Nr.", "bzw.", "ca.", "Str."]
+        self.regex = re.compile(r"(?<![\p{L}.])(?:(?:(?:\p{L}\.){2,})|" + r'|'.join([re.escape(_) for _ in self.abbreviations]) + r")+(?!\p{L}{1,3}\.)", re.IGNORECASE)
+        self.matcher = AbbreviationMatcher(self.abbreviations, letter_sequences=True, repeat=True)
+
+    def _equal(self, text):
+        """"""
+        self.assertEqual([m.span() for m in self.matcher.finditer(text)], [m.span() for m in self.regex.finditer(text)])
+
+    def test_abbreviation_matcher_01(self):
+        self._equal("Das ist z.B. ein Dipl.-Ing. usw.")
+
+    def test_abbreviation_matcher_02(self):
+        self._equal("usw.bzw.ca. Nr.abc. USW. z.B.Str.")
+
+    def test_abbreviation_matcher_03(self):
+        self._equal("a.b.c.de. Nr.5 ca.fo. .usw. xusw.")
+
+    def test_abbreviation_matcher_04(self):
+        self.assertEqual(self.matcher.sub(lambda m: "<%s>" % m.group(), "ca. 5 bzw. 6"), "<ca.> 5 <bzw.> 6")
+
+    def test_abbreviation_matcher_05(self):
+        text = "keine Abkürzungen"
+        self.assertIs(self.matcher.sub(lambda m: "", text), text)
+
+    def test_abbreviation_matcher_06(self):
+        matcher = AbbreviationMatcher([".Net", "C#", "o.k."], not_preceded_by=r"[\w.]")
+        self.assertEqual([m.group() for m in matcher.finditer("C# und .NET sind O.K.")], ["C#", ".NET", "O.K."])
+
+
+class TestAhoCorasick(unittest.TestCase):
+    """"""
+    def test_aho_corasick_01(self):
+        automaton = AhoCorasick(["he", "she", "his", "hers"])
+        self.assertEqual(list(automaton.finditer("ushers")), [(1, 4), (2, 4), (2, 6)])
+
+    def test_aho_corasick_02(self):
+        automaton = AhoCorasick(["a", "aa"])
+        self.assertEqual(list(automaton.finditer("aaa")), [(0, 1), (0, 2), (1, 2), (1, 3), (2, 3)])
+
+    def test_aho_corasick_03(self):
+        automaton = AhoCorasick(["foo"])
+        self.assertEqual(list(automaton.finditer("bar")), [])
+        automaton.add("ar")
+        self.assertEqual(list(automaton.finditer("bar")), [(1, 3)])
+
+
+class TestLexiconMatcher(unittest.TestCase):
+    """"""
+    def _equal(self, matcher, regex, text):
+        """"""
+        self.assertEqual([m.span() for m in matcher.finditer(text)], [m.span() for m in regex.finditer(text)])
+
+    def test_lexicon_matcher_01(self):
+        lexicon = ["AT&T", "C&A", "E+", "&K"]
+        matcher = LexiconMatcher(lexicon, ignore_case=True, before=r"(?<!\w)", after=r"(?!\w)")
+        regex = re.compile(r"(?<!\w)(?:" + r"|".join([re.escape(_) for _ in lexicon]) + r")(?!\w)", re.IGNORECASE)
+        self._equal(matcher, regex, "at&t und C&A, E+ E+x &K xAT&T")
+
+    def test_lexicon_matcher_02(self):
+        lexicon = ["SmackDown!", "Yahoo!", "C'est", "Mac-OS"]
+        matcher = LexiconMatcher(lexicon, before=r"\b", after=r"\b", extra=r":Mac\p{Lu}\p{Ll}*")
+        regex = re.compile(r"\b(?:" + r"|".join([re.escape(_) for _ in lexicon]) + r"|:Mac\p{Lu}\p{Ll}*)\b")
+        self._equal(matcher, regex, "Yahoo!x SmackDown! C'est Mac-OSX Mac-OS x:MacDonald :MacDonald")
+
+    def test_lexicon_matcher_03(self):
+        lexicon = ["counter", "co", "e"]
+        matcher = LexiconMatcher([prefix + "-" for prefix in lexicon], ignore_case=True, before=r"(?<![\w-])", after=r"[\w-]+")
+        regex = re.compile(r"(?<![\w-])(?:" + r"|".join([re.escape(_) for _ in lexicon]) + r")-[\w-]+", re.IGNORECASE)
+        self._equal(matcher, regex, "Counter-attack co-operate e- e-mail-x re-enter")
+
+    def test_lexicon_matcher_04(self):
+        lexicon = ["ization", "ize", "er"]
+        matcher = LexiconMatcher(["-" + suffix for suffix in lexicon], ignore_case=True, before=r"\b", after=r"(?![\w-])", extend_left=r"[\w-]")
+        regex = re.compile(r"\b[\w-]+-(?:" + r"|".join([re.escape(_) for _ in lexicon]) + r")(?![\w-])", re.IGNORECASE)
+        self._equal(matcher, regex, "-foo-ize bar-baz-ER -er a-izer --x-ization")
+
+    def test_lexicon_matcher_05(self):
+        matcher = LexiconMatcher(["x-ray"], ignore_case=True, before=r"\b", after=r"\b")
+        text = "keine Treffer"
+        self.assertIs(matcher.sub(lambda m: "", text), text)
+        matcher.add("Treffer")
+        self.assertEqual(matcher.sub(lambda m: "<%s>" % m.group(), "X-Ray Treffer"), "<X-Ray> <Treffer>")
+
+    def test_lexicon_matcher_06(self):
+        matcher = LexiconMatcher((), ignore_case=True, before=r"(?<!\w)", after=r"(?!\w)")
+        matcher.warmup()
+        self.assertEqual(list(matcher.finditer("F# und G#")), [])
+        matcher.add("G#")
+        self.assertEqual([m.span() for m in matcher.finditer("F# und G#")], [(7, 9)])
+
+
+class TestFusedRegex(unittest.TestCase):
+    """"""
+    def _equal(self, members, repl, text, first=None):
+        """"""
+        sequential = text
+        for member in members:
+            sequential = member.sub(repl, sequential)
+        self.assertEqual(FusedRegex(members, first=first).sub(repl, text), sequential)
+
+    def test_fused_regex_01(self):
+        members = [re.compile(r'&(?:quot|amp|apos|lt|gt);', re.IGNORECASE), re.compile(r'&#\d+;'), re.compile(r'&#x[0-9a-f]+;', re.IGNORECASE)]
+        self._equal(members, lambda m: " <%s> " % m.group(), "a&amp;b &#123; &#X1f; &#xzz; &AMP", first="&")
+
+    def test_fused_regex_02(self):
+        members = [re.compile(r"\b(gon)(na)\b", re.IGNORECASE), re.compile(r"\b(i)(m)\b", re.IGNORECASE), re.compile(r"(?<!\w)(['’]t)(is)\b", re.IGNORECASE)]
+        self._equal(members, r" \1 \2 ", "Im gonna go, 'tis Gonnax im")
+
+    def test_fused_regex_03(self):
+        members = [re.compile(r'(?<![\d.]) (?P<a_year>\d{4}) (?P<b_month_or_day>([/-])\d{1,2}) (?P<c_day_or_month>\3\d{1,2}) (?![\d.])', re.VERBOSE),
+                   re.compile(r'(?<![\d.]) (?P<a_day_or_month>\d{1,2}([./-])) (?P<b_day_or_month>\d{1,2}\2) (?![\d.])', re.VERBOSE)]
+        self._equal(members, lambda m: "|".join(m.groupdict().values()), "Am 2019-11-08 und 8.11. oder 2019/11-08 um 1.2.3", first=r"\d")
+
+    def test_fused_regex_04(self):
+        fused = FusedRegex([re.compile(r"\bfoo\b")])
+        text = "keine Treffer"
+        self.assertIs(fused.sub("bar", text), text)
+
+    def test_fused_regex_05(self):
+        self.assertRaises(ValueError, FusedRegex, [re.compile(r"(?P<x>a)(?P=x)")])
+
+    def test_fused_regex_06(self):
+        # the prefilter of the two-part contractions lets all of them through
+        tokenizer = Tokenizer(language="en")
+        words = "alot gonna gotta lemme outta wanna c'mon more'n d'ye 'tis ’twas theres im youre hes shes aint arent isnt dont doesnt didnt ive youve theyve havent hasnt cannot cant couldnt wont wouldnt youll lets".split()
+        self.assertEqual(len(words), len(tokenizer.en_twopart_contractions))
+        for word in words + [w.upper() for w in words]:
+            sequential = word
+            for member in tokenizer.en_twopart_contractions:
+                sequential = member.sub(r" \1 \2 ", sequential)
+            self.assertNotEqual(sequential, word)
+            self.assertEqual(tokenizer.en_twopart_contraction.sub(r" \1 \2 ", word), sequential)
+
+
+class TestLazy(unittest.TestCase):
+    """"""
+    def test_lazy_01(self):
+        pattern = LazyPattern(r"\bfoo\b", re.IGNORECASE)
+        self.assertEqual(pattern.pattern, r"\bfoo\b")
+        self.assertIsNone(pattern._object)
+        self.assertEqual(pattern.sub("bar", "Foo food foo"), "bar food bar")
+        self.assertIsNotNone(pattern._object)
+
+    def test_lazy_02(self):
+        matcher = Lazy(LexiconMatcher, ["C&A"], ignore_case=True, before=r"(?<!\w)", after=r"(?!\w)")
+        self.assertIsNone(matcher._object)
+        matcher.warmup()
+        self.assertIsNotNone(matcher._object)
+        self.assertEqual([m.group() for m in matcher.finditer("c&a und C&A")], ["c&a", "C&A"])
+
+    def test_lazy_03(self):
+        fused = FusedRegex([LazyPattern(r"a"), LazyPattern(r"b")])
+        self.assertEqual(fused.sub("x", "abc"), "xxc")
+
+    def test_lazy_04(self):
+        self.assertIs(LazyPattern(r"\bfoo\b", re.IGNORECASE).create(), LazyPattern(r"\bfoo\b", re.IGNORECASE).create())
+        self.assertIsNot(LazyPattern(r"\bfoo\b").create(), LazyPattern(r"\bfoo\b", re.IGNORECASE).create())
+        matcher = shared(LexiconMatcher, ("C&A",), ignore_case=True)
+        self.assertIs(shared(LexiconMatcher, ("C&A",), ignore_case=True), matcher)
+        self.assertIsNot(shared(LexiconMatcher, ("C&A",)), matcher)
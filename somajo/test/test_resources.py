@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from somajo import resources
+
+
+class TestBundle(unittest.TestCase):
+    """"""
+    def setUp(self):
+        """Necessary preparations"""
+        self.directory = tempfile.mkdtemp()
+        self.bundle = os.path.join(self.directory, resources.BUNDLE)
+        self._write("a.txt", "# comment\nNr.\nusw.\n\nNr.\n")
+        self._write("b.txt", "# empty\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, name, text):
+        with open(os.path.join(self.directory, name), "w", encoding="utf-8") as fh:
+            fh.write(text)
+
+    def test_bundle_01(self):
+        self.assertIsNone(resources.load_bundle(self.directory))
+        resources.build_bundle(self.directory)
+        bundle = resources.load_bundle(self.directory)
+        self.assertEqual(bundle.lexicon("a.txt"), ["usw.", "Nr."])
+        self.assertEqual(bundle.lexicon("b.txt"), [])
+        self.assertNotIn("c.txt", bundle)
+
+    def test_bundle_02(self):
+        resources.build_bundle(self.directory)
+        self.assertFalse(resources.is_stale(self.directory))
+        os.utime(self.bundle, (0, 0))
+        self.assertTrue(resources.is_stale(self.directory))
+        # a stale bundle is neither used nor rebuilt
+        self.assertIsNone(resources.load_bundle(self.directory))
+        self.assertTrue(resources.is_stale(self.directory))
+
+    def test_bundle_03(self):
+        with open(self.bundle, "wb") as fh:
+            fh.write(resources.MAGIC + b"\xff\x00\x00\x00\x00\x00\x00\x00")
+        self.assertIsNone(resources.load_bundle(self.directory))
+
+    def test_bundle_04(self):
+        cache = os.path.join(self.directory, "cache")
+        bundle = resources.load_cached_bundle(self.directory, cache)
+        self.assertEqual(bundle.lexicon("a.txt"), ["usw.", "Nr."])
+        self.assertEqual(len(os.listdir(cache)), 1)
+        self.assertEqual(resources.load_cached_bundle(self.directory, cache).lexicon("a.txt"), ["usw.", "Nr."])
+        self.assertEqual(len(os.listdir(cache)), 1)
+        # a changed lexicon gets a new bundle
+        self._write("b.txt", "z.B.\n")
+        self.assertEqual(resources.load_cached_bundle(self.directory, cache).lexicon("b.txt"), ["z.B."])
+        self.assertEqual(len(os.listdir(cache)), 2)
+        # the cache directory cannot be created
+        self.assertIsNone(resources.load_cached_bundle(self.directory, os.path.join(self.directory, "a.txt", "cache")))
+
+    def test_bundle_05(self):
+        for name in resources.lexicon_files():
+            self.assertEqual(sorted(resources.read_lexicon(name)), sorted(resources.read_lexicon_file(os.path.join(resources.DIRECTORY, name))))
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+
+
+def _run(code):
+    """Run code in a fresh interpreter and return its output."""
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+
+
+class TestStartup(unittest.TestCase):
+    """"""
+    def test_startup_01(self):
+        modules = _run("import sys, somajo; print(' '.join(sorted(sys.modules)))").split()
+        for module in ["regex", "sqlite3", "multiprocessing", "xml.etree.ElementTree", "somajo.tokenizer", "somajo.sentence_splitter", "somajo.cache"]:
+            self.assertNotIn(module, modules)
+
+    def test_startup_02(self):
+        output = _run("import somajo; print('Tokenizer' in dir(somajo), somajo.Tokenizer.__module__, somajo.SentenceSplitter.__module__, somajo.PersistentCache.__module__)")
+        self.assertEqual(output.split(), ["True", "somajo.tokenizer", "somajo.sentence_splitter", "somajo.cache"])
+
+    def test_startup_03(self):
+        # tokenizing a paragraph does not need the modules for caching,
+        # parallel processing, XML or sentence splitting (the startup
+        # time is measured by utils/benchmark.py startup)
+        modules = _run("import sys; from somajo import Tokenizer; Tokenizer().tokenize('Das ist z.B. ein Test mit 3 Zahlen, C&A und :-) am 12.3.2020.'); print(' '.join(sorted(sys.modules)))").split()
+        for module in ["sqlite3", "multiprocessing", "xml.etree.ElementTree", "somajo.sentence_splitter", "somajo.cache"]:
+            self.assertNotIn(module, modules)
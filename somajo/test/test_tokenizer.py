@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
 
+import os
+import shutil
+import tempfile
 import unittest
 
 from somajo import Tokenizer
+from somajo.cache import ParagraphCache
 
 
 class TestTokenizer(unittest.TestCase):
@@ -551,6 +555,12 @@ class TestEmoticons(TestTokenizer):
     def test_emoticons_32(self):
         self._equal("stage ️ bf0eb1c8cf477518ebdf43469b3246d1 https://t.co/TjNdsPqfr9", "stage bf0eb1c8cf477518ebdf43469b3246d1 https://t.co/TjNdsPqfr9")
 
+    def test_emoticons_33(self):
+        self._equal("Cafe\u0301 \U0001F44D\U0001F3FD\U0001F44D nq\u0301ja \u2764\uFE0F " * 2, "Caf\u00E9 \U0001F44D\U0001F3FD \U0001F44D nq\u0301ja \u2764\uFE0F Caf\u00E9 \U0001F44D\U0001F3FD \U0001F44D nq\u0301ja \u2764\uFE0F")
+
+    def test_emoticons_34(self):
+        self._equal("lol 😀" * 2000, " ".join(["lol", "😀"] * 2000))
+
 
 class TestActions(TestTokenizer):
     """"""
@@ -936,24 +946,27 @@ class OwnAdditions(TestTokenizer):
         self._equal("IP-Adresse des Routers: 192.0.2.42.", "IP-Adresse des Routers : 192.0.2.42 .")
 
 
-class TestSuffixes(TestTokenizer):
+class TestPlaceholders(TestTokenizer):
     """"""
-    def test_suffixes_01(self):
+    def test_placeholders_01(self):
         self.tokenizer.replacement_counter = 0
-        self.assertEqual(self.tokenizer._get_unique_suffix(), "aaaaaaa")
+        self.assertEqual(self.tokenizer._get_unique_string(), "\uE000")
 
-    def test_suffixes_02(self):
+    def test_placeholders_02(self):
         self.tokenizer.replacement_counter = 1
-        self.assertEqual(self.tokenizer._get_unique_suffix(), "aaaaaab")
+        self.assertEqual(self.tokenizer._get_unique_string(), "\uE001")
+
+    def test_placeholders_03(self):
+        self.tokenizer.replacement_counter = 6400
+        self.assertEqual(self.tokenizer._get_unique_string(), "\uE001\uE000")
 
-    def test_suffixes_03(self):
-        self.tokenizer.replacement_counter = 26
-        self.assertEqual(self.tokenizer._get_unique_suffix(), "aaaaaba")
+    def test_placeholders_04(self):
+        self.tokenizer.replacement_counter = 6401
+        self.assertEqual(self.tokenizer._get_unique_string(), "\uE001\uE001")
+        self.assertEqual(self.tokenizer._get_unique_string(), "\uE001\uE002")
 
-    def test_suffixes_04(self):
-        self.tokenizer.replacement_counter = 27
-        self.assertEqual(self.tokenizer._get_unique_suffix(), "aaaaabb")
-        self.assertEqual(self.tokenizer._get_unique_suffix(), "aaaaabc")
+    def test_placeholders_05(self):
+        self.assertEqual(self.tokenizer._get_placeholders("foo \uE000 bar \uE002")[:3], "\uE001\uE003\uE004")
 
 
 class TestUnderline(TestTokenizer):
@@ -1016,6 +1029,213 @@ class TestJunk(TestTokenizer):
         self._equal("foo⁠bar", "foobar")
 
 
+class TestPrivateUse(TestTokenizer):
+    """"""
+    def test_private_use_01(self):
+        self._equal("foo \uE000 b\uE001r :)", "foo \uE000 b\uE001r :)")
+
+    def test_private_use_02(self):
+        self._equal("\uE000\uE001\uE002 foo@bar.de \uF8FF", "\uE000\uE001\uE002 foo@bar.de \uF8FF")
+
+    def test_private_use_03(self):
+        # more protected tokens than single-character placeholders
+        self._equal(" ".join(["?"] * 7000), " ".join(["?"] * 7000))
+
+    def test_private_use_04(self):
+        self.assertRaises(ValueError, self.tokenizer.tokenize, "".join(chr(c) for c in range(0xE000, 0xF8FF)))
+
+
+class TestTriggers(TestTokenizer):
+    """"""
+    def test_triggers_01(self):
+        self._equal("Das ist ein Test", "Das ist ein Test")
+        self.assertEqual(self.tokenizer.skipped_stages["email"], 1)
+        self.assertEqual(self.tokenizer.executed_stages["email"], 0)
+
+    def test_triggers_02(self):
+        self._equal("Mail an foo@bar.de", "Mail an foo@bar.de")
+        self.assertEqual(self.tokenizer.executed_stages["email"], 1)
+        self.assertEqual(self.tokenizer.skipped_stages["number"], 1)
+
+    def test_triggers_03(self):
+        self._equal("Um 12:30 😀 ", "Um 12:30 😀")
+        self.assertEqual(self.tokenizer.executed_stages["time"], 1)
+        self.assertEqual(self.tokenizer.executed_stages["emojis"], 1)
+
+    def test_triggers_04(self):
+        self.tokenizer.stage_triggers = {}
+        self._equal("Das ist ein Test", "Das ist ein Test")
+        self.assertEqual(sum(self.tokenizer.skipped_stages.values()), 0)
+
+
+class TestStages(TestTokenizer):
+    """"""
+    def test_stages_01(self):
+        self.tokenizer = Tokenizer(disabled_groups=["emoticons", "reddit_links"])
+        self._equal("Super :) siehe r/de", "Super : ) siehe r / de")
+
+    def test_stages_02(self):
+        self.tokenizer = Tokenizer(disabled_groups=["emoticons"], language="en")
+        self._equal("I don't know :)", "I do n't know : )")
+
+    def test_stages_03(self):
+        names = [stage.name for stage in self.tokenizer.stages]
+        self.assertLess(names.index("tag"), names.index("emoticon"))
+        self.assertIn("camel_case", names)
+        self.assertNotIn("en_dms", names)
+        self.assertNotIn("emoticon", [stage.name for stage in Tokenizer(disabled_groups=["emoticons"]).stages])
+
+    def test_stages_04(self):
+        self.assertRaises(ValueError, Tokenizer, disabled_groups=["foo"])
+
+    def test_stages_05(self):
+        self.tokenizer = Tokenizer(split_camel_case=False)
+        self.assertIsNone(self.tokenizer.abbreviation._object)
+        self._equal("Das ist z.B. ein Test", "Das ist z. B. ein Test")
+        self.assertIsNotNone(self.tokenizer.abbreviation._object)
+        self.assertIsNone(self.tokenizer.camel_case_token._object)
+
+    def test_stages_06(self):
+        self.tokenizer = Tokenizer(split_camel_case=True, language="en")
+        self.tokenizer.warmup()
+        self.assertIsNotNone(self.tokenizer.camel_case_token._object)
+        self.assertIsNotNone(self.tokenizer.en_nonbreaking_words._object)
+        self.assertIsNotNone(self.tokenizer.en_twopart_contraction.scanner)
+        self._equal("I don't know iPhones", "I do n't know iPhones")
+
+
+class TestCache(TestTokenizer):
+    """"""
+    def setUp(self):
+        """Necessary preparations"""
+        self.cache = ParagraphCache()
+        self.tokenizer = Tokenizer(split_camel_case=True, cache=self.cache)
+
+    def test_cache_01(self):
+        self._equal("Das ist ein Test.", "Das ist ein Test .")
+        tokens = self.tokenizer.tokenize("Das ist ein Test.")
+        tokens.append("foo")
+        self._equal("Das ist ein Test.", "Das ist ein Test .")
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
+
+    def test_cache_02(self):
+        # NFC-normalized paragraphs share an entry
+        self._equal("Cafe\u0301", "Café")
+        self._equal("Caf\u00e9", "Café")
+        self.assertEqual(len(self.cache), 1)
+
+    def test_cache_03(self):
+        other = Tokenizer(split_camel_case=False, cache=self.cache)
+        self._equal("Das ist einTest", "Das ist ein Test")
+        self.assertEqual(other.tokenize("Das ist einTest"), ["Das", "ist", "einTest"])
+        self.assertEqual(len(self.cache), 2)
+
+
+class TestRegistry(TestTokenizer):
+    """"""
+    def test_registry_01(self):
+        tokenizer = Tokenizer.get(language="en", disabled_groups=["urls", "emojis"])
+        self.assertIs(Tokenizer.get(language="en", disabled_groups=("emojis", "urls")), tokenizer)
+        self.assertIs(Tokenizer.get(language="xx"), Tokenizer.get(language="de"))
+        self.assertIsNot(Tokenizer.get(language="en", split_camel_case=True), Tokenizer.get(language="en"))
+        self.assertEqual(Tokenizer.get(language="en").tokenize("I don't know."), ["I", "do", "n't", "know", "."])
+
+    def test_registry_02(self):
+        german, english = Tokenizer.get(language="de"), Tokenizer.get(language="en", split_camel_case=True)
+        german.warmup()
+        english.warmup()
+        self.assertIs(german.tag.create(), english.tag.create())
+        self.assertIs(german.token_with_plus_ampersand.create(), english.token_with_plus_ampersand.create())
+        self.assertIs(german.xml_entity.scanner, english.xml_entity.scanner)
+        self.assertIsNot(german.abbreviation.create(), english.abbreviation.create())
+        self.assertIs(Tokenizer(language="de").tag.create(), german.tag.create())
+
+    def test_registry_03(self):
+        Tokenizer.get(language="de").warmup()
+        footprints = Tokenizer.footprints()
+        self.assertIn((False, False, False, "de", ()), footprints)
+        # the compiled patterns and matchers are not counted per tokenizer
+        self.assertGreater(footprints["shared"], 10 * footprints[(False, False, False, "de", ())])
+
+
+class TestUserLexicons(TestTokenizer):
+    """"""
+    def setUp(self):
+        """Necessary preparations"""
+        self.tokenizer = Tokenizer(split_camel_case=True)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, name, text, modified=None):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(text)
+        if modified is not None:
+            os.utime(path, (modified, modified))
+        return path
+
+    def test_user_lexicons_01(self):
+        self._equal("Mit F# und R3 bei der Co.KG", "Mit F # und R3 bei der Co. KG")
+        self.tokenizer.load_user_lexicon("abbreviations", self._write("abbreviations.txt", "# more abbreviations\nF#\nco.kg\n"))
+        self._equal("Mit F# und R3 bei der Co.KG", "Mit F# und R3 bei der Co.KG")
+        self._equal("f#-Code in Co.KGaA", "f# -Code in Co. KGaA")
+
+    def test_user_lexicons_02(self):
+        self.tokenizer.load_user_lexicon("camel_case", self._write("camel.txt", "MeinTest\n"))
+        self.tokenizer.load_user_lexicon("plus_ampersand", self._write("plus.txt", "Foo&Bar\n"))
+        self._equal("ein MeinTest mit foo&bar und DeinTest", "ein MeinTest mit foo&bar und Dein Test")
+
+    def test_user_lexicons_03(self):
+        path = self._write("abbreviations.txt", "F#\n", modified=1000000000)
+        self.tokenizer.load_user_lexicon("abbreviations", path)
+        configuration = self.tokenizer.configuration
+        self.assertEqual(self.tokenizer.reload_user_lexicons(), [])
+        self._write("abbreviations.txt", "G#\n", modified=1000000001)
+        self.assertEqual(self.tokenizer.reload_user_lexicons(), ["abbreviations"])
+        self.assertNotEqual(self.tokenizer.configuration, configuration)
+        self._equal("F# und G#", "F # und G#")
+
+    def test_user_lexicons_04(self):
+        self.assertRaises(ValueError, self.tokenizer.load_user_lexicon, "foo", self._write("foo.txt", "F#\n"))
+        self.assertRaises(ValueError, self.tokenizer.load_user_lexicon, "abbreviations", self._write("space.txt", "F #\n"))
+
+    def test_user_lexicons_05(self):
+        self.tokenizer.load_user_lexicon("multiword_expressions", self._write("mwe.txt", "New York\nNew York Times\tnewspaper\nYahoo !\n"))
+        self.assertEqual(self.tokenizer.tokenize("Die New York Times und Yahoo! in New  York"), ["Die", "New York Times", "und", "Yahoo!", "in", "New York"])
+        self.tokenizer.token_classes = True
+        self.assertEqual(self.tokenizer.tokenize("New York Times"), [("New York Times", "newspaper")])
+
+    def test_user_lexicons_06(self):
+        # a deleted lexicon file is dropped, the others are kept
+        self.tokenizer.load_user_lexicon("abbreviations", self._write("f.txt", "F#\n"))
+        g = self._write("g.txt", "G#\n")
+        self.tokenizer.load_user_lexicon("abbreviations", g)
+        self._equal("F# und G#", "F# und G#")
+        os.remove(g)
+        self.assertEqual(self.tokenizer.reload_user_lexicons(), ["abbreviations"])
+        self.assertEqual(list(self.tokenizer.user_lexicon_files["abbreviations"]), [os.path.join(self.directory, "f.txt")])
+        self._equal("F# und G#", "F# und G #")
+        os.remove(os.path.join(self.directory, "f.txt"))
+        self.assertEqual(self.tokenizer.reload_user_lexicons(), ["abbreviations"])
+        self._equal("F# und G#", "F # und G #")
+
+    def test_user_lexicons_07(self):
+        # a reload that fails keeps the previous lexicon
+        path = self._write("abbreviations.txt", "F#\n", modified=1000000000)
+        self.tokenizer.load_user_lexicon("abbreviations", path)
+        configuration = self.tokenizer.configuration
+        self._write("abbreviations.txt", "G#\nR 3\n", modified=1000000001)
+        self.assertRaises(ValueError, self.tokenizer.reload_user_lexicons)
+        self.assertEqual(self.tokenizer.configuration, configuration)
+        self.assertEqual(self.tokenizer.user_lexicon_files["abbreviations"], {path: 1000000000})
+        self._equal("F# und G#", "F# und G #")
+        self._write("abbreviations.txt", "G#\n", modified=1000000002)
+        self.assertEqual(self.tokenizer.reload_user_lexicons(), ["abbreviations"])
+        self._equal("F# und G#", "F # und G#")
+
+
 class TestXML(TestTokenizer):
     """"""
     def test_xml_01(self):
@@ -1051,6 +1271,23 @@ class TestXML(TestTokenizer):
 <p>Jens Spahn allerdings mangelt es 🚎 schmerzhaft offensichtlich an 📯🏻 diesem oben genannten Mindestmaß an 👹👹 Anstand. Die Dinge, die er ⤵⤵ erkennbar überzeugt von sich gibt, triefen vor Arroganz und Empathielosigkeit (Hartz IV? Mehr als genug; Gefährlich niedrige Versorgung mit Geburtshilfe? Sollen die 💯🚦 Weiber halt nen Kilometer weiter fahren); die andere Hälfte seiner verbalen Absonderungen ist ♂ schmerzhaft durchsichtiges taktisches Anbiedern an 💕👹 konservative Interessengruppen (jüngst beispielsweise Abtreibungsgegner) mittels plumpmöglichster Populismen.</p>
         </text>""", """<text> <p> Jens Spahn ist 🏽🏽 ein durch und durch ekelerregendes Subjekt . </p> <p> So 🙇 🙇 manchen Unionspolitikern gestehe ich schon noch irgendwie zu , dass sie durchaus das Bedürfnis haben , ihren Bürgern ein gutes Leben zu ermöglichen . Zwar halte ich ihre Vorstellung von einem " guten Leben " und / oder die ☠ ☣ Wege , auf denen dieses erreicht werden soll , für grundsätzlich falsch - aber da stecken zumindest teilweise durchaus legitim gute Absichten dahinter . </p> <p> Jens Spahn allerdings mangelt es 🚎 schmerzhaft offensichtlich an 📯🏻 diesem oben genannten Mindestmaß an 👹 👹 Anstand . Die Dinge , die er ⤵ ⤵ erkennbar überzeugt von sich gibt , triefen vor Arroganz und Empathielosigkeit ( Hartz IV ? Mehr als genug ; Gefährlich niedrige Versorgung mit Geburtshilfe ? Sollen die 💯 🚦 Weiber halt nen Kilometer weiter fahren ) ; die andere Hälfte seiner verbalen Absonderungen ist ♂ schmerzhaft durchsichtiges taktisches Anbiedern an 💕 👹 konservative Interessengruppen ( jüngst beispielsweise Abtreibungsgegner ) mittels plumpmöglichster Populismen . </p> </text>""")
 
+    def test_xml_10(self):
+        xml = "<text><p>Wir gehen in's Kino.</p><p>Sie sagt: 'nein</p><div>doch'</div></text>"
+        self._equal_xml(xml, "<text> <p> Wir gehen in ' s Kino . </p> <p> Sie sagt : ' nein </p> <div> doch' </div> </text>")
+        # the parts between sentence-breaking tags are tokenized independently
+        self.assertEqual(self.tokenizer.tokenize_xml(xml, is_file=False, eos_tags={"p", "div"}), "<text> <p> Wir gehen in's Kino . </p> <p> Sie sagt : 'nein </p> <div> doch' </div> </text>".split())
+
+    def test_xml_11(self):
+        xml = "<text><p>Wir sehen uns <b>um 12:00</b></p><br/><p>Uhr?</p></text>"
+        texts = []
+
+        def tokenize_parts(parts):
+            texts.extend(parts)
+            return [self.tokenizer._tokenize_xml_part(part) for part in parts]
+        self.assertEqual(self.tokenizer.tokenize_xml(xml, is_file=False, eos_tags={"p", "br"}, tokenize_parts=tokenize_parts), "<text> <p> Wir sehen uns <b> um 12:00 </b> </p> <br> </br> <p> Uhr ? </p> </text>".split())
+        self.assertEqual(texts, [[""], ["Wir sehen uns ", "um 12:00", ""], [""], [""], [""], ["Uhr?"], ["", ""]])
+        self.assertEqual(self.tokenizer._tokenize_xml_part(["", "  "]), ["\n", "\n"])
+
 
 class TestTokenizerExtra(unittest.TestCase):
     """"""
@@ -1093,6 +1330,15 @@ class TestMisc(TestTokenizerExtra):
     def test_misc_09(self):
         self.assertEqual(self.tokenizer.tokenize("­ \n­"), [])
 
+    def test_misc_10(self):
+        self.assertEqual(self.tokenizer.tokenize("Ver\u00ADsicherung, oder? foo [at] bar.de"), [("Versicherung", 'SpaceAfter=No, OriginalSpelling="Ver\u00ADsicherung"'), (",", ""), ("oder", "SpaceAfter=No"), ("?", ""), ("foo [at] bar.de", "")])
+
+    def test_misc_11(self):
+        self.assertEqual(self.tokenizer.tokenize("Das ist z.B. ein Test\u200B."), [("Das", ""), ("ist", ""), ("z.", "SpaceAfter=No"), ("B.", ""), ("ein", ""), ("Test", 'SpaceAfter=No, OriginalSpelling="Test\u200B"'), (".", "")])
+
+    def test_misc_12(self):
+        self.assertEqual(self.tokenizer.tokenize_xml("<x>foo [at] <b>bar.de</b> Ver&#xad;sicherung, ok</x>", is_file=False), [("<x>", None), ("foo [at]", ""), ("<b>", None), ("bar.de", ""), ("</b>", None), ("Versicherung", 'SpaceAfter=No, OriginalSpelling="Ver\u00ADsicherung"'), (",", ""), ("ok", ""), ("</x>", None)])
+
 
 class TestEnglish(TestEnglishTokenizer):
     """"""
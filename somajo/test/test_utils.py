@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+import multiprocessing.pool
+import pickle
+import unittest
+
+from somajo import utils
+
+
+class TestLexicon(unittest.TestCase):
+    """"""
+    def setUp(self):
+        """Necessary preparations"""
+        self.lexicon = utils.Lexicon(["usw.", "C&A", "z.B.", "AT&T", "Nr."])
+
+    def test_lexicon_01(self):
+        self.assertEqual([len(e) for e in self.lexicon], [4, 4, 4, 3, 3])
+        self.assertIn("C&A", self.lexicon)
+        self.assertNotIn("c&a", self.lexicon)
+        self.assertTrue(self.lexicon.contains("c&a", ignore_case=True))
+
+    def test_lexicon_02(self):
+        self.assertEqual(sorted(self.lexicon.select(r"\w+&\w+")), ["AT&T", "C&A"])
+        self.assertEqual(sorted(self.lexicon.select(r"\w+&\w+", invert=True)), ["Nr.", "usw.", "z.B."])
+        self.assertIs(self.lexicon.select(r"\w+&\w+"), self.lexicon.select(r"\w+&\w+"))
+
+    def test_lexicon_03(self):
+        self.assertEqual(self.lexicon.trie(ignore_case=True).longest_prefix("Z.b. foo", 0), 4)
+        self.assertEqual([m.group() for m in self.lexicon.regex(before=r"\b").finditer("usw. Nr. 5")], ["usw.", "Nr."])
+
+    def test_lexicon_04(self):
+        lexicon = utils.Lexicon.load("eos_abbreviations.txt")
+        self.assertIs(lexicon, utils.Lexicon.load("eos_abbreviations.txt"))
+        self.assertIs(pickle.loads(pickle.dumps(lexicon)), lexicon)
+        self.assertEqual(pickle.loads(pickle.dumps(self.lexicon)).entries, self.lexicon.entries)
+
+
+class TestDeepSize(unittest.TestCase):
+    """"""
+    def test_deep_size_01(self):
+        text = "x" * 1000
+        self.assertGreater(utils.deep_size([text]), 1000)
+        self.assertLess(utils.deep_size([text, text]), utils.deep_size([text]) + 100)
+        self.assertLess(utils.deep_size([text], seen={id(text)}), 1000)
+
+    def test_deep_size_02(self):
+        lexicon = utils.Lexicon(["y" * 1000])
+        self.assertGreater(utils.deep_size(lexicon), 1000)
+        self.assertGreater(utils.deep_size(lexicon.__contains__), 1000)
+
+
+def _double_all(items):
+    return [2 * item for item in items]
+
+
+class TestBoundedImap(unittest.TestCase):
+    """"""
+    def setUp(self):
+        """Necessary preparations"""
+        self.pool = multiprocessing.pool.ThreadPool(2)
+        self.read = 0
+
+    def tearDown(self):
+        self.pool.terminate()
+
+    def _items(self, n):
+        for i in range(n):
+            self.read += 1
+            yield i
+
+    def test_chunks_01(self):
+        self.assertEqual(list(utils.chunks(["a", "bb", "ccc", "dddddd", "e"], 2, 5)), [["a", "bb"], ["ccc"], ["dddddd"], ["e"]])
+        self.assertEqual(list(utils.chunks([], 2, 5)), [])
+
+    def test_bounded_imap_01(self):
+        self.assertEqual(list(utils.bounded_imap(self.pool, _double_all, self._items(1000), 7, 4, 100, size=lambda i: 1)), [2 * i for i in range(1000)])
+
+    def test_bounded_imap_02(self):
+        # the items are read only as fast as the results are consumed
+        # (plus the first item of the next chunk)
+        results = utils.bounded_imap(self.pool, _double_all, self._items(1000), 10, 3, 1000, size=lambda i: 1)
+        self.assertEqual(next(results), 0)
+        self.assertEqual(self.read, 31)
+        for _ in range(10):
+            next(results)
+        self.assertEqual(self.read, 41)
+
+    def test_bounded_imap_03(self):
+        # at most max_size items (but at least one chunk) are in flight
+        results = utils.bounded_imap(self.pool, _double_all, self._items(1000), 10, 10, 5, size=lambda i: 1)
+        next(results)
+        self.assertEqual(self.read, 6)
+        results = utils.bounded_imap(self.pool, _double_all, self._items(3), 10, 3, 0, size=lambda i: 1)
+        self.assertEqual(list(results), [0, 2, 4])
+
+
+class TestPartitionXml(unittest.TestCase):
+    """"""
+    def test_partition_xml_01(self):
+        elements = utils.parse_xml("<text><p>Wir sehen uns <b>um 12:00</b></p><x:p xmlns:x='urn:x'>Uhr</x:p>!</text>", is_file=False)
+        parts = utils.partition_xml(elements, {"p"})
+        self.assertEqual([[e.text for e in part] for part in parts], [[""], ["Wir sehen uns ", "um 12:00", ""], [""], ["Uhr"], ["!", ""]])
+        self.assertEqual([e for part in parts for e in part], elements)
+        self.assertEqual(utils.partition_xml(elements, set()), [elements])
@@ -1,24 +1,47 @@
 #!/usr/bin/env python3
 
 import collections
-import random
+import functools
+import os
+import sys
 import unicodedata
 import warnings
-import xml.etree.ElementTree as ET
 
 import regex as re
 
-from somajo import utils
+from somajo import resources, utils
+from somajo.matchers import AbbreviationMatcher, FusedRegex, Lazy, LazyPattern, LexiconMatcher, TokenTrie, shared, shared_objects
 
 Token = collections.namedtuple("Token", ["token", "token_class"])
+Stage = collections.namedtuple("Stage", ["name", "group", "function", "patterns"])
+
+# Placeholders for protected tokens are built from the characters of
+# the Private Use Area of the Basic Multilingual Plane
+PRIVATE_USE_AREA = "".join(chr(c) for c in range(0xE000, 0xF900))
 
 
 class Tokenizer(object):
 
     supported_languages = set(["de", "en"])
     default_language = "de"
-
-    def __init__(self, split_camel_case=False, token_classes=False, extra_info=False, language="de"):
+    # groups of stages that can be disabled (see README.md for their
+    # effect on the output)
+    stage_groups = ["xml_tags", "emails", "emojis", "emoticons", "urls",
+                    "reddit_links", "xml_entities", "mentions",
+                    "hashtags", "action_words", "underline",
+                    "emoji_names", "plus_ampersand", "camel_case",
+                    "gender_star", "contractions", "hyphenated_words",
+                    "abbreviations", "dates", "times", "numbers"]
+    # kinds of user lexicons and the (default) token classes of their
+    # entries
+    user_lexicon_kinds = {"abbreviations": "abbreviation",
+                          "camel_case": "regular",
+                          "plus_ampersand": "regular",
+                          "multiword_expressions": "multiword"}
+    # the tokenizers created via Tokenizer.get, by configuration
+    _instances = {}
+
+    def __init__(self, split_camel_case=False, token_classes=False, extra_info=False, language="de", disabled_groups=(), cache=None, chunk_cache=None, user_lexicons=None):
         """Create a Tokenizer object. If split_camel_case is set to True,
         tokens written in CamelCase will be split. If token_classes is
         set to true, the tokenizer will output the token class for
@@ -26,17 +49,61 @@ class Tokenizer(object):
         etc.). If extra_info is set to True, the tokenizer will output
         information about the original spelling of the tokens.
 
+        Protected tokens are replaced with placeholders built from
+        the Private Use Area (U+E000 to U+F8FF). Characters from that
+        range that occur in a paragraph are never used as placeholders
+        for that paragraph, so input containing them is tokenized as
+        usual. Only a paragraph that contains 6,399 or more distinct
+        characters from the Private Use Area cannot be tokenized and
+        raises a ValueError.
+
+        The stages of the tokenizer from the groups in
+        disabled_groups (see Tokenizer.stage_groups) are not applied.
+        This is faster, but tokens of the corresponding kinds are no
+        longer recognized as such.
+
+        The regular expressions and lexicon matchers of the stages are
+        compiled when they are used for the first time, so that
+        creating a Tokenizer is cheap. Call warmup() to compile them
+        in advance.
+
+        If cache is a ParagraphCache (see somajo.cache), the results
+        of tokenize_paragraph are cached, so that repeated paragraphs
+        are only tokenized once. A cache can be shared by several
+        tokenizers.
+
+        If chunk_cache is a ParagraphCache, the tokens of words that
+        cannot interact with the surrounding text (see
+        _tokenize_chunks) are memoized, so that only the rest of a
+        paragraph goes through all the stages. The output is the same.
+
+        user_lexicons maps kinds of user lexicons (see
+        Tokenizer.user_lexicon_kinds) to lists of lexicon files that
+        are loaded via load_user_lexicon.
+
         """
+        unknown_groups = set(disabled_groups) - set(self.stage_groups)
+        if len(unknown_groups) > 0:
+            raise ValueError("Unknown stage groups: %s" % ", ".join(sorted(unknown_groups)))
         self.split_camel_case = split_camel_case
         self.token_classes = token_classes
         self.extra_info = extra_info
         self.language = language if language in self.supported_languages else self.default_language
-        self.unique_string_length = 7
+        self.disabled_groups = set(disabled_groups)
+        self.cache = cache
+        self.chunk_cache = chunk_cache
+        # the entries, matchers and files (with their modification
+        # times) of the user lexicons
+        self.user_entries = {kind: set() for kind in self.user_lexicon_kinds}
+        self.user_matchers = {}
+        self.user_lexicon_files = {kind: {} for kind in self.user_lexicon_kinds}
+        self._update_configuration()
         self.mapping = {}
-        self.unique_prefix = None
+        self.placeholders = PRIVATE_USE_AREA
         self.replacement_counter = 0
 
         self.spaces = re.compile(r"\s+")
+        self.private_use = re.compile(r"[\uE000-\uF8FF]")
         self.controls = re.compile(r"[\u0000-\u001F\u007F-\u009F]")
         self.stranded_variation_selector = re.compile(r" \uFE0F")
         # soft hyphen (00AD), zero-width space (200B), zero-width
@@ -49,15 +116,26 @@ class Tokenizer(object):
         # formatting (202C), zero-width no-break space (FEFF)
         self.other_nasties = re.compile(r"[\u00AD\u061C\u200B-\u200F\u202A-\u202E\u2060\u2066-\u2069\uFEFF]")
         # combination
-        self.starts_with_junk = re.compile(r"^[\u0000-\u001F\u007F-\u009F\u00AD\u061C\u200B-\u200F\u202A-\u202E\u2060\u2066-\u2069\uFEFF]+")
+        self.starts_with_junk = re.compile(r"[\u0000-\u001F\u007F-\u009F\u00AD\u061C\u200B-\u200F\u202A-\u202E\u2060\u2066-\u2069\uFEFF]+")
         self.junk_next_to_space = re.compile(r"(?:^|\s)[\u0000-\u001F\u007F-\u009F\u00AD\u061C\u200B-\u200F\u202A-\u202E\u2060\u2066-\u2069\uFEFF]+|[\u0000-\u001F\u007F-\u009F\u00AD\u061C\u200B-\u200F\u202A-\u202E\u2060\u2066-\u2069\uFEFF]+(?:\s|$)")
         self.junk_between_spaces = re.compile(r"(?:^|\s+)[\s\u0000-\u001F\u007F-\u009F\u00AD\u061C\u200B-\u200F\u202A-\u202E\u2060\u2066-\u2069\uFEFF]+(?:\s+|$)")
 
+        # Whitespace-separated chunks whose tokenization does not depend
+        # on their context: letters with optional final punctuation.
+        # Rules that look across whitespace (email addresses with
+        # [at] or dot, XML tags, paired parens, brackets, quotes and
+        # underscores, arrows, spaced emoticons) involve one of the
+        # context characters; rules for numbers followed by units,
+        # a.m./p.m. and "no." or preceded by "ps." involve adjacent
+        # digits.
+        self.memoizable_chunk = re.compile(r"\p{L}+[.,!?]?")
+        self.context_characters = re.compile(r"[][(){}<>'`_‘’‚@]")
+
         # My Additions
-        self.letter_hyphen = re.compile(r'\b\p{Lu}-\p{L}{3,}\b')
+        self.letter_hyphen = LazyPattern(r'\b\p{Lu}-\p{L}{3,}\b')
 
         # TAGS, EMAILS, URLs
-        self.xml_declaration = re.compile(r"""<\?xml
+        self.xml_declaration = LazyPattern(r"""<\?xml
                                               (?:                #   This group permits zero or more attributes
                                                 \s+              #   Whitespace to separate attributes
                                                 [_:A-Z][-.:\w]*  #   Attribute name
@@ -70,7 +148,7 @@ class Tokenizer(object):
                                               \?>""", re.VERBOSE | re.IGNORECASE)
         # self.tag = re.compile(r'<(?!-)(?:/[^> ]+|[^>]+/?)(?<!-)>')
         # taken from Regular Expressions Cookbook
-        self.tag = re.compile(r"""
+        self.tag = LazyPattern(r"""
                                   <
                                   (?:                  # Branch for opening tags:
                                     ([_:A-Z][-.:\w]*)  #   Capture the opening tag name to backreference 1
@@ -94,21 +172,21 @@ class Tokenizer(object):
         # regex for email addresses taken from:
         # http://www.regular-expressions.info/email.html
         # self.email = re.compile(r"\b[\w.%+-]+@[\w.-]+\.\p{L}{2,}\b")
-        self.email = re.compile(r"\b[\w.%+-]+(?:@| \[at\] )[\w.-]+(?:\.| \[?dot\]? )\p{L}{2,}\b")
+        self.email = LazyPattern(r"\b[\w.%+-]+(?:@| \[at\] )[\w.-]+(?:\.| \[?dot\]? )\p{L}{2,}\b")
         # simple regex for urls that start with http or www
         # TODO: schließende Klammer am Ende erlauben, wenn nach http etc. eine öffnende kam
-        self.simple_url_with_brackets = re.compile(r'\b(?:(?:https?|ftp|svn)://|(?:https?://)?www\.)\S+?\(\S*?\)\S*(?=$|[\'. "!?,;\n\t])', re.IGNORECASE)
-        self.simple_url = re.compile(r'\b(?:(?:https?|ftp|svn)://|(?:https?://)?www\.)\S+[^\'. "!?,;:\n\t)]', re.IGNORECASE)
-        self.doi = re.compile(r'\bdoi:10\.\d+/\S+', re.IGNORECASE)
-        self.doi_with_space = re.compile(r'(?<=\bdoi: )10\.\d+/\S+', re.IGNORECASE)
+        self.simple_url_with_brackets = LazyPattern(r'\b(?:(?:https?|ftp|svn)://|(?:https?://)?www\.)\S+?\(\S*?\)\S*(?=$|[\'. "!?,;\n\t])', re.IGNORECASE)
+        self.simple_url = LazyPattern(r'\b(?:(?:https?|ftp|svn)://|(?:https?://)?www\.)\S+[^\'. "!?,;:\n\t)]', re.IGNORECASE)
+        self.doi = LazyPattern(r'\bdoi:10\.\d+/\S+', re.IGNORECASE)
+        self.doi_with_space = LazyPattern(r'(?<=\bdoi: )10\.\d+/\S+', re.IGNORECASE)
         # we also allow things like tagesschau.de-App
-        self.url_without_protocol = re.compile(r'\b[\w./-]+\.(?:de|com|org|net|edu|info|gov|jpg|png|gif|log|txt|xlsx?|docx?|pptx?|pdf)(?:-\w+)?\b', re.IGNORECASE)
-        self.reddit_links = re.compile(r'(?<!\w)/?[rlu](?:/\w+)+/?(?!\w)', re.IGNORECASE)
+        self.url_without_protocol = LazyPattern(r'\b[\w./-]+\.(?:de|com|org|net|edu|info|gov|jpg|png|gif|log|txt|xlsx?|docx?|pptx?|pdf)(?:-\w+)?\b', re.IGNORECASE)
+        self.reddit_links = LazyPattern(r'(?<!\w)/?[rlu](?:/\w+)+/?(?!\w)', re.IGNORECASE)
 
         # XML entities
-        self.entity_name = re.compile(r'&(?:quot|amp|apos|lt|gt);', re.IGNORECASE)
-        self.entity_decimal = re.compile(r'&#\d+;')
-        self.entity_hex = re.compile(r'&#x[0-9a-f]+;', re.IGNORECASE)
+        self.entity_name = LazyPattern(r'&(?:quot|amp|apos|lt|gt);', re.IGNORECASE)
+        self.entity_decimal = LazyPattern(r'&#\d+;')
+        self.entity_hex = LazyPattern(r'&#x[0-9a-f]+;', re.IGNORECASE)
 
         # EMOTICONS
         emoticon_set = set(["(-.-)", "(T_T)", "(♥_♥)", ")':", ")-:",
@@ -118,7 +196,7 @@ class Tokenizer(object):
                             "\\O/", "\\m/", ":;))", "_))", "*_*", "._.",
                             ":wink:", ">_<", "*<:-)", ":!:", ":;-))"])
         emoticon_list = sorted(emoticon_set, key=len, reverse=True)
-        self.emoticon = re.compile(r"""(?:(?:[:;]|(?<!\d)8)           # a variety of eyes, alt.: [:;8]
+        self.emoticon = LazyPattern(r"""(?:(?:[:;]|(?<!\d)8)           # a variety of eyes, alt.: [:;8]
                                         [-'oO]?                       # optional nose or tear
                                         (?: \)+ | \(+ | [*] | ([DPp])\1*(?!\w)))   # a variety of mouths
                                     """ +
@@ -128,14 +206,14 @@ class Tokenizer(object):
                                    r"(?:\b(?:D'?:|oO)\b)" +
                                    r"|" +
                                    r"|".join([re.escape(_) for _ in emoticon_list]), re.VERBOSE)
-        self.space_emoticon = re.compile(r'([:;])[ ]+([()])(?! *[\+0])')
+        self.space_emoticon = LazyPattern(r'([:;])[ ]+([()])(?! *[\+0])')
         # ^3 is an emoticon, unless it is preceded by a number (with
         # optional whitespace between number and ^3)
         # ^\^3    # beginning of line, no leading characters
         # ^\D^3   # beginning of line, one leading character
         # (?<=\D[ ])^3   # two leading characters, non-number + space
         # (?<=.[^\d ])^3   # two leading characters, x + non-space-non-number
-        self.heart_emoticon = re.compile(r"(?:^|^\D|(?<=\D[ ])|(?<=.[^\d ]))\^3")
+        self.heart_emoticon = LazyPattern(r"(?:^|^\D|(?<=\D[ ])|(?<=.[^\d ]))\^3")
         # U+2600..U+26FF	Miscellaneous Symbols
         # U+2700..U+27BF	Dingbats
         # U+FE0E..U+FE0F        text and emoji variation selectors
@@ -145,86 +223,89 @@ class Tokenizer(object):
         # U+1F680..U+1F6FF	Transport and Map Symbols
         # U+1F900..U+1F9FF	Supplemental Symbols and Pictographs
         # self.unicode_symbols = re.compile(r"[\u2600-\u27BF\uFE0E\uFE0F\U0001F300-\U0001f64f\U0001F680-\U0001F6FF\U0001F900-\U0001F9FF]")
-        self.unicode_flags = re.compile(r"\p{Regional_Indicator}{2}\uFE0F?")
+        self.unicode_flags = LazyPattern(r"\p{Regional_Indicator}{2}\uFE0F?")
+        # Emoji sequences are grapheme clusters that contain an emoji
+        # or a variation selector, or single-character emojis. The
+        # candidates are graphemes that start with an emoji or that
+        # consist of more than one character (i.e. the text up to
+        # the next character does not end with the whole grapheme)
+        self.emoji_candidate = LazyPattern(r"(?=[\p{Extended_Pictographic}\p{Emoji_Presentation}])\X|(?=(?P<grapheme>\X))(?=.(?<!(?P=grapheme)))(?P=grapheme)")
+        self.emoji_character = LazyPattern(r"[\p{Extended_Pictographic}\p{Emoji_Presentation}\uFE0F]")
 
         # special tokens containing + or &
-        tokens_with_plus_or_ampersand = utils.read_abbreviation_file("tokens_with_plus_or_ampersand.txt")
-        plus_amp_simple = [(pa, re.search(r"^\w+[&+]\w+$", pa)) for pa in tokens_with_plus_or_ampersand]
-        self.simple_plus_ampersand = set([pa[0].lower() for pa in plus_amp_simple if pa[1]])
-        self.simple_plus_ampersand_candidates = re.compile(r"\b\w+[&+]\w+\b")
-        tokens_with_plus_or_ampersand = [pa[0] for pa in plus_amp_simple if not pa[1]]
+        tokens_with_plus_or_ampersand = utils.Lexicon.load("tokens_with_plus_or_ampersand.txt")
+        self.simple_plus_ampersand = tokens_with_plus_or_ampersand.select(r"\w+[&+]\w+").folded()
+        self.simple_plus_ampersand_candidates = LazyPattern(r"\b\w+[&+]\w+\b")
+        tokens_with_plus_or_ampersand = tokens_with_plus_or_ampersand.select(r"\w+[&+]\w+", invert=True)
         # self.token_with_plus_ampersand = re.compile(r"(?<!\w)(?:\L<patokens>)(?!\w)", re.IGNORECASE, patokens=tokens_with_plus_or_ampersand)
-        self.token_with_plus_ampersand = re.compile(r"(?<!\w)(?:" + r"|".join([re.escape(_) for _ in tokens_with_plus_or_ampersand]) + r")(?!\w)", re.IGNORECASE)
+        # self.token_with_plus_ampersand = re.compile(r"(?<!\w)(?:" + r"|".join([re.escape(_) for _ in tokens_with_plus_or_ampersand]) + r")(?!\w)", re.IGNORECASE)
+        self.token_with_plus_ampersand = Lazy(shared, LexiconMatcher, tokens_with_plus_or_ampersand, ignore_case=True, before=r"(?<!\w)", after=r"(?!\w)")
 
         # camelCase
-        self.emoji = re.compile(r'\bemojiQ\p{L}{3,}\b')
-        camel_case_token_list = utils.read_abbreviation_file("camel_case_tokens.txt")
-        cc_alnum = [(cc, re.search(r"^\w+$", cc)) for cc in camel_case_token_list]
-        self.simple_camel_case_tokens = set([cc[0] for cc in cc_alnum if cc[1]])
-        self.simple_camel_case_candidates = re.compile(r"\b\w*\p{Ll}\p{Lu}\w*\b")
-        camel_case_token_list = [cc[0] for cc in cc_alnum if not cc[1]]
+        self.emoji = LazyPattern(r'\bemojiQ\p{L}{3,}\b')
+        camel_case_token_list = utils.Lexicon.load("camel_case_tokens.txt")
+        self.simple_camel_case_tokens = camel_case_token_list.select(r"\w+")
+        self.simple_camel_case_candidates = LazyPattern(r"\b\w*\p{Ll}\p{Lu}\w*\b")
+        camel_case_token_list = camel_case_token_list.select(r"\w+", invert=True)
         # things like ImmobilienScout24.de are already covered by URL detection
         # self.camel_case_url = re.compile(r'\b(?:\p{Lu}[\p{Ll}\d]+){2,}\.(?:de|com|org|net|edu)\b')
-        self.camel_case_token = re.compile(r"\b(?:" + r"|".join([re.escape(_) for _ in camel_case_token_list]) + r"|:Mac\p{Lu}\p{Ll}*)\b")
+        # self.camel_case_token = re.compile(r"\b(?:" + r"|".join([re.escape(_) for _ in camel_case_token_list]) + r"|:Mac\p{Lu}\p{Ll}*)\b")
+        self.camel_case_token = Lazy(shared, LexiconMatcher, camel_case_token_list, before=r"\b", after=r"\b", extra=r":Mac\p{Lu}\p{Ll}*")
         # self.camel_case_token = re.compile(r"\b(?:\L<cctokens>|Mac\p{Lu}\p{Ll}*)\b", cctokens=camel_case_token_set)
-        self.in_and_innen = re.compile(r'\b\p{L}+\p{Ll}In(?:nen)?\p{Ll}*\b')
-        self.camel_case = re.compile(r'(?<=\p{Ll}{2})(\p{Lu})(?!\p{Lu}|\b)')
+        self.in_and_innen = LazyPattern(r'\b\p{L}+\p{Ll}In(?:nen)?\p{Ll}*\b')
+        self.camel_case = LazyPattern(r'(?<=\p{Ll}{2})(\p{Lu})(?!\p{Lu}|\b)')
 
         # GENDER STAR
-        self.gender_star = re.compile(r'\b\p{L}+\*in(?:nen)?\p{Ll}*\b', re.IGNORECASE)
+        self.gender_star = LazyPattern(r'\b\p{L}+\*in(?:nen)?\p{Ll}*\b', re.IGNORECASE)
 
         # ABBREVIATIONS
-        self.single_letter_ellipsis = re.compile(r"(?<![\w.])(?P<a_letter>\p{L})(?P<b_ellipsis>\.{3})(?!\.)")
-        self.and_cetera = re.compile(r"(?<![\w.&])&c\.(?!\p{L}{1,3}\.)")
-        self.str_abbreviations = re.compile(r'(?<![\w.])([\p{L}-]+-Str\.)(?!\p{L})', re.IGNORECASE)
-        self.nr_abbreviations = re.compile(r"(?<![\w.])(\w+\.-?Nr\.)(?!\p{L}{1,3}\.)", re.IGNORECASE)
-        self.single_letter_abbreviation = re.compile(r"(?<![\w.])\p{L}\.(?!\p{L}{1,3}\.)")
+        self.single_letter_ellipsis = LazyPattern(r"(?<![\w.])(?P<a_letter>\p{L})(?P<b_ellipsis>\.{3})(?!\.)")
+        self.and_cetera = LazyPattern(r"(?<![\w.&])&c\.(?!\p{L}{1,3}\.)")
+        self.str_abbreviations = LazyPattern(r'(?<![\w.])([\p{L}-]+-Str\.)(?!\p{L})', re.IGNORECASE)
+        self.nr_abbreviations = LazyPattern(r"(?<![\w.])(\w+\.-?Nr\.)(?!\p{L}{1,3}\.)", re.IGNORECASE)
+        self.single_letter_abbreviation = LazyPattern(r"(?<![\w.])\p{L}\.(?!\p{L}{1,3}\.)")
         # abbreviations with multiple dots that constitute tokens
-        single_token_abbreviation_list = utils.read_abbreviation_file("single_token_abbreviations_%s.txt" % self.language)
-        self.single_token_abbreviation = re.compile(r"(?<![\w.])(?:" + r'|'.join([re.escape(_) for _ in single_token_abbreviation_list]) + r')(?!\p{L}{1,3}\.)', re.IGNORECASE)
-        self.ps = re.compile(r"(?<!\d[ ])\bps\.", re.IGNORECASE)
-        self.multipart_abbreviation = re.compile(r'(?:\p{L}+\.){2,}')
+        single_token_abbreviation_list = utils.Lexicon.load("single_token_abbreviations_%s.txt" % self.language)
+        # equivalent to (?<![\w.])(?:single_token_abbreviation_list)(?!\p{L}{1,3}\.)
+        self.single_token_abbreviation = Lazy(shared, AbbreviationMatcher, single_token_abbreviation_list, not_preceded_by=r"[\w.]")
+        self.ps = LazyPattern(r"(?<!\d[ ])\bps\.", re.IGNORECASE)
+        self.multipart_abbreviation = LazyPattern(r'(?:\p{L}+\.){2,}')
         # only abbreviations that are not matched by (?:\p{L}\.)+
-        abbreviation_list = utils.read_abbreviation_file("abbreviations_%s.txt" % self.language)
+        abbreviation_list = utils.Lexicon.load("abbreviations_%s.txt" % self.language)
         # abbrev_simple = [(a, re.search(r"^\p{L}{2,}\.$", a)) for a in abbreviation_list]
         # self.simple_abbreviations = set([a[0].lower() for a in abbrev_simple if a[1]])
         # self.simple_abbreviation_candidates = re.compile(r"(?<![\w.])\p{L}{2,}\.(?!\p{L}{1,3}\.)")
         # abbreviation_list = [a[0] for a in abbrev_simple if not a[1]]
-        self.abbreviation = re.compile(r"(?<![\p{L}.])(?:" +
-                                       r"(?:(?:\p{L}\.){2,})" +
-                                       r"|" +
-                                       # r"(?i:" +    # this part should be case insensitive
-                                       r'|'.join([re.escape(_) for _ in abbreviation_list]) +
-                                       # r"))+(?!\p{L}{1,3}\.)", re.V1)
-                                       r")+(?!\p{L}{1,3}\.)", re.IGNORECASE)
+        # equivalent to (?<![\p{L}.])(?:(?:\p{L}\.){2,}|abbreviation_list)+(?!\p{L}{1,3}\.)
+        self.abbreviation = Lazy(shared, AbbreviationMatcher, abbreviation_list, not_preceded_by=r"[\p{L}.]", letter_sequences=True, repeat=True)
 
         # MENTIONS, HASHTAGS, ACTION WORDS, UNDERLINE
-        self.mention = re.compile(r'[@]\w+(?!\w)')
-        self.hashtag = re.compile(r'(?<!\w)[#]\w+(?!\w)')
-        self.action_word = re.compile(r'(?<!\w)(?P<a_open>[*+])(?P<b_middle>[^\s*]+)(?P<c_close>[*])(?!\w)')
+        self.mention = LazyPattern(r'[@]\w+(?!\w)')
+        self.hashtag = LazyPattern(r'(?<!\w)[#]\w+(?!\w)')
+        self.action_word = LazyPattern(r'(?<!\w)(?P<a_open>[*+])(?P<b_middle>[^\s*]+)(?P<c_close>[*])(?!\w)')
         # a pair of underscores can be used to "underline" some text
-        self.underline = re.compile(r"(?<!\w)(_)(\w[^_]+\w)(_)(?!\w)")
+        self.underline = LazyPattern(r"(?<!\w)(_)(\w[^_]+\w)(_)(?!\w)")
 
         # DATE, TIME, NUMBERS
-        self.three_part_date_year_first = re.compile(r'(?<![\d.]) (?P<a_year>\d{4}) (?P<b_month_or_day>([/-])\d{1,2}) (?P<c_day_or_month>\3\d{1,2}) (?![\d.])', re.VERBOSE)
-        self.three_part_date_dmy = re.compile(r'(?<![\d.]) (?P<a_day>(?:0?[1-9]|1[0-9]|2[0-9]|3[01])([./-])) (?P<b_month>(?:0?[1-9]|1[0-2])\2) (?P<c_year>(?:\d\d){1,2}) (?![\d.])', re.VERBOSE)
-        self.three_part_date_mdy = re.compile(r'(?<![\d.]) (?P<a_month>(?:0?[1-9]|1[0-2])([./-])) (?P<b_day>(?:0?[1-9]|1[0-9]|2[0-9]|3[01])\2) (?P<c_year>(?:\d\d){1,2}) (?![\d.])', re.VERBOSE)
-        self.two_part_date = re.compile(r'(?<![\d.]) (?P<a_day_or_month>\d{1,2}([./-])) (?P<b_day_or_month>\d{1,2}\2) (?![\d.])', re.VERBOSE)
-        self.time = re.compile(r'(?<!\w)\d{1,2}(?:(?::\d{2}){1,2}){1,2}(?![\d:])')
-        self.en_time = re.compile(r'(?<![\w])(?P<a_time>\d{1,2}(?:(?:[.:]\d{2})){0,2}) ?(?P<b_am_pm>(?:[ap]m\b|[ap]\.m\.(?!\w)))', re.IGNORECASE)
-        self.en_us_phone_number = re.compile(r"(?<![\d-])(?:[2-9]\d{2}[/-])?\d{3}-\d{4}(?![\d-])")
-        self.en_numerical_identifiers = re.compile(r"(?<![\d-])\d+-(?:\d+-)+\d+(?![\d-])|(?<![\d/])\d+/(?:\d+/)+\d+(?![\d/])")
-        self.en_us_zip_code = re.compile(r"(?<![\d-])\d{5}-\d{4}(?![\d-])")
-        self.ordinal = re.compile(r'(?<![\w.])(?:\d{1,3}|\d{5,}|[3-9]\d{3})\.(?!\d)')
-        self.english_ordinal = re.compile(r'\b(?:\d+(?:,\d+)*)?(?:1st|2nd|3rd|\dth)\b')
-        self.english_decades = re.compile(r"\b(?:[12]\d)?\d0['’]?s\b")
-        self.fraction = re.compile(r'(?<!\w)\d+/\d+(?![\d/])')
-        self.amount = re.compile(r'(?<!\w)(?:\d+[\d,.]*-)(?!\w)')
-        self.semester = re.compile(r'(?<!\w)(?P<a_semester>[WS]S|SoSe|WiSe)(?P<b_jahr>\d\d(?:/\d\d)?)(?!\w)', re.IGNORECASE)
-        self.measurement = re.compile(r'(?<!\w)(?P<a_amount>[−+-]?\d*[,.]?\d+) ?(?P<b_unit>(?:mm|cm|dm|m|km)(?:\^?[23])?|bit|cent|eur|f|ft|g|ghz|h|hz|kg|l|lb|min|ml|qm|s|sek)(?!\w)', re.IGNORECASE)
+        self.three_part_date_year_first = LazyPattern(r'(?<![\d.]) (?P<a_year>\d{4}) (?P<b_month_or_day>([/-])\d{1,2}) (?P<c_day_or_month>\3\d{1,2}) (?![\d.])', re.VERBOSE)
+        self.three_part_date_dmy = LazyPattern(r'(?<![\d.]) (?P<a_day>(?:0?[1-9]|1[0-9]|2[0-9]|3[01])([./-])) (?P<b_month>(?:0?[1-9]|1[0-2])\2) (?P<c_year>(?:\d\d){1,2}) (?![\d.])', re.VERBOSE)
+        self.three_part_date_mdy = LazyPattern(r'(?<![\d.]) (?P<a_month>(?:0?[1-9]|1[0-2])([./-])) (?P<b_day>(?:0?[1-9]|1[0-9]|2[0-9]|3[01])\2) (?P<c_year>(?:\d\d){1,2}) (?![\d.])', re.VERBOSE)
+        self.two_part_date = LazyPattern(r'(?<![\d.]) (?P<a_day_or_month>\d{1,2}([./-])) (?P<b_day_or_month>\d{1,2}\2) (?![\d.])', re.VERBOSE)
+        self.time = LazyPattern(r'(?<!\w)\d{1,2}(?:(?::\d{2}){1,2}){1,2}(?![\d:])')
+        self.en_time = LazyPattern(r'(?<![\w])(?P<a_time>\d{1,2}(?:(?:[.:]\d{2})){0,2}) ?(?P<b_am_pm>(?:[ap]m\b|[ap]\.m\.(?!\w)))', re.IGNORECASE)
+        self.en_us_phone_number = LazyPattern(r"(?<![\d-])(?:[2-9]\d{2}[/-])?\d{3}-\d{4}(?![\d-])")
+        self.en_numerical_identifiers = LazyPattern(r"(?<![\d-])\d+-(?:\d+-)+\d+(?![\d-])|(?<![\d/])\d+/(?:\d+/)+\d+(?![\d/])")
+        self.en_us_zip_code = LazyPattern(r"(?<![\d-])\d{5}-\d{4}(?![\d-])")
+        self.ordinal = LazyPattern(r'(?<![\w.])(?:\d{1,3}|\d{5,}|[3-9]\d{3})\.(?!\d)')
+        self.english_ordinal = LazyPattern(r'\b(?:\d+(?:,\d+)*)?(?:1st|2nd|3rd|\dth)\b')
+        self.english_decades = LazyPattern(r"\b(?:[12]\d)?\d0['’]?s\b")
+        self.fraction = LazyPattern(r'(?<!\w)\d+/\d+(?![\d/])')
+        self.amount = LazyPattern(r'(?<!\w)(?:\d+[\d,.]*-)(?!\w)')
+        self.semester = LazyPattern(r'(?<!\w)(?P<a_semester>[WS]S|SoSe|WiSe)(?P<b_jahr>\d\d(?:/\d\d)?)(?!\w)', re.IGNORECASE)
+        self.measurement = LazyPattern(r'(?<!\w)(?P<a_amount>[−+-]?\d*[,.]?\d+) ?(?P<b_unit>(?:mm|cm|dm|m|km)(?:\^?[23])?|bit|cent|eur|f|ft|g|ghz|h|hz|kg|l|lb|min|ml|qm|s|sek)(?!\w)', re.IGNORECASE)
         # auch Web2.0
-        self.number_compound = re.compile(r'(?<!\w) (?:\d+-?[\p{L}@][\p{L}@-]* | [\p{L}@][\p{L}@-]*-?\d+(?:\.\d)?) (?!\w)', re.VERBOSE)
-        self.number = re.compile(r"""(?<!\w|\d[.,]?)
+        self.number_compound = LazyPattern(r'(?<!\w) (?:\d+-?[\p{L}@][\p{L}@-]* | [\p{L}@][\p{L}@-]*-?\d+(?:\.\d)?) (?!\w)', re.VERBOSE)
+        self.number = LazyPattern(r"""(?<!\w|\d[.,]?)
                                      (?:[−+-]?              # optional sign
                                        (?:\d*               # optional digits before decimal point
                                        [.,])?               # optional decimal point
@@ -236,19 +317,19 @@ class Tokenizer(object):
                                        \d{1,3}(?:,\d{3})+(?:[.]\d+)?  # comma for thousands, dot for decimals: 1,999.95
                                        )
                                      (?![.,]?\d)""", re.VERBOSE)
-        self.ipv4 = re.compile(r"(?<!\w|\d[.,]?)(?:\d{1,3}[.]){3}\d{1,3}(?![.,]?\d)")
-        self.section_number = re.compile(r"(?<!\w|\d[.,]?)(?:\d+[.])+\d+[.]?(?![.,]?\d)")
+        self.ipv4 = LazyPattern(r"(?<!\w|\d[.,]?)(?:\d{1,3}[.]){3}\d{1,3}(?![.,]?\d)")
+        self.section_number = LazyPattern(r"(?<!\w|\d[.,]?)(?:\d+[.])+\d+[.]?(?![.,]?\d)")
 
         # PUNCTUATION
-        self.quest_exclam = re.compile(r"([!?]+)")
+        self.quest_exclam = LazyPattern(r"([!?]+)")
         # arrows
-        self.space_right_arrow = re.compile(r'(-+)\s+(>)')
-        self.space_left_arrow = re.compile(r'(<)\s+(-+)')
-        self.arrow = re.compile(r'(-+>|<-+|[\u2190-\u21ff])')
+        self.space_right_arrow = LazyPattern(r'(-+)\s+(>)')
+        self.space_left_arrow = LazyPattern(r'(<)\s+(-+)')
+        self.arrow = LazyPattern(r'(-+>|<-+|[\u2190-\u21ff])')
         # parens
-        self.paired_paren = re.compile(r'([(])(?!inn)([^()]*)([)])')
-        self.paired_bracket = re.compile(r'(\[)([^][]*)(\])')
-        self.paren = re.compile(r"""((?:(?<!\w)   # no alphanumeric character
+        self.paired_paren = LazyPattern(r'([(])(?!inn)([^()]*)([)])')
+        self.paired_bracket = LazyPattern(r'(\[)([^][]*)(\])')
+        self.paren = LazyPattern(r"""((?:(?<!\w)   # no alphanumeric character
                                        [[{(]      # opening paren
                                        (?=\w)) |  # alphanumeric character
                                      (?:(?<=\w)   # alphanumeric character
@@ -261,13 +342,13 @@ class Tokenizer(object):
                                        [)]        # closing paren
                                        (?=\w)))   # alphanumeric character
                                  """, re.VERBOSE)
-        self.all_paren = re.compile(r"(?<=\s)[][(){}](?=\s)")
-        self.de_slash = re.compile(r'(/+)(?!in(?:nen)?|en)')
+        self.all_paren = LazyPattern(r"(?<=\s)[][(){}](?=\s)")
+        self.de_slash = LazyPattern(r'(/+)(?!in(?:nen)?|en)')
         # English possessive and contracted forms
-        self.en_trailing_apos = re.compile(r"(?<!..in|')(['’])(?!\w)")
-        self.en_dms = re.compile(r"(?<=\w)(['’][dms])\b", re.IGNORECASE)
-        self.en_llreve = re.compile(r"(?<=\w)(['’](?:ll|re|ve))\b", re.IGNORECASE)
-        self.en_not = re.compile(r"(?<=\w)(n['’]t)\b", re.IGNORECASE)
+        self.en_trailing_apos = LazyPattern(r"(?<!..in|')(['’])(?!\w)")
+        self.en_dms = LazyPattern(r"(?<=\w)(['’][dms])\b", re.IGNORECASE)
+        self.en_llreve = LazyPattern(r"(?<=\w)(['’](?:ll|re|ve))\b", re.IGNORECASE)
+        self.en_not = LazyPattern(r"(?<=\w)(n['’]t)\b", re.IGNORECASE)
         en_twopart_contractions = [r"\b(a)(lot)\b", r"\b(gon)(na)\b", r"\b(got)(ta)\b", r"\b(lem)(me)\b",
                                    r"\b(out)(ta)\b", r"\b(wan)(na)\b", r"\b(c'm)(on)\b",
                                    r"\b(more)(['’]n)\b", r"\b(d['’])(ye)\b", r"(?<!\w)(['’]t)(is)\b",
@@ -281,70 +362,400 @@ class Tokenizer(object):
                                    r"\b(would)(nt)\b", r"\b(you)(ll)\b", r"\b(let)(s)\b"]
         en_threepart_contractions = [r"\b(du)(n)(no)\b", r"\b(wha)(dd)(ya)\b", r"\b(wha)(t)(cha)\b", r"\b(i)('m)(a)\b"]
         # w/o, w/out, b/c, b/t, l/c, w/, d/c, u/s
-        self.en_slash_words = re.compile(r"\b(?:w/o|w/out|b/t|l/c|b/c|d/c|u/s)\b|\bw/(?!\w)", re.IGNORECASE)
+        self.en_slash_words = LazyPattern(r"\b(?:w/o|w/out|b/t|l/c|b/c|d/c|u/s)\b|\bw/(?!\w)", re.IGNORECASE)
         # word--word
-        self.en_double_hyphen = re.compile(r"(?<=\w)--+(?=\w)")
-        self.en_twopart_contractions = [re.compile(contr, re.IGNORECASE) for contr in en_twopart_contractions]
-        self.en_threepart_contractions = [re.compile(contr, re.IGNORECASE) for contr in en_threepart_contractions]
+        self.en_double_hyphen = LazyPattern(r"(?<=\w)--+(?=\w)")
+        self.en_twopart_contractions = [LazyPattern(contr, re.IGNORECASE) for contr in en_twopart_contractions]
+        self.en_threepart_contractions = [LazyPattern(contr, re.IGNORECASE) for contr in en_threepart_contractions]
         # English hyphenated words
         if self.language == "en":
-            nonbreaking_prefixes = utils.read_abbreviation_file("non-breaking_prefixes_%s.txt" % self.language)
-            nonbreaking_suffixes = utils.read_abbreviation_file("non-breaking_suffixes_%s.txt" % self.language)
-            nonbreaking_words = utils.read_abbreviation_file("non-breaking_hyphenated_words_%s.txt" % self.language)
-            self.en_nonbreaking_prefixes = re.compile(r"(?<![\w-])(?:" + r'|'.join([re.escape(_) for _ in nonbreaking_prefixes]) + r")-[\w-]+", re.IGNORECASE)
-            self.en_nonbreaking_suffixes = re.compile(r"\b[\w-]+-(?:" + r'|'.join([re.escape(_) for _ in nonbreaking_suffixes]) + r")(?![\w-])", re.IGNORECASE)
-            self.en_nonbreaking_words = re.compile(r"\b(?:" + r'|'.join([re.escape(_) for _ in nonbreaking_words]) + r")\b", re.IGNORECASE)
-        self.hyphen = re.compile(r"(?<=\w)(-)(?=\w)")
-        self.en_no = re.compile(r"\b(no\.)\s*(?=\d)", re.IGNORECASE)
-        self.en_degree = re.compile(r"(?<=\d ?)°(?:F|C|Oe)\b", re.IGNORECASE)
+            nonbreaking_prefixes = utils.Lexicon.load("non-breaking_prefixes_%s.txt" % self.language)
+            nonbreaking_suffixes = utils.Lexicon.load("non-breaking_suffixes_%s.txt" % self.language)
+            nonbreaking_words = utils.Lexicon.load("non-breaking_hyphenated_words_%s.txt" % self.language)
+            # for these short lexicons, regular expressions are faster
+            # than lexicon matchers
+            self.en_nonbreaking_prefixes = Lazy(nonbreaking_prefixes.regex, r"(?<![\w-])", r"-[\w-]+", re.IGNORECASE)
+            self.en_nonbreaking_suffixes = Lazy(nonbreaking_suffixes.regex, r"\b[\w-]+-", r"(?![\w-])", re.IGNORECASE)
+            self.en_nonbreaking_words = Lazy(nonbreaking_words.regex, r"\b", r"\b", re.IGNORECASE)
+        self.hyphen = LazyPattern(r"(?<=\w)(-)(?=\w)")
+        self.en_no = LazyPattern(r"\b(no\.)\s*(?=\d)", re.IGNORECASE)
+        self.en_degree = LazyPattern(r"(?<=\d ?)°(?:F|C|Oe)\b", re.IGNORECASE)
         # quotation marks
         # L'Enfer, d'accord, O'Connor
-        self.letter_apostrophe_word = re.compile(r"\b([dlo]['’]\p{L}+)\b", re.IGNORECASE)
-        self.paired_double_latex_quote = re.compile(r"(?<!`)(``)([^`']+)('')(?!')")
-        self.paired_single_latex_quote = re.compile(r"(?<!`)(`)([^`']+)(')(?!')")
-        self.paired_single_quot_mark = re.compile(r"(['‚‘’])([^']+)(['‘’])")
-        self.all_quote = re.compile(r"(?<=\s)(?:``|''|`|['‚‘’])(?=\s)")
-        self.other_punctuation = re.compile(r'([#<>%‰€$£₤¥°@~*„“”‚‘"»«›‹,;:+×÷±≤≥=&–—])')
-        self.en_quotation_marks = re.compile(r'([„“”‚‘’"»«›‹])')
-        self.en_other_punctuation = re.compile(r'([#<>%‰€$£₤¥°@~*,;:+×÷±≤≥=&/–—-]+)')
-        self.ellipsis = re.compile(r'\.{2,}|…+(?:\.{2,})?')
-        self.dot_without_space = re.compile(r'(?<=\p{Ll}{2})(\.)(?=\p{Lu}\p{Ll}{2})')
+        self.letter_apostrophe_word = LazyPattern(r"\b([dlo]['’]\p{L}+)\b", re.IGNORECASE)
+        self.paired_double_latex_quote = LazyPattern(r"(?<!`)(``)([^`']+)('')(?!')")
+        self.paired_single_latex_quote = LazyPattern(r"(?<!`)(`)([^`']+)(')(?!')")
+        self.paired_single_quot_mark = LazyPattern(r"(['‚‘’])([^']+)(['‘’])")
+        self.all_quote = LazyPattern(r"(?<=\s)(?:``|''|`|['‚‘’])(?=\s)")
+        self.other_punctuation = LazyPattern(r'([#<>%‰€$£₤¥°@~*„“”‚‘"»«›‹,;:+×÷±≤≥=&–—])')
+        self.en_quotation_marks = LazyPattern(r'([„“”‚‘’"»«›‹])')
+        self.en_other_punctuation = LazyPattern(r'([#<>%‰€$£₤¥°@~*,;:+×÷±≤≥=&/–—-]+)')
+        self.ellipsis = LazyPattern(r'\.{2,}|…+(?:\.{2,})?')
+        self.dot_without_space = LazyPattern(r'(?<=\p{Ll}{2})(\.)(?=\p{Lu}\p{Ll}{2})')
         # self.dot = re.compile(r'(?<=[\w)])(\.)(?![\w])')
-        self.dot = re.compile(r'(\.)')
+        self.dot = LazyPattern(r'(\.)')
         # Soft hyphen ­ „“
 
-    def _get_unique_prefix(self, text):
-        """Return a string that is not a substring of text."""
-        alphabet = "abcdefghijklmnopqrstuvwxyz"
-        # create random string of length self.unique_string_length
-        unique_string = ""
-        while unique_string in text:
-            unique_string = "".join(random.choice(alphabet) for _ in range(self.unique_string_length))
-        return unique_string
+        # FUSED STAGES
+        # Consecutive stages that are found in a single scan and only
+        # applied to the chunks of the paragraph that contain matches
+        self.xml_entity = FusedRegex([self.entity_name, self.entity_decimal, self.entity_hex], first="&")
+        self.date = FusedRegex([self.three_part_date_year_first, self.three_part_date_dmy, self.three_part_date_mdy, self.two_part_date], first=r"\d")
+        # (number, ipv4 and section_number are not fused: they match
+        # in most paragraphs that contain digits, where fusing adds a
+        # scan instead of saving one)
+        # (the two-part contractions start with one of these words or
+        # with an apostrophe; without this prefilter, trying all
+        # alternatives at every position makes the fused scan slower
+        # than the sequential stages)
+        self.en_twopart_contraction = FusedRegex(self.en_twopart_contractions, first=r"(?i:\b(?:a|gon|got|lem|out|wan|c'm|more|d['’]|there|i|you|he|she|ai|are|is|do|does|did|they|have|has|can|ca|could|wo|would|let)|['’]t)")
+        self.en_threepart_contraction = FusedRegex(self.en_threepart_contractions)
+
+        # TRIGGERS
+        # For each stage, the character classes of which a match
+        # necessarily contains at least one character each. Stages
+        # are skipped if one of their triggers does not occur in the
+        # paragraph. Earlier stages only remove characters or insert
+        # spaces and placeholders, so checking the input paragraph
+        # once is sufficient.
+        digit, apostrophe = r"\d", r"['’]"
+        triggers = [(self.xml_declaration, ["<"]),
+                    (self.tag, ["<"]),
+                    (self.email, [r"[@\[]"]),
+                    (self.unicode_flags, [r"\p{Regional_Indicator}"]),
+                    ("emojis", [r"[\p{Extended_Pictographic}\p{Emoji_Presentation}\uFE0F]"]),
+                    (self.space_emoticon, ["[:;]"]),
+                    (self.simple_url_with_brackets, [r"\(", r"\)", r"[./]"]),
+                    (self.simple_url, [r"[./]", r"[:wW]"]),
+                    (self.doi, [":", "/", digit]),
+                    (self.doi_with_space, [":", "/", digit]),
+                    (self.url_without_protocol, [r"\."]),
+                    (self.reddit_links, ["/"]),
+                    (self.xml_entity, ["&", ";"]),
+                    (self.heart_emoticon, [r"\^"]),
+                    (self.emoticon, [r"[:;8()=\^\\*_xXO]"]),
+                    (self.mention, ["@"]),
+                    (self.hashtag, ["#"]),
+                    (self.action_word, [r"\*"]),
+                    (self.underline, ["_"]),
+                    (self.emoji, ["Q"]),
+                    (self.token_with_plus_ampersand, ["[&+]"]),
+                    (self.simple_plus_ampersand_candidates, ["[&+]"]),
+                    (self.in_and_innen, ["I"]),
+                    (self.gender_star, [r"\*"]),
+                    (self.english_decades, [digit]),
+                    (self.en_dms, [apostrophe]),
+                    (self.en_llreve, [apostrophe]),
+                    (self.en_not, [apostrophe]),
+                    (self.en_trailing_apos, [apostrophe]),
+                    (self.en_no, [r"\.", digit]),
+                    (self.en_degree, ["°"]),
+                    (self.and_cetera, ["&", r"\."]),
+                    (self.str_abbreviations, ["-", r"\."]),
+                    (self.date, [digit, "[./-]"]),
+                    (self.en_time, [digit]),
+                    (self.time, [digit, ":"]),
+                    (self.en_us_phone_number, [digit, "-"]),
+                    (self.en_us_zip_code, [digit, "-"]),
+                    (self.en_numerical_identifiers, [digit, "[/-]"]),
+                    (self.ordinal, [digit, r"\."]),
+                    (self.english_ordinal, [digit]),
+                    (self.fraction, [digit, "/"]),
+                    (self.amount, [digit, "-"]),
+                    (self.semester, [digit]),
+                    (self.measurement, [digit]),
+                    (self.number_compound, [digit]),
+                    (self.number, [digit]),
+                    (self.ipv4, [digit, r"\."]),
+                    (self.section_number, [digit, r"\."]),
+                    (self.quest_exclam, ["[!?]"]),
+                    (self.space_right_arrow, ["-", ">"]),
+                    (self.space_left_arrow, ["<", "-"]),
+                    (self.arrow, [r"[-\u2190-\u21ff]"]),
+                    (self.paired_paren, [r"\(", r"\)"]),
+                    (self.paired_bracket, [r"\[", r"\]"]),
+                    (self.paren, [r"[][(){}]"]),
+                    (self.all_paren, [r"[][(){}]"]),
+                    (self.en_slash_words, ["/"]),
+                    (self.de_slash, ["/"]),
+                    (self.letter_apostrophe_word, [apostrophe]),
+                    (self.paired_double_latex_quote, ["`"]),
+                    (self.paired_single_latex_quote, ["`"]),
+                    (self.paired_single_quot_mark, ["['‚‘’]"]),
+                    (self.all_quote, ["[`'‚‘’]"]),
+                    (self.en_double_hyphen, ["-"]),
+                    (self.en_quotation_marks, [self.en_quotation_marks.pattern]),
+                    (self.en_other_punctuation, [self.en_other_punctuation.pattern]),
+                    (self.other_punctuation, [self.other_punctuation.pattern]),
+                    (self.letter_hyphen, ["-"]),
+                    (self.hyphen, ["-"]),
+                    (self.ellipsis, ["[.…]"]),
+                    (self.dot_without_space, [r"\."]),
+                    (self.dot, [r"\."])]
+        if self.language == "en":
+            triggers.extend([(self.en_nonbreaking_words, ["-"]),
+                             (self.en_nonbreaking_prefixes, ["-"]),
+                             (self.en_nonbreaking_suffixes, ["-"])])
+        # (the lexicon of camelCase tokens is only needed, and its
+        # matcher only built, if camelCase tokens are split)
+        if self.split_camel_case and self.camel_case_token.anchors is not None:
+            anchors = sorted(self.camel_case_token.anchors | set(":"))
+            triggers.append((self.camel_case_token, ["[%s]" % "".join(re.escape(c) for c in anchors)]))
+        attribute_names = {id(value): name for name, value in vars(self).items()}
+        self.trigger_classes = []
+        self.stage_triggers = {}
+        self.stage_names = {}
+        for stage, classes in triggers:
+            self.stage_names[stage] = attribute_names.get(id(stage), stage)
+            bits = 0
+            for character_class in classes:
+                if character_class not in self.trigger_classes:
+                    self.trigger_classes.append(character_class)
+                bits |= 1 << self.trigger_classes.index(character_class)
+            self.stage_triggers[stage] = bits
+        self.trigger_classes = [re.compile(c) for c in self.trigger_classes]
+        self.character_triggers = {}
+        self.present_triggers = -1
+        # how often guarded stages have been executed or skipped
+        self.executed_stages = collections.Counter()
+        self.skipped_stages = collections.Counter()
+
+        # PIPELINE
+        self.stages = self._build_stages()
+
+        if user_lexicons is not None:
+            for kind, paths in user_lexicons.items():
+                for path in paths:
+                    self.load_user_lexicon(kind, path)
+
+    @classmethod
+    def get(cls, split_camel_case=False, token_classes=False, extra_info=False, language="de", disabled_groups=()):
+        """Return the tokenizer with the given configuration (see
+        Tokenizer.__init__), which is only created once per process.
+
+        The compiled regular expressions and lexicon matchers are
+        shared by all tokenizers, no matter how they were created;
+        Tokenizer.get also saves the construction of the stages and
+        the memory for them. Since a tokenizer keeps state while it
+        tokenizes a paragraph, a tokenizer returned by Tokenizer.get
+        must not be used by several threads at the same time and
+        should not be modified (e.g. by loading user lexicons).
 
-    def _get_unique_suffix(self):
-        """Obtain a unique suffix for combination with self.unique_prefix.
+        """
+        language = language if language in cls.supported_languages else cls.default_language
+        key = (split_camel_case, token_classes, extra_info, language, tuple(sorted(set(disabled_groups))))
+        tokenizer = cls._instances.get(key)
+        if tokenizer is None:
+            tokenizer = cls._instances.setdefault(key, cls(split_camel_case, token_classes, extra_info, language, disabled_groups))
+        return tokenizer
+
+    @classmethod
+    def footprints(cls):
+        """Return the approximate memory footprints in bytes of the state
+        that is shared by all tokenizers (key "shared": compiled
+        regular expressions, lexicon matchers and lexicons) and of
+        the rest of each tokenizer created via Tokenizer.get (keyed
+        by its configuration, see Tokenizer.get). Lazily compiled
+        patterns and matchers only count once they have been used (or
+        after warmup).
 
         """
-        digits = "abcdefghijklmnopqrstuvwxyz"
-        n = self.replacement_counter
-        b26 = ""
-        while n > 0:
-            quotient, remainder = divmod(n, 26)
-            b26 = digits[remainder] + b26
-            n = quotient
-        self.replacement_counter += 1
-        return b26.rjust(self.unique_string_length, "a")
+        seen = set()
+        footprints = {"shared": utils.deep_size(shared_objects(), seen) + utils.deep_size(utils.Lexicon._loaded, seen)}
+        for key, tokenizer in cls._instances.items():
+            footprints[key] = utils.deep_size(tokenizer, set(seen))
+        return footprints
+
+    def _update_configuration(self):
+        """Set self.configuration, i.e. everything that affects the result
+        of tokenize_paragraph (the user lexicons are represented by a
+        digest of their entries).
+
+        """
+        user_lexicons = ""
+        if any(len(entries) > 0 for entries in self.user_entries.values()):
+            # imported here, so that importing somajo does not load it
+            import hashlib
+            digest = hashlib.sha256()
+            for kind in sorted(self.user_entries):
+                digest.update(("\n".join([kind] + sorted(self.user_entries[kind])) + "\0").encode("utf-8"))
+            user_lexicons = digest.hexdigest()
+        self.configuration = (self.split_camel_case, self.token_classes, self.extra_info, self.language, tuple(sorted(self.disabled_groups)), user_lexicons)
+
+    def load_user_lexicon(self, kind, path):
+        """Add the entries of the lexicon file path (one entry per line,
+        lines starting with # are comments) to the user lexicon of the
+        given kind (see Tokenizer.user_lexicon_kinds). The entries are
+        recognized as single tokens if they are not preceded or
+        followed by a letter, digit or underscore; abbreviations and
+        tokens with plus or ampersand are matched case-insensitively.
+
+        The entries of multi-word expression lexicons are sequences
+        of tokens (as output by the tokenizer) separated by spaces,
+        optionally followed by a tab and a token class (default:
+        multiword). After tokenization, the longest sequences of
+        tokens that are entries are merged into single tokens (that
+        contain a space where the original text does).
+
+        Only the matcher of this kind of user lexicon is updated. The
+        file is read again by reload_user_lexicons if it has changed.
+
+        """
+        if kind not in self.user_lexicon_kinds:
+            raise ValueError("Unknown user lexicon kind: %s" % kind)
+        modified, entries = self._read_user_lexicon(kind, path)
+        self.user_lexicon_files[kind][path] = modified
+        matcher = self.user_matchers.get(kind)
+        if matcher is None:
+            matcher = self.user_matchers[kind] = self._new_user_matcher(kind)
+        self._add_user_entries(kind, matcher, self.user_entries[kind], entries)
+        self._update_configuration()
+
+    def reload_user_lexicons(self):
+        """Read the files of the user lexicons again if one of them has
+        changed since it was loaded. Files that can no longer be read
+        (e.g. because they have been deleted) are dropped. The
+        matchers of the other kinds of user lexicons are kept. Return
+        the kinds that have been reloaded.
+
+        All files of a kind are read before its lexicon is replaced,
+        so if one of them is invalid (ValueError), that kind keeps its
+        previous entries and files.
+
+        """
+        reloaded = []
+        try:
+            for kind, files in self.user_lexicon_files.items():
+                changed = False
+                for path, modified in files.items():
+                    try:
+                        changed = os.path.getmtime(path) != modified
+                    except OSError:
+                        changed = True
+                    if changed:
+                        break
+                if not changed:
+                    continue
+                new_files, new_entries, matcher = {}, set(), self._new_user_matcher(kind)
+                for path in files:
+                    try:
+                        modified, entries = self._read_user_lexicon(kind, path)
+                    except OSError:
+                        continue
+                    new_files[path] = modified
+                    self._add_user_entries(kind, matcher, new_entries, entries)
+                self.user_lexicon_files[kind] = new_files
+                self.user_entries[kind] = new_entries
+                self.user_matchers[kind] = matcher
+                reloaded.append(kind)
+        finally:
+            self._update_configuration()
+        return reloaded
+
+    def _read_user_lexicon(self, kind, path):
+        """Return the modification time and the entries of the lexicon
+        file path for a user lexicon of the given kind.
+
+        """
+        modified = os.path.getmtime(path)
+        entries = resources.read_lexicon_file(path)
+        if kind != "multiword_expressions":
+            for entry in entries:
+                if self.spaces.search(entry):
+                    raise ValueError("Entries of user lexicons must not contain whitespace: %r (%s)" % (entry, path))
+        return modified, entries
+
+    def _new_user_matcher(self, kind):
+        """Return an empty matcher for a user lexicon of the given kind."""
+        if kind == "multiword_expressions":
+            return TokenTrie()
+        return LexiconMatcher((), ignore_case=kind != "camel_case", before=r"(?<!\w)", after=r"(?!\w)")
+
+    def _add_user_entries(self, kind, matcher, known, entries):
+        """Add the entries that are not in the set known to known and to
+        matcher.
+
+        """
+        for entry in entries:
+            if entry in known:
+                continue
+            known.add(entry)
+            if kind == "multiword_expressions":
+                tokens, _, token_class = entry.partition("\t")
+                matcher.add(tokens.split(), sys.intern(token_class.strip() or self.user_lexicon_kinds[kind]))
+            else:
+                matcher.add(entry)
+
+    def _scan_triggers(self, paragraph):
+        """Return a bitmap of the trigger classes that occur in
+        paragraph.
+
+        """
+        present = 0
+        for char in set(paragraph):
+            bits = self.character_triggers.get(char)
+            if bits is None:
+                bits = 0
+                for i, character_class in enumerate(self.trigger_classes):
+                    if character_class.match(char):
+                        bits |= 1 << i
+                self.character_triggers[char] = bits
+            present |= bits
+        return present
+
+    def _triggered(self, stage):
+        """Return False if stage cannot match in the current paragraph
+        because one of its triggers does not occur in it.
+
+        """
+        bits = self.stage_triggers.get(stage)
+        if bits is None:
+            return True
+        if bits & self.present_triggers == bits:
+            self.executed_stages[self.stage_names[stage]] += 1
+            return True
+        self.skipped_stages[self.stage_names[stage]] += 1
+        return False
+
+    def _get_placeholders(self, text):
+        """Return the characters from the Private Use Area that do not
+        occur in text.
+
+        """
+        used = set(self.private_use.findall(text))
+        if len(used) == 0:
+            return PRIVATE_USE_AREA
+        placeholders = PRIVATE_USE_AREA
+        for c in used:
+            placeholders = placeholders.replace(c, "")
+        if len(placeholders) < 2:
+            raise ValueError("Paragraph contains too many different characters from the Private Use Area")
+        return placeholders
 
     def _get_unique_string(self):
-        """Return a string that is not a substring of text."""
-        return self.unique_prefix + self._get_unique_suffix()
+        """Return a string that is not a substring of text, i.e.
+        self.replacement_counter written in base len(self.placeholders)
+        with self.placeholders as digits.
+
+        """
+        n = self.replacement_counter
+        self.replacement_counter += 1
+        base = len(self.placeholders)
+        if n < base:
+            return self.placeholders[n]
+        digits = []
+        while n > 0:
+            n, remainder = divmod(n, base)
+            digits.append(self.placeholders[remainder])
+        return "".join(reversed(digits))
 
     def _replace_regex(self, text, regex, token_class="regular", split_named_subgroups=True):
         """Replace instances of regex with unique strings and store
         replacements in mapping.
 
         """
+        if not self._triggered(regex):
+            return text
         replacements = {}
 
         def repl(match):
@@ -360,6 +771,25 @@ class Tokenizer(object):
             return " %s " % replacements[instance]
         return regex.sub(repl, text)
 
+    def _replace_user_lexicon(self, text, kind):
+        """Replace the entries of the user lexicon of the given kind with
+        unique strings.
+
+        """
+        matcher = self.user_matchers.get(kind)
+        if matcher is None:
+            return text
+        return self._replace_regex(text, matcher, self.user_lexicon_kinds[kind])
+
+    def _substitute(self, text, regex, repl):
+        """Apply regex.sub unless the stage cannot match in the current
+        paragraph.
+
+        """
+        if not self._triggered(regex):
+            return text
+        return regex.sub(repl, text)
+
     def _multipart_replace(self, instance, parts, token_class):
         """"""
         replacements = []
@@ -377,22 +807,28 @@ class Tokenizer(object):
 
     def _replace_emojis(self, paragraph, token_class):
         """Replace all emoji sequences"""
+        if not self._triggered("emojis"):
+            return paragraph
         replacements = {}
-        emojis = []
-        for m in re.finditer(r"\X", paragraph):
-            if m.end() - m.start() > 1:
-                if re.search(r"[\p{Extended_Pictographic}\p{Emoji_Presentation}\uFE0F]", m.group()):
-                    emojis.append(m.span())
-            else:
-                if re.search(r"[\p{Extended_Pictographic}\p{Emoji_Presentation}]", m.group()):
-                    emojis.append(m.span())
-        for emoji in reversed(emojis):
-            instance = paragraph[emoji[0]:emoji[1]]
+        pieces = []
+        position = 0
+        for m in self.emoji_candidate.finditer(paragraph):
+            instance = m.group()
+            if len(instance) > 1 and not self.emoji_character.search(instance):
+                continue
+            start, end = m.span()
             instance = instance.strip()
-            replacement = replacements.setdefault(instance, self._get_unique_string())
-            self.mapping[replacement] = Token(instance, token_class)
-            paragraph = paragraph[:emoji[0]] + " " + replacement + " " + paragraph[emoji[1]:]
-        return paragraph
+            if instance not in replacements:
+                replacements[instance] = self._get_unique_string()
+                self.mapping[replacements[instance]] = Token(instance, token_class)
+            replacement = " %s " % replacements[instance]
+            pieces.append(paragraph[position:start])
+            pieces.append(replacement)
+            position = end
+        if position == 0:
+            return paragraph
+        pieces.append(paragraph[position:])
+        return "".join(pieces)
 
     def _replace_abbreviations(self, text, split_multipart_abbrevs=True):
         """Replace instances of abbreviations with unique strings and store
@@ -426,6 +862,8 @@ class Tokenizer(object):
 
     def _replace_set(self, text, regex, items, token_class="regular", ignore_case=False):
         """Replace all elements from items in text with unique strings."""
+        if not self._triggered(regex):
+            return text
         replacements = {}
 
         def repl(match):
@@ -448,313 +886,441 @@ class Tokenizer(object):
         which tokens contained internal whitespace (to be able to
         annotate OriginalSpelling="...").
 
+        The normalized text is walked with a cursor, so that the
+        alignment takes linear time.
+
         """
         extra_info = ["" for _ in tokens]
         normalized = self.junk_between_spaces.sub(" ", original_text)
         normalized = self.spaces.sub(" ", normalized)
         normalized = normalized.strip()
+        position = 0
+        length = len(normalized)
         for token_index, t in enumerate(tokens):
             original_spelling = None
             token = t.token
-            token_length = len(token)
-            if normalized.startswith(token):
-                normalized = normalized[token_length:]
+            if normalized.startswith(token, position):
+                position += len(token)
             else:
-                orig = []
+                start = position
                 for char in token:
-                    first_char = None
-                    while first_char != char:
-                        try:
-                            first_char = normalized[0]
-                            normalized = normalized[1:]
-                            orig.append(first_char)
-                        except IndexError:
-                            warnings.warn("Error aligning tokens with original text!\nOriginal text: '%s'\nToken: '%s'\nRemaining normalized text: '%s'\nValue of orig: '%s'" % (original_text, token, normalized, "".join(orig)))
-                            break
-                original_spelling = "".join(orig)
-            m = self.starts_with_junk.search(normalized)
+                    position = normalized.find(char, position)
+                    if position == -1:
+                        position = length
+                        warnings.warn("Error aligning tokens with original text!\nOriginal text: '%s'\nToken: '%s'\nRemaining normalized text: '%s'\nValue of orig: '%s'" % (original_text, token, "", normalized[start:]))
+                        break
+                    position += 1
+                original_spelling = normalized[start:position]
+            m = self.starts_with_junk.match(normalized, position)
             if m:
                 if original_spelling is None:
                     original_spelling = token
-                original_spelling += normalized[:m.end()]
-                normalized = normalized[m.end():]
+                original_spelling += m.group()
+                position = m.end()
             if original_spelling is not None:
                 extra_info[token_index] = 'OriginalSpelling="%s"' % original_spelling
-            if len(normalized) > 0:
-                if normalized.startswith(" "):
-                    normalized = normalized[1:]
+            if position < length:
+                if normalized[position] == " ":
+                    position += 1
                 else:
                     if len(extra_info[token_index]) > 0:
                         extra_info[token_index] = ", " + extra_info[token_index]
                     extra_info[token_index] = "SpaceAfter=No" + extra_info[token_index]
         try:
-            assert len(normalized) == 0
+            assert position == length
         except AssertionError:
-            warnings.warn("AssertionError in this paragraph: '%s'\nTokens: %s\nRemaining normalized text: '%s'" % (original_text, tokens, normalized))
+            warnings.warn("AssertionError in this paragraph: '%s'\nTokens: %s\nRemaining normalized text: '%s'" % (original_text, tokens, normalized[position:]))
         return extra_info
 
     def _match_xml(self, tokens, elements):
-        """"""
-        agenda = list(reversed(tokens))
-        for element in elements:
-            original_text = unicodedata.normalize("NFC", element.text)
+        """Distribute the tokens over the text and tail of the elements
+        (see _align_xml).
+
+        """
+        self._set_xml_texts(elements, self._align_xml(tokens, [e.text for e in elements]))
+        return elements
+
+    @staticmethod
+    def _set_xml_texts(elements, tokenized_texts):
+        """Replace the text or tail of the elements with the tokenized
+        texts.
+
+        """
+        for element, tokenized_text in zip(elements, tokenized_texts):
+            if element.type == "text":
+                element.element.text = tokenized_text
+            elif element.type == "tail":
+                element.element.tail = tokenized_text
+
+    def _align_xml(self, tokens, texts):
+        """Distribute the tokens over the texts (of the elements of an XML
+        document), annotate them with SpaceAfter and OriginalSpelling
+        and return the tokenized texts.
+
+        Tokens are consumed in order and each normalized text is
+        walked with a cursor, so that the alignment takes linear time.
+        A token that crosses an element boundary is split: the rest of
+        it is aligned with the next element.
+
+        """
+        index = 0
+        rest = None
+        tokenized_texts = []
+        for text in texts:
+            original_text = unicodedata.normalize("NFC", text)
             normalized = self.junk_between_spaces.sub(" ", original_text)
             normalized = self.spaces.sub(" ", normalized)
             normalized = normalized.strip()
+            position = 0
+            length = len(normalized)
             output = []
-            while len(normalized) > 0:
-                t = agenda.pop()
+            while position < length:
+                if rest is not None:
+                    t, rest = rest, None
+                else:
+                    t = tokens[index]
+                    index += 1
                 original_spelling = None
                 extra_info = ""
                 token = t.token
-                if normalized.startswith(token):
-                    normalized = normalized[len(token):]
-                elif token.startswith(normalized):
-                    agenda.append(Token(token[len(normalized):].lstrip(), t.token_class))
-                    token = normalized
-                    normalized = ""
+                if normalized.startswith(token, position):
+                    position += len(token)
+                elif len(token) > length - position and token.startswith(normalized[position:]):
+                    rest = Token(token[length - position:].lstrip(), t.token_class)
+                    token = normalized[position:]
+                    position = length
                 else:
-                    orig = []
-                    processed = []
+                    start = position
                     for char in token:
-                        first_char = None
-                        while first_char != char:
-                            try:
-                                first_char = normalized[0]
-                                normalized = normalized[1:]
-                                orig.append(first_char)
-                            except IndexError:
-                                warnings.warn("Error aligning tokens with original text!\nOriginal text: '%s'\nToken: '%s'\nRemaining normalized text: '%s'\nValue of orig: '%s'" % (original_text, token, normalized, "".join(orig)))
-                                raise
-                                break
-                        else:
-                            processed.append(char)
-                    if len(processed) != len(token):
-                        agenda.append(Token(token[len(processed):].lstrip(), t.token_class))
-                        token = token[:len(processed)]
-                    original_spelling = "".join(orig)
-                m = self.starts_with_junk.search(normalized)
+                        position = normalized.find(char, position)
+                        if position == -1:
+                            warnings.warn("Error aligning tokens with original text!\nOriginal text: '%s'\nToken: '%s'\nRemaining normalized text: '%s'\nValue of orig: '%s'" % (original_text, token, "", normalized[start:]))
+                            raise IndexError("string index out of range")
+                        position += 1
+                    original_spelling = normalized[start:position]
+                m = self.starts_with_junk.match(normalized, position)
                 if m:
                     if original_spelling is None:
                         original_spelling = token
-                    original_spelling += normalized[:m.end()]
-                    normalized = normalized[m.end():]
+                    original_spelling += m.group()
+                    position = m.end()
                 if original_spelling is not None:
                     extra_info = 'OriginalSpelling="%s"' % original_spelling
-                if len(normalized) > 0:
-                    if normalized.startswith(" "):
-                        normalized = normalized[1:]
+                if position < length:
+                    if normalized[position] == " ":
+                        position += 1
                     else:
                         if len(extra_info) > 0:
                             extra_info = ", " + extra_info
                         extra_info = "SpaceAfter=No" + extra_info
                 output.append("\t".join((token, t.token_class, extra_info)))
             if len(output) > 0:
-                tokenized_text = "\n" + "\n".join(output) + "\n"
+                tokenized_texts.append("\n" + "\n".join(output) + "\n")
             else:
-                tokenized_text = "\n"
-            if element.type == "text":
-                element.element.text = tokenized_text
-            elif element.type == "tail":
-                element.element.tail = tokenized_text
+                tokenized_texts.append("\n")
+        left_over = len(tokens) - index + (rest is not None)
         try:
-            assert len(agenda) == 0
+            assert left_over == 0
         except AssertionError:
-            warnings.warn("AssertionError: %d tokens left over" % len(agenda))
+            warnings.warn("AssertionError: %d tokens left over" % left_over)
             raise
-        return elements
+        return tokenized_texts
 
-    def _tokenize(self, paragraph):
-        """Tokenize paragraph (may contain newlines) according to the
-        guidelines of the EmpiriST 2015 shared task on automatic
-        linguistic annotation of computer-mediated communication /
-        social media.
+    def _tokenize_xml_part(self, texts):
+        """Tokenize the texts (of consecutive elements of an XML document)
+        as a whole and return the tokenized texts (see _align_xml).
 
         """
-        # reset mappings for the current paragraph
-        self.mapping = {}
-        self.unique_prefix = self._get_unique_prefix(paragraph)
-
-        # normalize whitespace
-        paragraph = self.spaces.sub(" ", paragraph)
-
-        # get rid of control characters
-        paragraph = self.controls.sub("", paragraph)
-
-        # get rid of isolated variation selectors
-        paragraph = self.stranded_variation_selector.sub("", paragraph)
-
-        # normalize whitespace
-        paragraph = self.spaces.sub(" ", paragraph)
-
-        # Some tokens are allowed to contain whitespace. Get those out
-        # of the way first. We replace them with unique strings and
-        # undo that later on.
-        # - XML tags
-        paragraph = self._replace_regex(paragraph, self.xml_declaration, "XML_tag")
-        paragraph = self._replace_regex(paragraph, self.tag, "XML_tag")
-        # - email address obfuscation may involve spaces
-        paragraph = self._replace_regex(paragraph, self.email, "email_address")
+        # convert the text to Unicode normal form C (NFC)
+        whole_text = unicodedata.normalize("NFC", " ".join(texts))
+        # parts without text (e.g. between the end tags of nested
+        # elements) are not worth tokenizing
+        tokens = self._tokenize(whole_text) if whole_text.strip() != "" else []
+        return self._align_xml(tokens, texts)
+
+    def _build_stages(self):
+        """Return the stages of the tokenizer in the order in which they
+        are applied, leaving out the stages that are not needed for
+        the language and options of the tokenizer and the stages from
+        disabled groups.
 
-        # Emoji sequences can contain zero-width joiners. Get them out
-        # of the way next
-        paragraph = self._replace_regex(paragraph, self.unicode_flags, "emoticon")
-        paragraph = self._replace_emojis(paragraph, "emoticon")
-
-        # get rid of other junk characters
-        paragraph = self.other_nasties.sub("", paragraph)
-
-        # normalize whitespace
-        paragraph = self.spaces.sub(" ", paragraph)
+        """
+        def replace(name, group, regex, token_class="regular", **kwargs):
+            return Stage(name, group, functools.partial(self._replace_regex, regex=regex, token_class=token_class, **kwargs), (regex,))
 
-        # Some emoticons contain erroneous spaces. We fix this.
-        paragraph = self.space_emoticon.sub(r'\1\2', paragraph)
+        def substitute(name, group, regex, repl):
+            return Stage(name, group, functools.partial(self._substitute, regex=regex, repl=repl), (regex,))
 
-        # urls
-        paragraph = self._replace_regex(paragraph, self.simple_url_with_brackets, "URL")
-        paragraph = self._replace_regex(paragraph, self.simple_url, "URL")
-        paragraph = self._replace_regex(paragraph, self.doi, "DOI")
-        paragraph = self._replace_regex(paragraph, self.doi_with_space, "DOI")
-        paragraph = self._replace_regex(paragraph, self.url_without_protocol, "URL")
-        paragraph = self._replace_regex(paragraph, self.reddit_links, "URL")
-        # paragraph = self._replace_regex(paragraph, self.url)
+        def replace_set(name, group, regex, items, ignore_case=False):
+            return Stage(name, group, functools.partial(self._replace_set, regex=regex, items=items, ignore_case=ignore_case), (regex,))
 
-        # XML entities
-        paragraph = self._replace_regex(paragraph, self.entity_name, "XML_entity")
-        paragraph = self._replace_regex(paragraph, self.entity_decimal, "XML_entity")
-        paragraph = self._replace_regex(paragraph, self.entity_hex, "XML_entity")
-
-        # replace emoticons with unique strings so that they are out
-        # of the way
-        paragraph = self.spaces.sub(" ", paragraph)
-        paragraph = self._replace_regex(paragraph, self.heart_emoticon, "emoticon")
-        paragraph = self._replace_regex(paragraph, self.emoticon, "emoticon")
-        # paragraph = self._replace_regex(paragraph, self.unicode_symbols, "emoticon")
-
-        # mentions, hashtags
-        paragraph = self._replace_regex(paragraph, self.mention, "mention")
-        paragraph = self._replace_regex(paragraph, self.hashtag, "hashtag")
-        # action words
-        paragraph = self._replace_regex(paragraph, self.action_word, "action_word")
-        # underline
-        paragraph = self.underline.sub(r' \1 \2 \3 ', paragraph)
-        # textual representations of emoji
-        paragraph = self._replace_regex(paragraph, self.emoji, "emoticon")
-
-        paragraph = self._replace_regex(paragraph, self.token_with_plus_ampersand)
-        paragraph = self._replace_set(paragraph, self.simple_plus_ampersand_candidates, self.simple_plus_ampersand, ignore_case=True)
+        def user_lexicon(kind, group):
+            # the matcher is looked up when the stage is applied, so
+            # that user lexicons can be loaded at any time
+            return Stage("user_" + kind, group, functools.partial(self._replace_user_lexicon, kind=kind), ())
 
+        split_abbreviations = False if self.language == "en" else True
+        split_dates = False if self.language == "en" else True
+        stages = [
+            # normalize whitespace, get rid of control characters and
+            # isolated variation selectors
+            substitute("spaces", None, self.spaces, " "),
+            substitute("controls", None, self.controls, ""),
+            substitute("stranded_variation_selector", None, self.stranded_variation_selector, ""),
+            substitute("spaces", None, self.spaces, " "),
+            # Some tokens are allowed to contain whitespace. Get those
+            # out of the way first. We replace them with unique
+            # strings and undo that later on.
+            replace("xml_declaration", "xml_tags", self.xml_declaration, "XML_tag"),
+            replace("tag", "xml_tags", self.tag, "XML_tag"),
+            # email address obfuscation may involve spaces
+            replace("email", "emails", self.email, "email_address"),
+            # Emoji sequences can contain zero-width joiners. Get them
+            # out of the way next
+            replace("unicode_flags", "emojis", self.unicode_flags, "emoticon"),
+            Stage("emojis", "emojis", functools.partial(self._replace_emojis, token_class="emoticon"), (self.emoji_candidate, self.emoji_character)),
+            # get rid of other junk characters and normalize whitespace
+            substitute("other_nasties", None, self.other_nasties, ""),
+            substitute("spaces", None, self.spaces, " "),
+            # Some emoticons contain erroneous spaces. We fix this.
+            substitute("space_emoticon", "emoticons", self.space_emoticon, r'\1\2'),
+            # urls
+            replace("simple_url_with_brackets", "urls", self.simple_url_with_brackets, "URL"),
+            replace("simple_url", "urls", self.simple_url, "URL"),
+            replace("doi", "urls", self.doi, "DOI"),
+            replace("doi_with_space", "urls", self.doi_with_space, "DOI"),
+            replace("url_without_protocol", "urls", self.url_without_protocol, "URL"),
+            replace("reddit_links", "reddit_links", self.reddit_links, "URL"),
+            # XML entities
+            replace("xml_entity", "xml_entities", self.xml_entity, "XML_entity"),
+            # replace emoticons with unique strings so that they are
+            # out of the way
+            substitute("spaces", None, self.spaces, " "),
+            replace("heart_emoticon", "emoticons", self.heart_emoticon, "emoticon"),
+            replace("emoticon", "emoticons", self.emoticon, "emoticon"),
+            # mentions, hashtags, action words, underline
+            replace("mention", "mentions", self.mention, "mention"),
+            replace("hashtag", "hashtags", self.hashtag, "hashtag"),
+            replace("action_word", "action_words", self.action_word, "action_word"),
+            substitute("underline", "underline", self.underline, r' \1 \2 \3 '),
+            # textual representations of emoji
+            replace("emoji", "emoji_names", self.emoji, "emoticon"),
+            replace("token_with_plus_ampersand", "plus_ampersand", self.token_with_plus_ampersand),
+            replace_set("simple_plus_ampersand", "plus_ampersand", self.simple_plus_ampersand_candidates, self.simple_plus_ampersand, ignore_case=True),
+            user_lexicon("plus_ampersand", "plus_ampersand"),
+        ]
         # camelCase
         if self.split_camel_case:
-            paragraph = self._replace_regex(paragraph, self.camel_case_token)
-            paragraph = self._replace_set(paragraph, self.simple_camel_case_candidates, self.simple_camel_case_tokens)
-            paragraph = self._replace_regex(paragraph, self.in_and_innen)
-            paragraph = self.camel_case.sub(r' \1', paragraph)
-
+            stages.extend([
+                user_lexicon("camel_case", "camel_case"),
+                replace("camel_case_token", "camel_case", self.camel_case_token),
+                replace_set("simple_camel_case_tokens", "camel_case", self.simple_camel_case_candidates, self.simple_camel_case_tokens),
+                replace("in_and_innen", "camel_case", self.in_and_innen),
+                substitute("camel_case", "camel_case", self.camel_case, r' \1'),
+            ])
         # gender star
-        paragraph = self._replace_regex(paragraph, self.gender_star)
-
+        stages.append(replace("gender_star", "gender_star", self.gender_star))
         # English possessive and contracted forms
         if self.language == "en":
-            paragraph = self._replace_regex(paragraph, self.english_decades, "number_compound")
-            paragraph = self._replace_regex(paragraph, self.en_dms, "regular")
-            paragraph = self._replace_regex(paragraph, self.en_llreve, "regular")
-            paragraph = self._replace_regex(paragraph, self.en_not, "regular")
-            paragraph = self.en_trailing_apos.sub(r' \1', paragraph)
-            for contraction in self.en_twopart_contractions:
-                paragraph = contraction.sub(r' \1 \2 ', paragraph)
-            for contraction in self.en_threepart_contractions:
-                paragraph = contraction.sub(r' \1 \2 \3 ', paragraph)
-            paragraph = self._replace_regex(paragraph, self.en_no, "regular")
-            paragraph = self._replace_regex(paragraph, self.en_degree, "regular")
-            paragraph = self._replace_regex(paragraph, self.en_nonbreaking_words, "regular")
-            paragraph = self._replace_regex(paragraph, self.en_nonbreaking_prefixes, "regular")
-            paragraph = self._replace_regex(paragraph, self.en_nonbreaking_suffixes, "regular")
-
+            stages.extend([
+                replace("english_decades", "numbers", self.english_decades, "number_compound"),
+                replace("en_dms", "contractions", self.en_dms),
+                replace("en_llreve", "contractions", self.en_llreve),
+                replace("en_not", "contractions", self.en_not),
+                substitute("en_trailing_apos", "contractions", self.en_trailing_apos, r' \1'),
+                substitute("en_twopart_contraction", "contractions", self.en_twopart_contraction, r' \1 \2 '),
+                substitute("en_threepart_contraction", "contractions", self.en_threepart_contraction, r' \1 \2 \3 '),
+                replace("en_no", "abbreviations", self.en_no),
+                replace("en_degree", "numbers", self.en_degree),
+                replace("en_nonbreaking_words", "hyphenated_words", self.en_nonbreaking_words),
+                replace("en_nonbreaking_prefixes", "hyphenated_words", self.en_nonbreaking_prefixes),
+                replace("en_nonbreaking_suffixes", "hyphenated_words", self.en_nonbreaking_suffixes),
+            ])
         # remove known abbreviations
-        split_abbreviations = False if self.language == "en" else True
-        paragraph = self._replace_abbreviations(paragraph, split_multipart_abbrevs=split_abbreviations)
-
+        abbreviation_patterns = (self.single_letter_ellipsis, self.and_cetera, self.str_abbreviations, self.nr_abbreviations,
+                                 self.single_token_abbreviation, self.single_letter_abbreviation, self.ps, self.abbreviation,
+                                 self.multipart_abbreviation)
+        stages.append(user_lexicon("abbreviations", "abbreviations"))
+        stages.append(Stage("abbreviations", "abbreviations", functools.partial(self._replace_abbreviations, split_multipart_abbrevs=split_abbreviations), abbreviation_patterns))
         # DATES AND NUMBERS
-        # dates
-        split_dates = False if self.language == "en" else True
-        paragraph = self._replace_regex(paragraph, self.three_part_date_year_first, "date", split_named_subgroups=split_dates)
-        paragraph = self._replace_regex(paragraph, self.three_part_date_dmy, "date", split_named_subgroups=split_dates)
-        paragraph = self._replace_regex(paragraph, self.three_part_date_mdy, "date", split_named_subgroups=split_dates)
-        paragraph = self._replace_regex(paragraph, self.two_part_date, "date", split_named_subgroups=split_dates)
+        stages.append(replace("date", "dates", self.date, "date", split_named_subgroups=split_dates))
         # time
         if self.language == "en":
-            paragraph = self._replace_regex(paragraph, self.en_time, "time")
-        paragraph = self._replace_regex(paragraph, self.time, "time")
+            stages.append(replace("en_time", "times", self.en_time, "time"))
+        stages.append(replace("time", "times", self.time, "time"))
         # US phone numbers and ZIP codes
         if self.language == "en":
-            paragraph = self._replace_regex(paragraph, self.en_us_phone_number, "number")
-            paragraph = self._replace_regex(paragraph, self.en_us_zip_code, "number")
-            paragraph = self._replace_regex(paragraph, self.en_numerical_identifiers, "number")
+            stages.extend([
+                replace("en_us_phone_number", "numbers", self.en_us_phone_number, "number"),
+                replace("en_us_zip_code", "numbers", self.en_us_zip_code, "number"),
+                replace("en_numerical_identifiers", "numbers", self.en_numerical_identifiers, "number"),
+            ])
         # ordinals
         if self.language == "de":
-            paragraph = self._replace_regex(paragraph, self.ordinal, "ordinal")
+            stages.append(replace("ordinal", "numbers", self.ordinal, "ordinal"))
         elif self.language == "en":
-            paragraph = self._replace_regex(paragraph, self.english_ordinal, "ordinal")
-        # fractions
-        paragraph = self._replace_regex(paragraph, self.fraction, "number")
-        # amounts (1.000,-)
-        paragraph = self._replace_regex(paragraph, self.amount, "amount")
-        # semesters
-        paragraph = self._replace_regex(paragraph, self.semester, "semester")
-        # measurements
-        paragraph = self._replace_regex(paragraph, self.measurement, "measurement")
-        # number compounds
-        paragraph = self._replace_regex(paragraph, self.number_compound, "number_compound")
-        # numbers
-        paragraph = self._replace_regex(paragraph, self.number, "number")
-        paragraph = self._replace_regex(paragraph, self.ipv4, "number")
-        paragraph = self._replace_regex(paragraph, self.section_number, "number")
-
-        # (clusters of) question marks and exclamation marks
-        paragraph = self._replace_regex(paragraph, self.quest_exclam, "symbol")
-        # arrows
-        paragraph = self.space_right_arrow.sub(r'\1\2', paragraph)
-        paragraph = self.space_left_arrow.sub(r'\1\2', paragraph)
-        paragraph = self._replace_regex(paragraph, self.arrow, "symbol")
-        # parens
-        paragraph = self.paired_paren.sub(r' \1 \2 \3 ', paragraph)
-        paragraph = self.paired_bracket.sub(r' \1 \2 \3 ', paragraph)
-        paragraph = self.paren.sub(r' \1 ', paragraph)
-        paragraph = self._replace_regex(paragraph, self.all_paren, "symbol")
+            stages.append(replace("english_ordinal", "numbers", self.english_ordinal, "ordinal"))
+        stages.extend([
+            # fractions, amounts (1.000,-), semesters, measurements,
+            # number compounds, numbers
+            replace("fraction", "numbers", self.fraction, "number"),
+            replace("amount", "numbers", self.amount, "amount"),
+            replace("semester", "numbers", self.semester, "semester"),
+            replace("measurement", "numbers", self.measurement, "measurement"),
+            replace("number_compound", "numbers", self.number_compound, "number_compound"),
+            replace("number", "numbers", self.number, "number"),
+            replace("ipv4", "numbers", self.ipv4, "number"),
+            replace("section_number", "numbers", self.section_number, "number"),
+            # (clusters of) question marks and exclamation marks
+            replace("quest_exclam", None, self.quest_exclam, "symbol"),
+            # arrows
+            substitute("space_right_arrow", None, self.space_right_arrow, r'\1\2'),
+            substitute("space_left_arrow", None, self.space_left_arrow, r'\1\2'),
+            replace("arrow", None, self.arrow, "symbol"),
+            # parens
+            substitute("paired_paren", None, self.paired_paren, r' \1 \2 \3 '),
+            substitute("paired_bracket", None, self.paired_bracket, r' \1 \2 \3 '),
+            substitute("paren", None, self.paren, r' \1 '),
+            replace("all_paren", None, self.all_paren, "symbol"),
+        ])
         # slash
         if self.language == "en":
-            paragraph = self._replace_regex(paragraph, self.en_slash_words, "regular")
+            stages.append(replace("en_slash_words", None, self.en_slash_words))
         if self.language == "de":
-            paragraph = self._replace_regex(paragraph, self.de_slash, "symbol")
-        # O'Connor and French omitted vocals: L'Enfer, d'accord
-        paragraph = self._replace_regex(paragraph, self.letter_apostrophe_word, "regular")
-        # LaTeX-style quotation marks
-        paragraph = self.paired_double_latex_quote.sub(r' \1 \2 \3 ', paragraph)
-        paragraph = self.paired_single_latex_quote.sub(r' \1 \2 \3 ', paragraph)
-        # single quotation marks, apostrophes
-        paragraph = self.paired_single_quot_mark.sub(r' \1 \2 \3 ', paragraph)
-        paragraph = self._replace_regex(paragraph, self.all_quote, "symbol")
+            stages.append(replace("de_slash", None, self.de_slash, "symbol"))
+        stages.extend([
+            # O'Connor and French omitted vocals: L'Enfer, d'accord
+            replace("letter_apostrophe_word", None, self.letter_apostrophe_word),
+            # LaTeX-style quotation marks
+            substitute("paired_double_latex_quote", None, self.paired_double_latex_quote, r' \1 \2 \3 '),
+            substitute("paired_single_latex_quote", None, self.paired_single_latex_quote, r' \1 \2 \3 '),
+            # single quotation marks, apostrophes
+            substitute("paired_single_quot_mark", None, self.paired_single_quot_mark, r' \1 \2 \3 '),
+            replace("all_quote", None, self.all_quote, "symbol"),
+        ])
         # other punctuation symbols
-        # paragraph = self._replace_regex(paragraph, self.dividing_line, "symbol")
         if self.language == "en":
-            paragraph = self._replace_regex(paragraph, self.en_double_hyphen, "symbol")
-            paragraph = self._replace_regex(paragraph, self.en_quotation_marks, "symbol")
-            paragraph = self._replace_regex(paragraph, self.en_other_punctuation, "symbol")
+            stages.extend([
+                replace("en_double_hyphen", None, self.en_double_hyphen, "symbol"),
+                replace("en_quotation_marks", None, self.en_quotation_marks, "symbol"),
+                replace("en_other_punctuation", None, self.en_other_punctuation, "symbol"),
+            ])
         else:
-            paragraph = self._replace_regex(paragraph, self.other_punctuation, "symbol")
+            stages.append(replace("other_punctuation", None, self.other_punctuation, "symbol"))
+        stages.extend([
+            # [mod] Hyphens
+            replace("letter_hyphen", None, self.letter_hyphen, "symbol"),
+            replace("hyphen", None, self.hyphen, "symbol"),
+            # ellipsis
+            replace("ellipsis", None, self.ellipsis, "symbol"),
+            # dots
+            replace("dot_without_space", None, self.dot_without_space, "symbol"),
+            replace("dot", None, self.dot, "symbol"),
+        ])
+        return [stage for stage in stages if stage.group not in self.disabled_groups]
 
+    def _tokenize(self, paragraph):
+        """Tokenize paragraph (may contain newlines) according to the
+        guidelines of the EmpiriST 2015 shared task on automatic
+        linguistic annotation of computer-mediated communication /
+        social media.
+
+        """
+        if self.chunk_cache is None or self.context_characters.search(paragraph):
+            tokens = self._apply_stages(paragraph)
+        else:
+            tokens = self._tokenize_chunks(paragraph)
+        multiword_expressions = self.user_matchers.get("multiword_expressions")
+        if multiword_expressions is not None:
+            tokens = self._merge_multiword_expressions(tokens, paragraph, multiword_expressions)
+        return tokens
+
+    def _merge_multiword_expressions(self, tokens, paragraph, trie):
+        """Merge the sequences of tokens that are multi-word expressions
+        from trie into single tokens.
+
+        """
+        matches = list(trie.finditer([t.token for t in tokens]))
+        if len(matches) == 0:
+            return tokens
+        # the tokens of an expression are joined with a space where
+        # the original text contains one
+        extra_info = self._check_spaces(tokens, paragraph)
+        merged = []
+        position = 0
+        for start, end, token_class in matches:
+            merged.extend(tokens[position:start])
+            parts = []
+            for i in range(start, end - 1):
+                parts.append(tokens[i].token)
+                if not extra_info[i].startswith("SpaceAfter=No"):
+                    parts.append(" ")
+            parts.append(tokens[end - 1].token)
+            merged.append(Token("".join(parts), token_class))
+            position = end
+        merged.extend(tokens[position:])
+        return merged
+
+    def _tokenize_chunks(self, paragraph):
+        """Tokenize paragraph and take the tokens of memoizable chunks
+        from the chunk cache.
+
+        A chunk is memoizable if it consists of letters with optional
+        final punctuation and if neither of its neighbours ends or
+        begins with a digit. The remaining chunks are tokenized
+        together, with a character from the Private Use Area in place
+        of every run of memoizable chunks. For the stages, that
+        character behaves like the chunks it stands for, i.e. as a
+        non-digit that is separated by whitespace, so that the
+        remaining chunks are tokenized as in the original paragraph.
+
+        """
+        chunks = [chunk for chunk in self.spaces.split(paragraph) if chunk != ""]
+        memoizable = [self.memoizable_chunk.fullmatch(chunk) is not None for chunk in chunks]
+        for i, chunk in enumerate(chunks):
+            if memoizable[i] and ((i > 0 and chunks[i - 1][-1:].isdecimal()) or (i + 1 < len(chunks) and chunks[i + 1][:1].isdecimal())):
+                memoizable[i] = False
+        if not any(memoizable):
+            return self._apply_stages(paragraph)
+        stand_in = self._get_placeholders(paragraph)[0]
+        remainder, runs = [], []
+        for chunk, is_memoizable in zip(chunks, memoizable):
+            if not is_memoizable:
+                remainder.append(chunk)
+            elif len(remainder) > 0 and remainder[-1] == stand_in:
+                runs[-1].append(chunk)
+            else:
+                remainder.append(stand_in)
+                runs.append([chunk])
+        if len(remainder) == len(runs):
+            tokens = [Token(stand_in, "regular")] * len(runs)
+        else:
+            tokens = self._apply_stages(" ".join(remainder))
+        runs = iter(runs)
+        result = []
+        for token in tokens:
+            if token.token != stand_in:
+                result.append(token)
+                continue
+            for chunk in next(runs):
+                key = (self.configuration, chunk)
+                chunk_tokens = self.chunk_cache.get(key)
+                if chunk_tokens is None:
+                    chunk_tokens = tuple(self._apply_stages(chunk))
+                    self.chunk_cache.put(key, chunk_tokens)
+                result.extend(chunk_tokens)
+        return result
+
+    def _apply_stages(self, paragraph):
+        """Apply all stages to paragraph and return the tokens."""
+        # reset mappings for the current paragraph
+        self.mapping = {}
+        self.replacement_counter = 0
+        self.placeholders = self._get_placeholders(paragraph)
+        self.present_triggers = self._scan_triggers(paragraph)
 
-        # [mod] Hyphens
-        paragraph = self._replace_regex(paragraph, self.letter_hyphen, "symbol")
-        paragraph = self._replace_regex(paragraph, self.hyphen, "symbol")
-        # ellipsis
-        paragraph = self._replace_regex(paragraph, self.ellipsis, "symbol")
-        # dots
-        # paragraph = self.dot_without_space.sub(r' \1 ', paragraph)
-        paragraph = self._replace_regex(paragraph, self.dot_without_space, "symbol")
-        # paragraph = self.dot.sub(r' \1 ', paragraph)
-        paragraph = self._replace_regex(paragraph, self.dot, "symbol")
+        for stage in self.stages:
+            paragraph = stage.function(paragraph)
 
         # tokenize
         tokens = paragraph.strip().split()
@@ -764,6 +1330,17 @@ class Tokenizer(object):
 
         return tokens
 
+    def warmup(self):
+        """Compile the regular expressions and build the matchers of all
+        stages now. Otherwise, this happens when a stage is applied
+        for the first time.
+
+        """
+        for stage in self.stages:
+            for pattern in stage.patterns:
+                if hasattr(pattern, "warmup"):
+                    pattern.warmup()
+
     def tokenize(self, paragraph):
         """An alias for tokenize_paragraph"""
         return self.tokenize_paragraph(paragraph)
@@ -790,6 +1367,21 @@ class Tokenizer(object):
         # convert paragraph to Unicode normal form C (NFC)
         paragraph = unicodedata.normalize("NFC", paragraph)
 
+        if self.cache is None:
+            return self._tokenize_normalized(paragraph)
+        key = (self.configuration, paragraph)
+        # the cached results are tuples, callers get their own list
+        result = self.cache.get(key)
+        if result is None:
+            result = tuple(self._tokenize_normalized(paragraph))
+            self.cache.put(key, result)
+        return list(result)
+
+    def _tokenize_normalized(self, paragraph):
+        """Tokenize paragraph (in NFC) and return the output of
+        tokenize_paragraph.
+
+        """
         tokens = self._tokenize(paragraph)
 
         if len(tokens) == 0:
@@ -810,22 +1402,33 @@ class Tokenizer(object):
             else:
                 return list(tokens)
 
-    def tokenize_xml(self, xml, is_file=True):
+    def tokenize_xml(self, xml, is_file=True, eos_tags=None, tokenize_parts=None):
         """Tokenize XML file or XML string according to the guidelines of the
         EmpiriST 2015 shared task on automatic linguistic annotation
         of computer-mediated communication / social media.
 
-        """
-        elements = utils.parse_xml(xml, is_file)
-        whole_text = " ".join((e.text for e in elements))
+        If eos_tags is given, the document is partitioned at the start
+        and end tags of these elements (which constitute sentence
+        breaks, see SentenceSplitter.split_xml) and the parts are
+        tokenized independently, i.e. no token contains text from
+        both sides of such a tag. tokenize_parts can be a function
+        that maps a list of parts (the texts of their elements) to
+        their tokenized texts (as returned by _tokenize_xml_part),
+        e.g. computed in parallel by tokenizers with the same
+        configuration (see somajo.cli).
 
-        # convert paragraph to Unicode normal form C (NFC)
-        whole_text = unicodedata.normalize("NFC", whole_text)
-
-        tokens = self._tokenize(whole_text)
+        """
+        # imported here, so that importing somajo does not load it
+        import xml.etree.ElementTree as ET
 
-        tokenized_elements = self._match_xml(tokens, elements)
-        xml = ET.tostring(tokenized_elements[0].element, encoding="unicode").rstrip()
+        elements = utils.parse_xml(xml, is_file)
+        parts = [elements] if eos_tags is None else utils.partition_xml(elements, eos_tags)
+        if tokenize_parts is None:
+            tokenize_parts = functools.partial(map, self._tokenize_xml_part)
+        tokenized_parts = tokenize_parts([[e.text for e in part] for part in parts])
+        for part, tokenized_texts in zip(parts, tokenized_parts):
+            self._set_xml_texts(part, tokenized_texts)
+        xml = ET.tostring(elements[0].element, encoding="unicode").rstrip()
 
         tokens = [l.split("\t") for l in xml.split("\n")]
         if self.token_classes:
@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 
 import collections
-import logging
-import os
-import xml.etree.ElementTree as ET
+import functools
+import sys
+import types
+
+import regex as re
+
+from somajo import matchers
+from somajo import resources
 
 
 def get_paragraphs(fh):
@@ -20,18 +25,189 @@ def get_paragraphs(fh):
         yield "".join(paragraph)
 
 
+def chunks(items, max_items, max_size, size=len):
+    """Generator for lists of consecutive items with at most max_items
+    items and a total size (as computed by the function size) of at
+    most max_size. An item that is larger than max_size forms a
+    chunk of its own.
+
+    """
+    chunk, chunk_size = [], 0
+    for item in items:
+        item_size = size(item)
+        if len(chunk) > 0 and (len(chunk) >= max_items or chunk_size + item_size > max_size):
+            yield chunk
+            chunk, chunk_size = [], 0
+        chunk.append(item)
+        chunk_size += item_size
+    if len(chunk) > 0:
+        yield chunk
+
+
+def bounded_imap(pool, function, items, chunksize, max_chunks, max_size, size=len):
+    """Generator for the results of function(item) for all items, in
+    order, computed by the worker processes of pool. function is
+    applied to lists of up to chunksize items and has to return the
+    list of their results.
+
+    Unlike pool.imap, the items are only read as fast as the results
+    are consumed: at most max_chunks chunks, whose items have a total
+    size (as computed by the function size) of about max_size, are
+    submitted or waiting to be consumed at the same time. This
+    bounds the memory for the items and the results, no matter how
+    fast the items can be read and the results can be processed.
+
+    """
+    pending = collections.deque()
+    in_flight = 0
+    chunk_iterator = chunks(items, chunksize, max(max_size // max_chunks, 1), size)
+    while True:
+        while len(pending) == 0 or (len(pending) < max_chunks and in_flight < max_size):
+            chunk = next(chunk_iterator, None)
+            if chunk is None:
+                break
+            chunk_size = sum(size(item) for item in chunk)
+            pending.append((pool.apply_async(function, (chunk,)), chunk_size))
+            in_flight += chunk_size
+        if len(pending) == 0:
+            return
+        result, chunk_size = pending.popleft()
+        yield from result.get()
+        in_flight -= chunk_size
+
+
 def read_abbreviation_file(filename):
-    """Return the abbreviations from the given filename."""
-    abbreviations = set()
-    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), filename), encoding="utf-8") as fh:
-        for line in fh:
-            line = line.strip()
-            if line.startswith("#"):
-                continue
-            if line == "":
-                continue
-            abbreviations.add(line)
-    return sorted(abbreviations, key=len, reverse=True)
+    """Return the abbreviations from the given filename (from the
+    precompiled bundle, if possible).
+
+    """
+    return resources.read_lexicon(filename)
+
+
+class Lexicon(object):
+    """The entries of a lexicon, sorted by decreasing length, with views
+    for different kinds of lookups. The views are created on first
+    use and shared by all users of the lexicon, so they must not be
+    modified.
+
+    Lexicons from the files of the package should be obtained via
+    Lexicon.load, which reads every file only once per process.
+
+    """
+
+    _loaded = {}
+
+    def __init__(self, entries, filename=None):
+        self.entries = tuple(sorted(entries, key=len, reverse=True))
+        self.filename = filename
+        self._set = None
+        self._folded = None
+        self._views = {}
+
+    @classmethod
+    def load(cls, filename):
+        """Return the lexicon from the given file in the package directory."""
+        lexicon = cls._loaded.get(filename)
+        if lexicon is None:
+            lexicon = cls._loaded.setdefault(filename, cls(read_abbreviation_file(filename), filename))
+        return lexicon
+
+    def __reduce__(self):
+        # a lexicon from the package is loaded again (or found in the
+        # cache) when it is unpickled, e.g. in another process
+        if self.filename is not None:
+            return (self.load, (self.filename,))
+        return (self.__class__, (self.entries,))
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, entry):
+        if self._set is None:
+            self._set = frozenset(self.entries)
+        return entry in self._set
+
+    def contains(self, entry, ignore_case=False):
+        """Return True if entry is in the lexicon. If ignore_case is set
+        to True, entry is compared with the lowercased entries of the
+        lexicon and should be lowercased as well.
+
+        """
+        if not ignore_case:
+            return entry in self
+        return entry in self.folded()
+
+    def folded(self):
+        """Return the set of lowercased entries."""
+        if self._folded is None:
+            self._folded = frozenset(entry.lower() for entry in self.entries)
+        return self._folded
+
+    def _view(self, key, factory):
+        view = self._views.get(key)
+        if view is None:
+            view = self._views.setdefault(key, factory())
+        return view
+
+    def select(self, pattern, invert=False):
+        """Return the lexicon of the entries that are completely matched
+        by the regular expression pattern (or, if invert is set to
+        True, of the entries that are not).
+
+        """
+        def factory():
+            regex = re.compile(pattern)
+            return Lexicon([entry for entry in self.entries if (regex.fullmatch(entry) is None) == invert])
+        return self._view(("select", pattern, invert), factory)
+
+    def trie(self, ignore_case=False):
+        """Return a trie of the entries for longest-match lookups."""
+        return self._view(("trie", ignore_case), lambda: matchers.Trie(self.entries, ignore_case=ignore_case))
+
+    def regex(self, before="", after="", flags=0):
+        """Return a compiled regular expression that matches the entries
+        (longer entries first) between before and after.
+
+        """
+        return self._view(("regex", before, after, flags), lambda: re.compile(before + r"(?:" + r"|".join(re.escape(entry) for entry in self.entries) + r")" + after, flags))
+
+
+def deep_size(obj, seen=None):
+    """Return the approximate memory size in bytes of obj and of all
+    objects reachable from it (via containers, attributes and bound
+    methods) that are not in seen, the set of the ids of objects that
+    have already been counted. Classes, modules and functions are not
+    counted.
+
+    """
+    if seen is None:
+        seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType)):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset, collections.deque)):
+            stack.extend(obj)
+        elif isinstance(obj, functools.partial):
+            stack.extend([obj.func, obj.args, obj.keywords])
+        elif isinstance(obj, types.MethodType):
+            stack.append(obj.__self__)
+        if hasattr(obj, "__dict__"):
+            stack.append(obj.__dict__)
+        for name in getattr(type(obj), "__slots__", ()):
+            if hasattr(obj, name):
+                stack.append(getattr(obj, name))
+    return size
 
 
 def parse_xml(xml, is_file=True):
@@ -39,6 +215,10 @@ def parse_xml(xml, is_file=True):
     whole text of the document.
 
     """
+    # imported here, so that importing somajo does not load them
+    import logging
+    import xml.etree.ElementTree as ET
+
     Element = collections.namedtuple("Element", ["element", "type", "text"])
 
     def text_getter(elem):
@@ -64,3 +244,18 @@ def parse_xml(xml, is_file=True):
         return []
     elements = list(text_getter(root))
     return elements
+
+
+def partition_xml(elements, tags):
+    """Return the elements (as returned by parse_xml) in consecutive
+    parts that are separated by the start and end tags of the XML
+    elements whose names (without namespace) are in tags, i.e. the
+    parts do not contain these tags.
+
+    """
+    parts = [[]]
+    for element in elements:
+        if element.element.tag.rpartition("}")[2] in tags and len(parts[-1]) > 0:
+            parts.append([])
+        parts[-1].append(element)
+    return parts
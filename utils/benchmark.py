@@ -0,0 +1,640 @@
+#!/usr/bin/env python3
+
+"""Benchmarks for performance-critical parts of SoMaJo. Run
+
+    python3 utils/benchmark.py -h
+
+for a list of the available benchmarks.
+
+"""
+
+import argparse
+import multiprocessing
+import os
+import pickle
+import statistics
+import subprocess
+import sys
+import time
+import unicodedata
+import xml.etree.ElementTree as ET
+
+import regex as re
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from somajo import cli, matchers, utils
+from somajo.matchers import AbbreviationMatcher, FusedRegex, LexiconMatcher
+from somajo.sentence_splitter import SentenceSplitter
+from somajo.tokenizer import Token, Tokenizer
+
+
+def read_paragraphs(fh, limit=None):
+    """Return (at most limit) paragraphs from the file."""
+    paragraphs = []
+    for paragraph in utils.get_paragraphs(fh):
+        paragraphs.append(paragraph)
+        if limit is not None and len(paragraphs) >= limit:
+            break
+    return paragraphs
+
+
+def timed(function, items, repetitions=1):
+    """Apply function to all items and return the results and the time
+    (in seconds) it took.
+
+    """
+    t0 = time.perf_counter()
+    for _ in range(repetitions):
+        results = [function(item) for item in items]
+    t1 = time.perf_counter()
+    return results, t1 - t0
+
+
+def report(name, seconds, n_chars, baseline=None):
+    """Print the time and throughput of a benchmark."""
+    line = "%-30s %8.3f s %10.0f chars/s" % (name, seconds, n_chars / seconds)
+    if baseline is not None:
+        line += "   x%.2f" % (baseline / seconds)
+    print(line)
+
+
+def benchmark_abbreviations(args):
+    """Compare the trie-based abbreviation matchers with the regular
+    expressions that they replace.
+
+    """
+    paragraphs = read_paragraphs(args.FILE, args.limit)
+    n_chars = sum(len(p) for p in paragraphs) * args.repetitions
+    abbreviations = utils.read_abbreviation_file("abbreviations_%s.txt" % args.language)
+    single_token_abbreviations = utils.Lexicon.load("single_token_abbreviations_%s.txt" % args.language)
+    t0 = time.perf_counter()
+    abbreviation_regex = re.compile(r"(?<![\p{L}.])(?:(?:(?:\p{L}\.){2,})|" + r'|'.join([re.escape(_) for _ in abbreviations]) + r")+(?!\p{L}{1,3}\.)", re.IGNORECASE)
+    single_token_regex = single_token_abbreviations.regex(before=r"(?<![\w.])", after=r"(?!\p{L}{1,3}\.)", flags=re.IGNORECASE)
+    t1 = time.perf_counter()
+    abbreviation_matcher = AbbreviationMatcher(abbreviations, not_preceded_by=r"[\p{L}.]", letter_sequences=True, repeat=True)
+    single_token_matcher = AbbreviationMatcher(single_token_abbreviations, not_preceded_by=r"[\w.]")
+    t2 = time.perf_counter()
+    print("%d paragraphs, %d characters, %d repetitions" % (len(paragraphs), n_chars / args.repetitions, args.repetitions))
+    print("construction: regex %.3f s, trie %.3f s" % (t1 - t0, t2 - t1))
+    for name, regex, matcher in [("abbreviations", abbreviation_regex, abbreviation_matcher),
+                                 ("single token abbreviations", single_token_regex, single_token_matcher)]:
+        regex_spans, regex_time = timed(lambda p: [m.span() for m in regex.finditer(p)], paragraphs, args.repetitions)
+        trie_spans, trie_time = timed(lambda p: [m.span() for m in matcher.finditer(p)], paragraphs, args.repetitions)
+        report("%s (regex)" % name, regex_time, n_chars)
+        report("%s (trie)" % name, trie_time, n_chars, regex_time)
+        if regex_spans != trie_spans:
+            print("WARNING: %s: matches differ in %d paragraphs" % (name, sum(1 for r, t in zip(regex_spans, trie_spans) if r != t)))
+
+
+def scale_lexicon(lexicon, factor):
+    """Return the lexicon with factor - 1 artificial variants of each
+    entry added (entries that do not occur in natural text).
+
+    """
+    scaled = list(lexicon)
+    for i in range(1, factor):
+        scaled.extend("%s%d%s" % (entry[:1], i, entry[1:]) for entry in lexicon)
+    return sorted(scaled, key=len, reverse=True)
+
+
+def benchmark_lexicons(args):
+    """Compare the Aho-Corasick-based lexicon matchers with the regular
+    expressions that they replace.
+
+    """
+    paragraphs = read_paragraphs(args.FILE, args.limit)
+    n_chars = sum(len(p) for p in paragraphs) * args.repetitions
+    plus_amp = [t for t in utils.read_abbreviation_file("tokens_with_plus_or_ampersand.txt") if not re.search(r"^\w+[&+]\w+$", t)]
+    camel_case = [t for t in utils.read_abbreviation_file("camel_case_tokens.txt") if not re.search(r"^\w+$", t)]
+    prefixes = utils.read_abbreviation_file("non-breaking_prefixes_en.txt")
+    suffixes = utils.read_abbreviation_file("non-breaking_suffixes_en.txt")
+    words = utils.read_abbreviation_file("non-breaking_hyphenated_words_en.txt")
+    plus_amp, camel_case, prefixes, suffixes, words = [scale_lexicon(lexicon, args.scale) for lexicon in (plus_amp, camel_case, prefixes, suffixes, words)]
+    alternatives = lambda lexicon: r"|".join([re.escape(_) for _ in lexicon])
+    stages = [
+        ("plus/ampersand", re.compile(r"(?<!\w)(?:" + alternatives(plus_amp) + r")(?!\w)", re.IGNORECASE),
+         lambda: LexiconMatcher(plus_amp, ignore_case=True, before=r"(?<!\w)", after=r"(?!\w)")),
+        ("camel case", re.compile(r"\b(?:" + alternatives(camel_case) + r"|:Mac\p{Lu}\p{Ll}*)\b"),
+         lambda: LexiconMatcher(camel_case, before=r"\b", after=r"\b", extra=r":Mac\p{Lu}\p{Ll}*")),
+        ("en prefixes", re.compile(r"(?<![\w-])(?:" + alternatives(prefixes) + r")-[\w-]+", re.IGNORECASE),
+         lambda: LexiconMatcher([p + "-" for p in prefixes], ignore_case=True, before=r"(?<![\w-])", after=r"[\w-]+")),
+        ("en suffixes", re.compile(r"\b[\w-]+-(?:" + alternatives(suffixes) + r")(?![\w-])", re.IGNORECASE),
+         lambda: LexiconMatcher(["-" + s for s in suffixes], ignore_case=True, before=r"\b", after=r"(?![\w-])", extend_left=r"[\w-]")),
+        ("en words", re.compile(r"\b(?:" + alternatives(words) + r")\b", re.IGNORECASE),
+         lambda: LexiconMatcher(words, ignore_case=True, before=r"\b", after=r"\b")),
+    ]
+    print("%d paragraphs, %d characters, %d repetitions, lexicons scaled x%d" % (len(paragraphs), n_chars / args.repetitions, args.repetitions, args.scale))
+    for name, regex, constructor in stages:
+        matcher = constructor()
+        regex_spans, regex_time = timed(lambda p: [m.span() for m in regex.finditer(p)], paragraphs, args.repetitions)
+        lexicon_spans, lexicon_time = timed(lambda p: [m.span() for m in matcher.finditer(p)], paragraphs, args.repetitions)
+        report("%s (regex)" % name, regex_time, n_chars)
+        report("%s (aho-corasick)" % name, lexicon_time, n_chars, regex_time)
+        if regex_spans != lexicon_spans:
+            print("WARNING: %s: matches differ in %d paragraphs" % (name, sum(1 for r, t in zip(regex_spans, lexicon_spans) if r != t)))
+
+
+def benchmark_triggers(args):
+    """Tokenize the corpus with and without trigger-character guards and
+    report how often each guarded stage was skipped.
+
+    """
+    paragraphs = read_paragraphs(args.FILE, args.limit)
+    n_chars = sum(len(p) for p in paragraphs) * args.repetitions
+    unguarded = Tokenizer(split_camel_case=True, language=args.language)
+    unguarded.stage_triggers = {}
+    guarded = Tokenizer(split_camel_case=True, language=args.language)
+    print("%d paragraphs, %d characters, %d repetitions" % (len(paragraphs), n_chars / args.repetitions, args.repetitions))
+    unguarded_tokens, unguarded_time = timed(unguarded.tokenize, paragraphs, args.repetitions)
+    guarded_tokens, guarded_time = timed(guarded.tokenize, paragraphs, args.repetitions)
+    report("without guards", unguarded_time, n_chars)
+    report("with guards", guarded_time, n_chars, unguarded_time)
+    if unguarded_tokens != guarded_tokens:
+        print("WARNING: tokens differ in %d paragraphs" % sum(1 for u, g in zip(unguarded_tokens, guarded_tokens) if u != g))
+    executed = sum(guarded.executed_stages.values())
+    skipped = sum(guarded.skipped_stages.values())
+    print("guarded stages: %d executed, %d skipped (%.1f%%)" % (executed, skipped, 100 * skipped / max(executed + skipped, 1)))
+    for stage in sorted(guarded.stage_names.values(), key=lambda s: guarded.skipped_stages[s], reverse=True):
+        print("  %-35s %8d executed %8d skipped" % (stage, guarded.executed_stages[stage], guarded.skipped_stages[stage]))
+
+
+def benchmark_fusion(args):
+    """Compare the fused stages with applying their members one after
+    the other. The number stages are not fused by the tokenizer and
+    are only included for comparison.
+
+    """
+    paragraphs = read_paragraphs(args.FILE, args.limit)
+    n_chars = sum(len(p) for p in paragraphs) * args.repetitions
+    tokenizer = Tokenizer(language=args.language)
+    placeholder = lambda m: " \uE000 "
+    groups = [("XML entities", tokenizer.xml_entity, placeholder),
+              ("dates", tokenizer.date, placeholder),
+              ("numbers", FusedRegex([tokenizer.number, tokenizer.ipv4, tokenizer.section_number], first=r"[−+\d-]"), placeholder),
+              ("two-part contractions", tokenizer.en_twopart_contraction, r" \1 \2 "),
+              ("three-part contractions", tokenizer.en_threepart_contraction, r" \1 \2 \3 ")]
+    print("%d paragraphs, %d characters, %d repetitions" % (len(paragraphs), n_chars / args.repetitions, args.repetitions))
+    for name, fused, repl in groups:
+        members = fused.members
+
+        def sequential(paragraph):
+            for member in members:
+                paragraph = member.sub(repl, paragraph)
+            return paragraph
+
+        sequential_results, sequential_time = timed(sequential, paragraphs, args.repetitions)
+        fused_results, fused_time = timed(lambda p: fused.sub(repl, p), paragraphs, args.repetitions)
+        report("%s (%d stages)" % (name, len(members)), sequential_time, n_chars)
+        report("%s (fused)" % name, fused_time, n_chars, sequential_time)
+        if sequential_results != fused_results:
+            print("WARNING: %s: results differ in %d paragraphs" % (name, sum(1 for s, f in zip(sequential_results, fused_results) if s != f)))
+
+
+def find_emojis_by_grapheme(paragraph):
+    """The former emoji recognition: test every grapheme with an
+    uncompiled regular expression.
+
+    """
+    emojis = []
+    for m in re.finditer(r"\X", paragraph):
+        if m.end() - m.start() > 1:
+            if re.search(r"[\p{Extended_Pictographic}\p{Emoji_Presentation}\uFE0F]", m.group()):
+                emojis.append(m.span())
+        else:
+            if re.search(r"[\p{Extended_Pictographic}\p{Emoji_Presentation}]", m.group()):
+                emojis.append(m.span())
+    return emojis
+
+
+def replace_emojis_by_slicing(paragraph):
+    """The former emoji replacement: rebuild the paragraph once per
+    emoji.
+
+    """
+    for start, end in reversed(find_emojis_by_grapheme(paragraph)):
+        paragraph = paragraph[:start] + " \uE000 " + paragraph[end:]
+    return paragraph
+
+
+def benchmark_emojis(args):
+    """Measure how the time for replacing emojis scales with the
+    number of emojis in a message.
+
+    """
+    tokenizer = Tokenizer()
+    emojis = ["\U0001F600", "\U0001F44D\U0001F3FD", "\u2764\uFE0F", "\U0001F468\u200D\U0001F469\u200D\U0001F467", "1\uFE0F\u20E3"]
+    for size in args.sizes:
+        message = "".join("lol %s" % emojis[i % len(emojis)] for i in range(size))
+        tokenizer.placeholders = tokenizer._get_placeholders(message)
+        tokenizer.present_triggers = tokenizer._scan_triggers(message)
+        tokenizer.mapping, tokenizer.replacement_counter = {}, 0
+        _, new_time = timed(lambda m: tokenizer._replace_emojis(m, "emoticon"), [message], args.repetitions)
+        old_time = None
+        if size <= args.max_old:
+            _, old_time = timed(replace_emojis_by_slicing, [message], args.repetitions)
+            old_spans = find_emojis_by_grapheme(message)
+            new_spans = [m.span() for m in tokenizer.emoji_candidate.finditer(message) if len(m.group()) == 1 or tokenizer.emoji_character.search(m.group())]
+            if old_spans != new_spans:
+                print("WARNING: %d emojis: spans differ" % size)
+            report("%d emojis (former)" % size, old_time, len(message) * args.repetitions)
+        report("%d emojis" % size, new_time, len(message) * args.repetitions, old_time)
+
+
+def check_spaces_by_slicing(tokenizer, tokens, original_text):
+    """The former alignment of tokens and text: consume the normalized
+    text by slicing.
+
+    """
+    extra_info = ["" for _ in tokens]
+    normalized = tokenizer.junk_between_spaces.sub(" ", original_text)
+    normalized = tokenizer.spaces.sub(" ", normalized)
+    normalized = normalized.strip()
+    for token_index, t in enumerate(tokens):
+        original_spelling = None
+        token = t.token
+        if normalized.startswith(token):
+            normalized = normalized[len(token):]
+        else:
+            orig = []
+            for char in token:
+                first_char = None
+                while first_char != char:
+                    try:
+                        first_char = normalized[0]
+                        normalized = normalized[1:]
+                        orig.append(first_char)
+                    except IndexError:
+                        break
+            original_spelling = "".join(orig)
+        m = tokenizer.starts_with_junk.match(normalized)
+        if m:
+            if original_spelling is None:
+                original_spelling = token
+            original_spelling += normalized[:m.end()]
+            normalized = normalized[m.end():]
+        if original_spelling is not None:
+            extra_info[token_index] = 'OriginalSpelling="%s"' % original_spelling
+        if len(normalized) > 0:
+            if normalized.startswith(" "):
+                normalized = normalized[1:]
+            else:
+                if len(extra_info[token_index]) > 0:
+                    extra_info[token_index] = ", " + extra_info[token_index]
+                extra_info[token_index] = "SpaceAfter=No" + extra_info[token_index]
+    return extra_info
+
+
+def benchmark_alignment(args):
+    """Measure how aligning tokens with the original text (for
+    SpaceAfter and OriginalSpelling) scales with the length of a
+    paragraph.
+
+    """
+    tokenizer = Tokenizer(extra_info=True)
+    sentence = "Die Ver\u00ADsicherung (z. B. f\u00FCr 1.000,- EUR) zahlt\u200B nicht, oder?! Mail: foo [at] example.de "
+    for size in args.sizes:
+        paragraph = sentence * (size * 1000 // len(sentence))
+        tokens = tokenizer._tokenize(paragraph)
+        new_results, new_time = timed(lambda p: tokenizer._check_spaces(tokens, p), [paragraph], args.repetitions)
+        old_time = None
+        if size <= args.max_old:
+            old_results, old_time = timed(lambda p: check_spaces_by_slicing(tokenizer, tokens, p), [paragraph], args.repetitions)
+            report("%d KB (former)" % size, old_time, len(paragraph) * args.repetitions)
+            if old_results != new_results:
+                print("WARNING: %d KB: annotations differ" % size)
+        report("%d KB" % size, new_time, len(paragraph) * args.repetitions, old_time)
+
+
+def match_xml_by_slicing(tokenizer, tokens, elements):
+    """The former alignment of tokens and XML elements: consume the
+    normalized text of each element by slicing and push split tokens
+    back onto a reversed agenda.
+
+    """
+    agenda = list(reversed(tokens))
+    for element in elements:
+        normalized = tokenizer.junk_between_spaces.sub(" ", unicodedata.normalize("NFC", element.text))
+        normalized = tokenizer.spaces.sub(" ", normalized)
+        normalized = normalized.strip()
+        output = []
+        while len(normalized) > 0:
+            t = agenda.pop()
+            original_spelling = None
+            extra_info = ""
+            token = t.token
+            if normalized.startswith(token):
+                normalized = normalized[len(token):]
+            elif token.startswith(normalized):
+                agenda.append(Token(token[len(normalized):].lstrip(), t.token_class))
+                token = normalized
+                normalized = ""
+            else:
+                orig = []
+                for char in token:
+                    first_char = None
+                    while first_char != char:
+                        first_char = normalized[0]
+                        normalized = normalized[1:]
+                        orig.append(first_char)
+                original_spelling = "".join(orig)
+            m = tokenizer.starts_with_junk.match(normalized)
+            if m:
+                if original_spelling is None:
+                    original_spelling = token
+                original_spelling += normalized[:m.end()]
+                normalized = normalized[m.end():]
+            if original_spelling is not None:
+                extra_info = 'OriginalSpelling="%s"' % original_spelling
+            if len(normalized) > 0:
+                if normalized.startswith(" "):
+                    normalized = normalized[1:]
+                else:
+                    if len(extra_info) > 0:
+                        extra_info = ", " + extra_info
+                    extra_info = "SpaceAfter=No" + extra_info
+            output.append("\t".join((token, t.token_class, extra_info)))
+        tokenized_text = "\n" + "\n".join(output) + "\n" if len(output) > 0 else "\n"
+        if element.type == "text":
+            element.element.text = tokenized_text
+        elif element.type == "tail":
+            element.element.tail = tokenized_text
+    return elements
+
+
+def benchmark_xml(args):
+    """Measure how aligning tokens with the elements of an XML document
+    scales with the length of the text of the elements.
+
+    """
+    tokenizer = Tokenizer()
+    sentence = "Die Ver&#xad;sicherung zahlt nicht, oder?! Mail: foo [at] example.de "
+    for size in args.sizes:
+        text = sentence * (size * 1000 // len(sentence) // 2)
+        xml = "<doc><p>%s<b>fett</b>%s<i>foo [at] </i>example.de</p></doc>" % (text, text)
+        elements = utils.parse_xml(xml, is_file=False)
+        tokens = tokenizer._tokenize(unicodedata.normalize("NFC", " ".join(e.text for e in elements)))
+        serialize = lambda elements: ET.tostring(elements[0].element, encoding="unicode")
+        new_results, new_time = timed(lambda e: serialize(tokenizer._match_xml(tokens, e)), [elements], args.repetitions)
+        old_time = None
+        if size <= args.max_old:
+            old_results, old_time = timed(lambda e: serialize(match_xml_by_slicing(tokenizer, tokens, e)), [elements], args.repetitions)
+            report("%d KB (former)" % size, old_time, len(xml) * args.repetitions)
+            if old_results != new_results:
+                print("WARNING: %d KB: results differ" % size)
+        report("%d KB" % size, new_time, len(xml) * args.repetitions, old_time)
+
+
+def benchmark_construction(args):
+    """Measure how long it takes to create a Tokenizer, to tokenize the
+    first paragraph and to compile all stages in advance.
+
+    """
+    paragraph = "Das ist z.B. ein Test mit 3 Zahlen, C&A und :-) am 12.3.2020."
+    for step in ["create", "create + first paragraph", "create + warmup"]:
+        total = 0
+        for _ in range(args.repetitions):
+            # forget the compiled patterns from earlier repetitions
+            re.purge()
+            matchers._shared.clear()
+            start = time.perf_counter()
+            tokenizer = Tokenizer(split_camel_case=args.split_camel_case, language=args.language)
+            if step == "create + first paragraph":
+                tokenizer.tokenize(paragraph)
+            elif step == "create + warmup":
+                tokenizer.warmup()
+            total += time.perf_counter() - start
+        print("%-25s %8.1f ms" % (step, total / args.repetitions * 1000))
+
+
+def benchmark_parallel(args):
+    """Compare how tokenizing the corpus with N worker processes scales
+    if the tokenizer is pickled with every task (the former
+    implementation), if every worker creates its own tokenizer once
+    and if the workers also format the output (and split the
+    sentences). The output is written to /dev/null; the CPU time of
+    the main process shows how much work is left to it.
+
+    """
+    paragraphs = read_paragraphs(args.FILE, args.limit)
+    n_chars = sum(len(p) for p in paragraphs)
+    options = dict(split_camel_case=args.split_camel_case, token_classes=args.token_classes, extra_info=args.extra_info, language=args.language)
+    is_tuple = args.token_classes or args.extra_info
+    sentence_splitter = SentenceSplitter(is_tuple, args.language) if args.split_sentences else None
+
+    def write(tokens):
+        """Split and format the tokens in the main process."""
+        sentences = [tokens]
+        if sentence_splitter is not None:
+            sentences = sentence_splitter.split(tokens) if tokens else []
+        devnull.write(cli._format(sentences, is_tuple)[1].encode("utf-8"))
+
+    print("%d paragraphs, %d characters, %d CPUs" % (len(paragraphs), n_chars, multiprocessing.cpu_count()))
+    baseline = None
+    with open(os.devnull, "wb") as devnull:
+        for n in args.workers:
+            for name in ["pickled tokenizer", "worker tokenizer", "worker formatting"]:
+                start, cpu_start = time.perf_counter(), time.process_time()
+                if name == "pickled tokenizer":
+                    tokenizer = Tokenizer(**options)
+                    with multiprocessing.Pool(n) as pool:
+                        for tokens in pool.imap(tokenizer.tokenize, paragraphs, args.chunksize):
+                            write(tokens)
+                else:
+                    with multiprocessing.Pool(n, cli._init_worker, (pickle.dumps(options), "utf-8", args.split_sentences)) as pool:
+                        if name == "worker tokenizer":
+                            for tokens in utils.bounded_imap(pool, cli._tokenize_chunk, paragraphs, args.chunksize, 4 * n, 64 * 2**20):
+                                write(tokens)
+                        else:
+                            for _, output in utils.bounded_imap(pool, cli._tokenize_and_format_chunk, paragraphs, args.chunksize, 4 * n, 64 * 2**20):
+                                devnull.write(output)
+                seconds, cpu_seconds = time.perf_counter() - start, time.process_time() - cpu_start
+                if baseline is None:
+                    baseline = seconds
+                report("%2d workers, %s" % (n, name), seconds, n_chars, baseline)
+                print("%-30s %8.3f s CPU in the main process" % ("", cpu_seconds))
+
+
+def benchmark_script(args):
+    """Measure how running the tokenizer script on the corpus scales with
+    the number of worker processes (--parallel).
+
+    """
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    script = os.path.join(root, "bin", "somajo-tokenizer")
+    options = ["-l", args.language]
+    for option in ["split_sentences", "token_classes", "extra_info"]:
+        if getattr(args, option):
+            options.append("--" + option)
+    n_chars = os.path.getsize(args.FILE)
+    print("%d bytes, %d CPUs, options: %s" % (n_chars, multiprocessing.cpu_count(), " ".join(options)))
+    baseline = None
+    with open(os.devnull, "w") as devnull:
+        for n in args.workers:
+            start = time.perf_counter()
+            subprocess.run([sys.executable, script, "--parallel", str(n)] + options + [args.FILE], check=True, stdout=devnull, stderr=devnull)
+            seconds = time.perf_counter() - start
+            if baseline is None:
+                baseline = seconds
+            report("%2d workers" % n, seconds, n_chars, baseline)
+
+
+def benchmark_parallel_xml(args):
+    """Compare tokenizing an XML document (the paragraphs of the corpus
+    as p elements) as a whole (the former implementation), partitioned
+    at the p tags and partitioned with N worker processes. The CPU
+    time of the main process shows how much work is left to it.
+
+    """
+    paragraphs = read_paragraphs(args.FILE, args.limit)
+    # control characters are not allowed in XML
+    escape = lambda text: re.sub(r"[\x00-\x08\x0B\x0C\x0E-\x1F]", " ", text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;"))
+    xml = "<doc>\n%s\n</doc>" % "\n".join("<p>%s</p>" % escape(p) for p in paragraphs)
+    options = dict(split_camel_case=args.split_camel_case, token_classes=args.token_classes, extra_info=args.extra_info, language=args.language)
+    tokenizer = Tokenizer(**options)
+    tokenizer.warmup()
+    print("%d paragraphs, %d characters, %d CPUs" % (len(paragraphs), len(xml), multiprocessing.cpu_count()))
+
+    def measure(name, function, baseline=None):
+        start, cpu_start = time.perf_counter(), time.process_time()
+        result = function()
+        seconds, cpu_seconds = time.perf_counter() - start, time.process_time() - cpu_start
+        report(name, seconds, len(xml), baseline)
+        print("%-30s %8.3f s CPU in the main process" % ("", cpu_seconds))
+        return result, seconds
+
+    measure("whole document (former)", lambda: tokenizer.tokenize_xml(xml, is_file=False))
+    expected, baseline = measure("partitioned", lambda: tokenizer.tokenize_xml(xml, is_file=False, eos_tags={"p"}))
+    for n in args.workers:
+        with multiprocessing.Pool(n, cli._init_worker, (pickle.dumps(options), "utf-8")) as pool:
+            tokenize_parts = lambda parts: utils.bounded_imap(pool, cli._tokenize_xml_chunk, parts, args.chunksize, 4 * n, 64 * 2**20, cli._part_size)
+            result, _ = measure("%2d workers" % n, lambda: tokenizer.tokenize_xml(xml, is_file=False, eos_tags={"p"}, tokenize_parts=tokenize_parts), baseline)
+        if result != expected:
+            print("WARNING: %d workers: results differ" % n)
+
+
+def benchmark_startup(args):
+    """Measure the time it takes a fresh interpreter to import SoMaJo,
+    to tokenize a first paragraph and to run the tokenizer script on a
+    small file (the median of the repetitions).
+
+    """
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    paragraph = "Das ist z.B. ein Test mit 3 Zahlen, C&A und :-) am 12.3.2020."
+    measure = ("import time; t0 = time.perf_counter(); import somajo; t1 = time.perf_counter(); "
+               "tokenizer = somajo.Tokenizer(language=%r); tokenizer.tokenize(%r); t2 = time.perf_counter(); "
+               "print(t1 - t0, t2 - t1)" % (args.language, paragraph))
+    timings = []
+    for _ in range(args.repetitions):
+        output = subprocess.run([sys.executable, "-c", measure], cwd=root, check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+        timings.append([float(t) for t in output.split()])
+    print("%-25s %8.1f ms" % ("import somajo", statistics.median(t[0] for t in timings) * 1000))
+    print("%-25s %8.1f ms" % ("first paragraph", statistics.median(t[1] for t in timings) * 1000))
+    script = os.path.join(root, "bin", "somajo-tokenizer")
+    with open(os.devnull, "w") as devnull:
+        for name, options in [("interpreter", None), ("somajo-tokenizer", []), ("  --split_sentences", ["--split_sentences"])]:
+            command = [sys.executable, "-c", "pass"] if options is None else [sys.executable, script, "-l", args.language] + options + [args.FILE]
+            durations = []
+            for _ in range(args.repetitions):
+                start = time.perf_counter()
+                subprocess.run(command, cwd=root, check=True, stdout=devnull, stderr=devnull)
+                durations.append(time.perf_counter() - start)
+            print("%-25s %8.1f ms" % (name, statistics.median(durations) * 1000))
+
+
+def benchmark_memory(args):
+    """Measure the memory footprints of tokenizers in all combinations
+    of the given languages and split_camel_case.
+
+    """
+    for language in args.languages:
+        for split_camel_case in [False, True]:
+            start = time.perf_counter()
+            tokenizer = Tokenizer.get(language=language, split_camel_case=split_camel_case)
+            tokenizer.warmup()
+            print("%-30s %8.1f ms" % ("warmup %s%s" % (language, " (camel case)" if split_camel_case else ""), (time.perf_counter() - start) * 1000))
+    for key, size in Tokenizer.footprints().items():
+        print("%-60s %10.1f KB" % (key, size / 1024))
+
+
+def arguments():
+    parser = argparse.ArgumentParser(description="Benchmarks for performance-critical parts of SoMaJo.")
+    subparsers = parser.add_subparsers(dest="benchmark")
+    subparsers.required = True
+    abbreviations = subparsers.add_parser("abbreviations", help="Compare the trie-based abbreviation matchers with the corresponding regular expressions.")
+    abbreviations.set_defaults(function=benchmark_abbreviations)
+    lexicons = subparsers.add_parser("lexicons", help="Compare the Aho-Corasick-based lexicon matchers with the corresponding regular expressions.")
+    lexicons.add_argument("-s", "--scale", type=int, default=1, help="Add artificial entries to make the lexicons this many times larger. (Default: 1)")
+    lexicons.set_defaults(function=benchmark_lexicons)
+    triggers = subparsers.add_parser("triggers", help="Measure the effect of skipping stages whose trigger characters do not occur in a paragraph.")
+    triggers.set_defaults(function=benchmark_triggers)
+    fusion = subparsers.add_parser("fusion", help="Compare the fused stages with applying their members one after the other.")
+    fusion.set_defaults(function=benchmark_fusion)
+    emojis = subparsers.add_parser("emojis", help="Measure how replacing emojis scales with the number of emojis in a message.")
+    emojis.add_argument("-m", "--max-old", type=int, default=10000, help="Only measure the former implementation for up to this many emojis. (Default: 10000)")
+    emojis.add_argument("-r", "--repetitions", type=int, default=1, help="Process each message this many times. (Default: 1)")
+    emojis.add_argument("sizes", metavar="N", type=int, nargs="*", default=[1000, 10000, 100000], help="Number of emojis per message. (Default: 1000 10000 100000)")
+    emojis.set_defaults(function=benchmark_emojis)
+    alignment = subparsers.add_parser("alignment", help="Measure how aligning tokens with the original text scales with the length of a paragraph.")
+    alignment.add_argument("-m", "--max-old", type=int, default=100, help="Only measure the former implementation for paragraphs of up to this many KB. (Default: 100)")
+    alignment.add_argument("-r", "--repetitions", type=int, default=1, help="Align each paragraph this many times. (Default: 1)")
+    alignment.add_argument("sizes", metavar="KB", type=int, nargs="*", default=[10, 30, 100], help="Paragraph length in KB. (Default: 10 30 100)")
+    alignment.set_defaults(function=benchmark_alignment)
+    xml = subparsers.add_parser("xml", help="Measure how aligning tokens with XML elements scales with the length of their text.")
+    xml.add_argument("-m", "--max-old", type=int, default=300, help="Only measure the former implementation for documents of up to this many KB. (Default: 300)")
+    xml.add_argument("-r", "--repetitions", type=int, default=1, help="Align each document this many times. (Default: 1)")
+    xml.add_argument("sizes", metavar="KB", type=int, nargs="*", default=[10, 100, 1000], help="Document length in KB. (Default: 10 100 1000)")
+    xml.set_defaults(function=benchmark_xml)
+    construction = subparsers.add_parser("construction", help="Measure how long it takes to create a Tokenizer.")
+    construction.add_argument("-l", "--language", choices=["de", "en"], default="de", help="Language of the tokenizer. (Default: de)")
+    construction.add_argument("-c", "--split_camel_case", action="store_true", help="Split words written in camelCase.")
+    construction.add_argument("-r", "--repetitions", type=int, default=10, help="Create this many tokenizers. (Default: 10)")
+    construction.set_defaults(function=benchmark_construction)
+    parallel = subparsers.add_parser("parallel", help="Measure how tokenization scales with the number of worker processes.")
+    parallel.add_argument("-w", "--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32], help="Numbers of worker processes (after FILE). (Default: 1 2 4 8 16 32)")
+    parallel.add_argument("--chunksize", type=int, default=250, help="Paragraphs per task. (Default: 250)")
+    parallel.add_argument("-c", "--split_camel_case", action="store_true", help="Split words written in camelCase.")
+    script = subparsers.add_parser("script", help="Measure how running the tokenizer script scales with the number of worker processes.")
+    script.add_argument("-w", "--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32], help="Numbers of worker processes (after FILE). (Default: 1 2 4 8 16 32)")
+    script.add_argument("-l", "--language", choices=["de", "en"], default="de", help="Language of the corpus. (Default: de)")
+    script.add_argument("FILE", help="The corpus (UTF-8-encoded, paragraphs separated by empty lines)")
+    script.set_defaults(function=benchmark_script)
+    parallel_xml = subparsers.add_parser("parallel_xml", help="Measure how tokenizing an XML document scales with the number of worker processes.")
+    parallel_xml.add_argument("-w", "--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32], help="Numbers of worker processes (after FILE). (Default: 1 2 4 8 16 32)")
+    parallel_xml.add_argument("--chunksize", type=int, default=250, help="Parts of the document per task. (Default: 250)")
+    parallel_xml.add_argument("-c", "--split_camel_case", action="store_true", help="Split words written in camelCase.")
+    parallel_xml.add_argument("-t", "--token_classes", action="store_true", help="Output the token classes.")
+    parallel_xml.add_argument("-e", "--extra_info", action="store_true", help="Output additional information for each token.")
+    parallel_xml.set_defaults(function=benchmark_parallel_xml)
+    for subparser in [parallel, script]:
+        subparser.add_argument("-s", "--split_sentences", action="store_true", help="Also split the paragraphs into sentences.")
+        subparser.add_argument("-t", "--token_classes", action="store_true", help="Output the token classes.")
+        subparser.add_argument("-e", "--extra_info", action="store_true", help="Output additional information for each token.")
+    for subparser in [parallel, parallel_xml]:
+        subparser.add_argument("-l", "--language", choices=["de", "en"], default="de", help="Language of the corpus. (Default: de)")
+        subparser.add_argument("-n", "--limit", type=int, help="Only use the first N paragraphs of the corpus.")
+        subparser.add_argument("FILE", type=argparse.FileType("r", encoding="utf-8"), help="The corpus (UTF-8-encoded, paragraphs separated by empty lines)")
+    parallel.set_defaults(function=benchmark_parallel)
+    startup = subparsers.add_parser("startup", help="Measure the time it takes to import SoMaJo and to tokenize a small file in a fresh process.")
+    startup.add_argument("-l", "--language", choices=["de", "en"], default="de", help="Language of the tokenizer. (Default: de)")
+    startup.add_argument("-r", "--repetitions", type=int, default=10, help="Start this many processes per measurement. (Default: 10)")
+    startup.add_argument("FILE", help="A small input file for the tokenizer script")
+    startup.set_defaults(function=benchmark_startup)
+    memory = subparsers.add_parser("memory", help="Measure the memory footprints of tokenizers with different configurations.")
+    memory.add_argument("languages", metavar="LANGUAGE", nargs="*", default=["de", "en"], help="Languages of the tokenizers (de or en). (Default: de en)")
+    memory.set_defaults(function=benchmark_memory)
+    for subparser in [abbreviations, lexicons, triggers, fusion]:
+        subparser.add_argument("-l", "--language", choices=["de", "en"], default="de", help="Language of the corpus. (Default: de)")
+        subparser.add_argument("-n", "--limit", type=int, help="Only use the first N paragraphs of the corpus.")
+        subparser.add_argument("-r", "--repetitions", type=int, default=1, help="Process the corpus this many times. (Default: 1)")
+        subparser.add_argument("FILE", type=argparse.FileType("r", encoding="utf-8"), help="The corpus (UTF-8-encoded, paragraphs separated by empty lines)")
+    return parser.parse_args()
+
+
+def main():
+    args = arguments()
+    args.function(args)
+
+
+if __name__ == "__main__":
+    main()